@@ -0,0 +1,213 @@
+import time
+from collections import OrderedDict
+
+# Nazwa tabeli tymczasowej używanej przez zapis przez staging
+STAGING_TABLE = "#BulkUpdate"
+
+# Domyślna liczba rekordów w jednym wywołaniu executemany przy zapisie grupami (write_grouped)
+DEFAULT_GROUP_BATCH_SIZE = 1000
+
+
+class WriteStats:
+    """Wynik zapisu zbiorczego: liczba wierszy, liczba wywołań i czas."""
+
+    __slots__ = ("method", "rows", "calls", "seconds")
+
+    def __init__(self, method, rows=0, calls=0, seconds=0.0):
+        self.method = method
+        self.rows = rows
+        self.calls = calls
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def describe(self):
+        return (f"{self.method}: {self.rows} wierszy w {self.calls} wywołaniach, "
+                f"{self.seconds:.2f} s ({self.rows_per_second:.0f} wierszy/s)")
+
+
+def group_by_columns(changes):
+    """Grupuje zmiany (klucz, {kolumna: wartość}) po zestawie zmienionych kolumn.
+
+    Zwraca OrderedDict: krotka kolumn -> lista (klucz, krotka wartości). Kolejność rekordów jest zachowana.
+    """
+    groups = OrderedDict()
+    for key, values in changes:
+        if not values:
+            continue
+        columns = tuple(sorted(values))
+        groups.setdefault(columns, []).append((key, tuple(values[col] for col in columns)))
+    return groups
+
+
+def build_update_statement(table, key_column, columns):
+    """Buduje parametryzowany UPDATE dla podanego zestawu kolumn."""
+    set_clause = ", ".join(f"{col} = ?" for col in columns)
+    return f"UPDATE {table} SET {set_clause} WHERE {key_column} = ?"
+
+
+def write_executemany(cursor, table, key_column, changes):
+    """Zapisuje zmiany przez executemany (fast_executemany) - jedno wywołanie na zestaw zmienionych kolumn."""
+    stats = WriteStats("executemany")
+    started = time.perf_counter()
+    cursor.fast_executemany = True
+    try:
+        for columns, rows in group_by_columns(changes).items():
+            cursor.executemany(
+                build_update_statement(table, key_column, columns),
+                [values + (key,) for key, values in rows],
+            )
+            stats.rows += len(rows)
+            stats.calls += 1
+    finally:
+        cursor.fast_executemany = False
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def fetch_column_types(cursor, table, columns):
+    """Odczytuje z INFORMATION_SCHEMA rzeczywiste typy kolumn (np. DECIMAL(30, 10), NVARCHAR(MAX)).
+
+    Tabela tymczasowa z tymi samymi typami zapisuje dokładnie te wartości, które zapisałby UPDATE wprost.
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE "
+        "FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ? AND COLUMN_NAME IN ("
+        + ", ".join("?" for _ in columns) + ")",
+        (table,) + tuple(columns),
+    )
+    types = {}
+    for name, data_type, max_length, precision, scale in cursor.fetchall():
+        data_type = data_type.upper()
+        if data_type in ("DECIMAL", "NUMERIC"):
+            types[name] = f"{data_type}({precision}, {scale})"
+        elif max_length is not None:
+            types[name] = f"{data_type}({'MAX' if max_length == -1 else max_length})"
+        else:
+            types[name] = data_type
+    missing = [col for col in columns if col not in types]
+    if missing:
+        raise ValueError(f"Nie znaleziono kolumn {', '.join(missing)} w tabeli {table}.")
+    return {col: types[col] for col in columns}
+
+
+def write_staging(cursor, table, key_column, key_type, column_types, changes):
+    """Zapisuje zmiany przez tabelę tymczasową i jeden UPDATE ... FROM.
+
+    column_types: słownik kolumna -> typ SQL w tabeli tymczasowej. Dla każdej kolumny przesyłana
+    jest flaga, więc nadpisywane są tylko wartości, które faktycznie się zmieniły.
+    """
+    columns = list(column_types)
+    stats = WriteStats("staging")
+    started = time.perf_counter()
+
+    definitions = [f"KeyValue {key_type} PRIMARY KEY"]
+    for position, col in enumerate(columns):
+        definitions.append(f"V{position} {column_types[col]} NULL")
+        definitions.append(f"S{position} BIT NOT NULL")
+
+    cursor.execute(f"IF OBJECT_ID('tempdb..{STAGING_TABLE}') IS NOT NULL DROP TABLE {STAGING_TABLE}")
+    cursor.execute(f"CREATE TABLE {STAGING_TABLE} ({', '.join(definitions)})")
+
+    rows = []
+    for key, values in changes:
+        if not values:
+            continue
+        row = [key]
+        for col in columns:
+            row.append(values.get(col))
+            row.append(1 if col in values else 0)
+        rows.append(row)
+
+    if rows:
+        placeholders = ", ".join("?" for _ in range(1 + 2 * len(columns)))
+        cursor.fast_executemany = True
+        try:
+            cursor.executemany(f"INSERT INTO {STAGING_TABLE} VALUES ({placeholders})", rows)
+        finally:
+            cursor.fast_executemany = False
+
+        set_clause = ", ".join(
+            f"{col} = CASE WHEN s.S{position} = 1 THEN s.V{position} ELSE t.{col} END"
+            for position, col in enumerate(columns)
+        )
+        cursor.execute(
+            f"UPDATE t SET {set_clause} FROM {table} t JOIN {STAGING_TABLE} s ON t.{key_column} = s.KeyValue"
+        )
+        stats.rows = len(rows)
+        stats.calls = 2
+
+    cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def write_grouped(cursor, table, key_column, changes, batch_size=DEFAULT_GROUP_BATCH_SIZE,
+                  committer=None, progress=None, task=None, limit=None, console=None):
+    """Zapisuje zmiany grupami o tym samym zestawie kolumn - jedno przygotowane zapytanie i executemany na porcję.
+
+    Zwraca listę błędów w kolejności changes (None = zapisano). Gdy porcja się nie powiedzie, jej rekordy
+    są zapisywane pojedynczo, żeby wskazać, które z nich powodują błąd - UPDATE ustawia stałe wartości,
+    więc ponowienie rekordów zapisanych już w porcji niczego nie zmienia. Błąd porcji wypisywany jest
+    w console (jeśli podano).
+    committer (commit_control.ChunkedCommitter) obejmuje każdą porcję jednym zapisem i liczy tylko
+    rekordy zapisane bez błędu.
+    limit: zapis kolejnych rekordów do osiągnięcia limit udanych zapisów (--single, --limit) - zwrócona
+    lista obejmuje wtedy tylko rekordy, których zapis był próbowany.
+    """
+    if limit is not None:
+        errors = []
+        while len(errors) < len(changes) and errors.count(None) < limit:
+            remaining = limit - errors.count(None)
+            errors.extend(write_grouped(
+                cursor, table, key_column, changes[len(errors):len(errors) + remaining],
+                batch_size, committer, progress, task, console=console,
+            ))
+        return errors
+
+    errors = [None] * len(changes)
+    groups = OrderedDict()
+    for position, (key, values) in enumerate(changes):
+        groups.setdefault(tuple(sorted(values)), []).append(position)
+
+    for columns, positions in groups.items():
+        statement = build_update_statement(table, key_column, columns)
+        for start in range(0, len(positions), batch_size):
+            chunk = positions[start:start + batch_size]
+            params = [
+                tuple(changes[position][1][col] for col in columns) + (changes[position][0],)
+                for position in chunk
+            ]
+            if committer is not None:
+                committer.begin()
+            _execute_chunk(cursor, statement, chunk, params, errors, console)
+            if committer is not None:
+                committer.written(sum(1 for position in chunk if errors[position] is None))
+            if progress is not None:
+                progress.advance(task, len(chunk))
+    return errors
+
+
+def _execute_chunk(cursor, statement, positions, params, errors, console=None):
+    """Wykonuje porcję przez executemany, a w razie błędu - rekord po rekordzie."""
+    cursor.fast_executemany = True
+    try:
+        cursor.executemany(statement, params)
+        return
+    except Exception as e:
+        if console is not None:
+            console.print(
+                f"Błąd zapisu porcji {len(params)} rekordów: {e}. Zapis rekord po rekordzie.",
+                style="dim",
+                markup=False,
+            )
+    finally:
+        cursor.fast_executemany = False
+
+    for position, row_params in zip(positions, params):
+        try:
+            cursor.execute(statement, row_params)
+        except Exception as e:
+            errors[position] = e
@@ -0,0 +1,99 @@
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+# Format pól wyboru WEBCON: 'ID#Nazwa', listy wielu wartości rozdzielone ';'
+CHOICE_SEPARATOR = "#"
+LIST_SEPARATOR = ";"
+# Separator używany przy dopisywaniu wartości do listy (np. Przypisani)
+APPEND_SEPARATOR = " ; "
+
+# Wartość pola wyboru; id jest None, gdy wartość nie zawiera '#'
+Choice = namedtuple("Choice", ("id", "name"))
+
+
+@lru_cache(maxsize=65536)
+def parse_choice(value):
+    """Zamienia 'ID#Nazwa' na Choice(id, nazwa). Ten sam tekst daje zawsze ten sam obiekt.
+
+    Dzielenie następuje na pierwszym '#', tak jak w dbo.ClearWFElemID / dbo.ClearWFElem.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if CHOICE_SEPARATOR in value:
+        choice_id, _, name = value.partition(CHOICE_SEPARATOR)
+        return Choice(sys.intern(choice_id.strip()), sys.intern(name))
+    return Choice(None, sys.intern(value))
+
+
+def choice_key(choice):
+    """Klucz porównania wartości: ID, a dla wartości bez ID - nazwa."""
+    return choice.id if choice.id else choice.name
+
+
+def choice_name(value):
+    """Zwraca nazwę (część po '#') z wartości pola wyboru."""
+    choice = parse_choice(value)
+    return choice.name if choice else ""
+
+
+def encode_choice(choice_id, name):
+    """Zwraca wartość pola wyboru w formacie 'ID#Nazwa' (lub samą nazwę, gdy brak ID)."""
+    if choice_id is not None and str(choice_id).strip():
+        return f"{choice_id}{CHOICE_SEPARATOR}{name}"
+    return name
+
+
+class ChoiceList:
+    """Lista wartości pola wyboru wielokrotnego z zachowaniem kolejności i sprawdzaniem obecności po ID w O(1).
+
+    Obiekt jest niezmienny (parse_choice_list zwraca obiekty z pamięci podręcznej), a appended()
+    zwraca nowy tekst pola - oryginalny zapis z bazy jest zachowany bez zmian.
+    """
+
+    __slots__ = ("raw", "items", "_keys")
+
+    def __init__(self, raw):
+        self.raw = raw or ""
+        items = []
+        keys = set()
+        for part in self.raw.split(LIST_SEPARATOR):
+            choice = parse_choice(part)
+            if choice is None or not choice.name and not choice.id:
+                continue
+            key = choice_key(choice)
+            if key in keys:
+                continue
+            keys.add(key)
+            items.append(choice)
+        self.items = tuple(items)
+        self._keys = frozenset(keys)
+
+    def __contains__(self, value):
+        choice = parse_choice(value) if isinstance(value, str) else value
+        return choice is not None and choice_key(choice) in self._keys
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def appended(self, value):
+        """Zwraca tekst pola z dopisaną wartością (bez zmian, jeśli wartość już jest na liście)."""
+        if not value or value in self:
+            return self.raw
+        if not self.raw:
+            return value
+        return self.raw + APPEND_SEPARATOR + value
+
+    def encode(self):
+        """Koduje listę w formacie WEBCON ('ID#Nazwa;ID#Nazwa')."""
+        return LIST_SEPARATOR.join(encode_choice(c.id, c.name) for c in self.items)
+
+
+@lru_cache(maxsize=16384)
+def parse_choice_list(value):
+    """Zamienia tekst pola wyboru wielokrotnego na ChoiceList (wynik z pamięci podręcznej)."""
+    return ChoiceList(value)
@@ -0,0 +1,66 @@
+from choice_codec import CHOICE_SEPARATOR, parse_choice
+
+# Znaki specjalne wzorca LIKE w SQL Server zamieniane na klasy znaków ('_' -> '[_]')
+LIKE_SPECIAL_CHARS = "[%_"
+
+# Nazwa wartości pola wyboru w SQL (część po pierwszym '#') - odpowiednik dbo.ClearWFElem bez wywołania funkcji
+CHOICE_NAME_SQL = "SUBSTRING({column}, CHARINDEX('#', {column}) + 1, 4000)"
+
+
+def escape_like(text):
+    """Zamienia znaki specjalne LIKE na klasy znaków, np. '3288_31' -> '3288[_]31'."""
+    return "".join(f"[{char}]" if char in LIKE_SPECIAL_CHARS else char for char in text)
+
+
+def resolve_choices(values, names):
+    """Wybiera z wartości kolumny te, których nazwa (część po '#', bez spacji na brzegach) należy do names.
+
+    Zwraca (ID wartości 'ID#Nazwa', wartości bez ID) - do warunku choice_predicate. Nazwy porównywane
+    są jak w Pythonie (choice_name(...).strip(), z rozróżnianiem wielkości liter).
+    """
+    ids = set()
+    plain_values = set()
+    for value in values:
+        choice = parse_choice(value)
+        if choice is None or choice.name.strip() not in names:
+            continue
+        if choice.id:
+            ids.add(choice.id)
+        else:
+            plain_values.add(value)
+    return ids, plain_values
+
+
+def id_predicate(column, ids):
+    """Warunek 'ID wartości pola wyboru należy do ids' na surowej kolumnie 'ID#Nazwa': (tekst SQL, parametry).
+
+    Zamiast dbo.ClearWFElemID(kolumna) IN (...) - funkcja skalarna wymusza pełny odczyt i wywołanie
+    dla każdego wiersza - używane są wzorce z prefiksem (LIKE 'ID#%'), które mogą korzystać z indeksu.
+    """
+    ids = sorted({str(choice_id).strip() for choice_id in ids})
+    parts = [f"{column} LIKE ?" for _ in ids]
+    params = [escape_like(choice_id) + CHOICE_SEPARATOR + "%" for choice_id in ids]
+    return "(" + " OR ".join(parts) + ")", params
+
+
+def choice_predicate(column, ids, plain_values):
+    """Warunek na surowej kolumnie dla wyniku resolve_choices: prefiksy 'ID#%' lub wartości bez ID (IN).
+
+    Ta sama wartość ID może mieć w bazie różne nazwy, więc nazwę należy jeszcze sprawdzić dokładnie
+    (w Pythonie albo warunkiem na CHOICE_NAME_SQL). Pusty wynik resolve_choices daje warunek zawsze fałszywy.
+    """
+    parts = []
+    params = []
+    if ids:
+        predicate, predicate_params = id_predicate(column, ids)
+        parts.append(predicate)
+        params.extend(predicate_params)
+    if plain_values:
+        plain_values = sorted(plain_values)
+        parts.append(f"{column} IN ({', '.join('?' for _ in plain_values)})")
+        params.extend(plain_values)
+    if not parts:
+        return "(1 = 0)", []
+    if len(parts) == 1:
+        return parts[0], params
+    return "(" + " OR ".join(parts) + ")", params
@@ -0,0 +1,113 @@
+import time
+from contextlib import contextmanager
+
+
+def add_commit_arguments(parser):
+    """Dodaje do parsera wspólne parametry sterujące wielkością transakcji."""
+    parser.add_argument(
+        "--commit-every",
+        type=int,
+        help="Zatwierdzaj zmiany co N zapisanych rekordów (domyślnie jedna transakcja na cały przebieg).",
+    )
+    parser.add_argument(
+        "--max-txn-seconds",
+        type=float,
+        help="Zatwierdzaj zmiany, gdy transakcja jest otwarta dłużej niż S sekund.",
+    )
+
+
+def validate_commit_arguments(args):
+    """Zwraca komunikat błędu dla niepoprawnych wartości lub None."""
+    if args.commit_every is not None and args.commit_every < 1:
+        return "--commit-every musi być liczbą dodatnią."
+    if args.max_txn_seconds is not None and args.max_txn_seconds <= 0:
+        return "--max-txn-seconds musi być liczbą dodatnią."
+    return None
+
+
+class ChunkedCommitter:
+    """Zatwierdza zapisy porcjami, żeby nie trzymać blokad na WFElements przez cały przebieg.
+
+    Czas utrzymywania blokad porcji liczony jest od pierwszego zapisu w transakcji do commit().
+    Bez commit_every i max_txn_seconds działa jak dotychczas - jeden commit na końcu (finish).
+    """
+
+    def __init__(self, connection, commit_every=None, max_txn_seconds=None, console=None):
+        self.connection = connection
+        self.commit_every = commit_every
+        self.max_txn_seconds = max_txn_seconds
+        self.console = console
+        self.pending_rows = 0
+        self.committed_rows = 0
+        self.chunks = []
+        self._txn_started = None
+
+    @property
+    def is_chunked(self):
+        return bool(self.commit_every or self.max_txn_seconds)
+
+    @contextmanager
+    def write(self, rows=1):
+        """Obejmuje pojedynczy zapis (lub zapis paczki rows rekordów) i zatwierdza porcję po przekroczeniu limitu."""
+        self.begin()
+        yield
+        self.written(rows)
+
+    def begin(self):
+        """Oznacza początek zapisu - od pierwszego zapisu w transakcji liczony jest czas utrzymywania blokad."""
+        if self._txn_started is None:
+            self._txn_started = time.perf_counter()
+
+    def written(self, rows):
+        """Rejestruje zapisane rekordy, gdy ich liczba jest znana dopiero po zapisie (np. UPDATE ... OUTPUT)."""
+        self.pending_rows += rows
+        if self._limit_reached():
+            self.commit()
+
+    def _limit_reached(self):
+        if self.commit_every and self.pending_rows >= self.commit_every:
+            return True
+        if self.max_txn_seconds and time.perf_counter() - self._txn_started >= self.max_txn_seconds:
+            return True
+        return False
+
+    def commit(self):
+        """Zatwierdza bieżącą transakcję i zapamiętuje statystyki porcji."""
+        if self._txn_started is None:
+            self.connection.commit()
+            return
+        self.connection.commit()
+        hold_seconds = time.perf_counter() - self._txn_started
+        self.chunks.append((self.pending_rows, hold_seconds))
+        self.committed_rows += self.pending_rows
+        if self.console and self.is_chunked:
+            self.console.print(
+                f"Zatwierdzono porcję {len(self.chunks)}: {self.pending_rows} rekordów, "
+                f"blokady utrzymywane {hold_seconds:.2f} s.",
+                style="dim",
+            )
+        self.pending_rows = 0
+        self._txn_started = None
+
+    def rollback(self):
+        """Wycofuje bieżącą (niezatwierdzoną) transakcję. Zwraca liczbę wycofanych rekordów."""
+        self.connection.rollback()
+        rolled_back = self.pending_rows
+        self.pending_rows = 0
+        self._txn_started = None
+        return rolled_back
+
+    def finish(self):
+        """Zatwierdza pozostałe zmiany i wypisuje podsumowanie czasu utrzymywania blokad."""
+        self.commit()
+        if self.console and self.chunks:
+            longest = max(hold for _, hold in self.chunks)
+            self.console.print(
+                f"Transakcje: {len(self.chunks)}, zatwierdzono {self.committed_rows} rekordów, "
+                f"najdłuższe utrzymywanie blokad {longest:.2f} s.",
+                style="dim",
+            )
+
+    def chunk_size(self, default):
+        """Wielkość paczki dla zapisów zbiorczych (executemany) przy włączonym dzieleniu transakcji."""
+        return self.commit_every or default
@@ -0,0 +1,51 @@
+import os
+import pickle
+import time
+
+# Katalog lokalnej pamięci podręcznej (pliki pickle), obok skryptów
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# Domyślny czas ważności danych w pamięci podręcznej (minuty)
+DEFAULT_TTL_MINUTES = 60
+
+
+def get_cache_path(name):
+    """Ścieżka pliku pamięci podręcznej dla podanej nazwy."""
+    return os.path.join(CACHE_DIR, f"{name}.pickle")
+
+
+def read_cache(name, ttl_minutes=DEFAULT_TTL_MINUTES):
+    """Zwraca (dane, wiek w sekundach) albo (None, None), gdy brak pliku, jest uszkodzony lub przeterminowany."""
+    path = get_cache_path(name)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None, None
+    age = time.time() - entry.get("created", 0)
+    if ttl_minutes is not None and age > ttl_minutes * 60:
+        return None, None
+    return entry.get("data"), age
+
+
+def write_cache(name, data):
+    """Zapisuje dane do pamięci podręcznej (atomowo - przez plik tymczasowy)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = get_cache_path(name)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump({"created": time.time(), "data": data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+def load_cached(name, loader, ttl_minutes=DEFAULT_TTL_MINUTES, refresh=False):
+    """Zwraca (dane, wiek w sekundach lub None) - z pamięci podręcznej albo wywołując loader() i zapisując wynik."""
+    if not refresh:
+        data, age = read_cache(name, ttl_minutes)
+        if data is not None:
+            return data, age
+    data = loader()
+    write_cache(name, data)
+    return data, None
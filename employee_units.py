@@ -0,0 +1,152 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sql_registry import get_template
+
+# Zapytanie pobierające teczki z jednostką wiodącą oraz wszystkie przypisania do jednostek
+INTERVALS_SQL = "resources/get_employee_unit_intervals.sql"
+
+
+def trim_unit_name(name):
+    """Obcina nazwę jednostki do znaku '[' (np. 'Dział IT [DIT]' -> 'Dział IT'), tak jak robi to SQL."""
+    if name is None:
+        return None
+    position = name.find("[")
+    if position == -1:
+        return name
+    # LTRIM/RTRIM w SQL Server usuwają wyłącznie spacje
+    return name[:position].strip(" ")
+
+
+def to_date(value):
+    """Sprowadza datetime/date do obiektu date (None pozostaje None)."""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _key(value):
+    """Klucz słownika zgodny z porównaniem w SQL Server (bez rozróżniania wielkości liter i spacji na końcu)."""
+    if value is None:
+        return None
+    return str(value).rstrip().upper()
+
+
+class UnitIntervalIndex:
+    """Indeks przedziałów dat dla każdej osoby - odpowiedź 'wartość dla osoby X w dniu D' w O(log n).
+
+    Przedziały są domknięte z obu stron, brak daty oznacza przedział otwarty. Nakładające się przedziały
+    są rozstrzygane na korzyść przypisania z najpóźniejszą datą początkową.
+    """
+
+    def __init__(self):
+        self._intervals = defaultdict(list)
+        self._segments = {}
+
+    def add(self, person_id, date_from, date_to, value):
+        """Dodaje przedział [date_from, date_to] z przypisaną wartością."""
+        self._intervals[_key(person_id)].append((to_date(date_from), to_date(date_to), value))
+        self._segments = None
+
+    def build(self):
+        """Zamienia przedziały każdej osoby na posortowane, rozłączne segmenty."""
+        segments = {}
+        for person_id, intervals in self._intervals.items():
+            boundaries = set()
+            for date_from, date_to, _ in intervals:
+                boundaries.add(date_from or date.min)
+                if date_to is not None and date_to < date.max:
+                    boundaries.add(date_to + timedelta(days=1))
+
+            starts, values = [], []
+            for start in sorted(boundaries):
+                active = None
+                for date_from, date_to, value in intervals:
+                    lower = date_from or date.min
+                    if lower <= start and (date_to is None or start <= date_to):
+                        if active is None or lower > active[0]:
+                            active = (lower, value)
+                current = active[1] if active else None
+                if values and values[-1] is current:
+                    continue
+                starts.append(start)
+                values.append(current)
+            segments[person_id] = (starts, values)
+        self._segments = segments
+        return self
+
+    def lookup(self, person_id, day):
+        """Zwraca wartość obowiązującą dla osoby w podanym dniu lub None."""
+        if self._segments is None:
+            self.build()
+        segments = self._segments.get(_key(person_id))
+        if not segments or day is None:
+            return None
+        starts, values = segments
+        position = bisect_right(starts, to_date(day)) - 1
+        if position < 0:
+            return None
+        return values[position]
+
+    def __len__(self):
+        return len(self._intervals)
+
+
+class EmployeeUnitIndex:
+    """Wyznaczanie jednostki i kodu jednostki pracownika bez zapytań per wpis.
+
+    Odtwarza logikę get_employee_unit.sql / get_employee_unit_code.sql:
+    Priorytet 1 - jednostka wiodąca z teczki, Priorytet 2 - przypisanie obowiązujące w danym dniu.
+    """
+
+    def __init__(self):
+        # Sygnatura teczki -> (ID teczki, jest jednostka wiodąca, nazwa, jest kod wiodący, kod)
+        self.employees = {}
+        self.assignments = UnitIntervalIndex()
+
+    def add_employee(self, signature, person_id, has_lead_unit, lead_unit, has_lead_unit_code, lead_unit_code):
+        key = _key(signature)
+        if key is None or key in self.employees:
+            return
+        self.employees[key] = (
+            _key(person_id),
+            bool(has_lead_unit),
+            trim_unit_name(lead_unit),
+            bool(has_lead_unit_code),
+            lead_unit_code,
+        )
+
+    def add_assignment(self, person_id, date_from, date_to, unit_name, unit_code):
+        # Przypisanie bez daty początkowej nigdy nie spełnia warunku 'data >= DateFrom' w SQL
+        if date_from is None:
+            return
+        self.assignments.add(person_id, date_from, date_to, (trim_unit_name(unit_name), unit_code))
+
+    def resolve(self, signature, work_date):
+        """Zwraca (jednostka, kod jednostki) dla pracownika o podanej sygnaturze teczki w dniu roboczym."""
+        employee = self.employees.get(_key(signature))
+        if employee is None:
+            return None, None
+        person_id, has_lead_unit, lead_unit, has_lead_unit_code, lead_unit_code = employee
+
+        assignment = None
+        if not (has_lead_unit and has_lead_unit_code):
+            assignment = self.assignments.lookup(person_id, work_date)
+
+        unit = lead_unit if has_lead_unit else (assignment[0] if assignment else None)
+        unit_code = lead_unit_code if has_lead_unit_code else (assignment[1] if assignment else None)
+        return unit, unit_code
+
+
+def load_employee_unit_index(cursor):
+    """Pobiera teczki i przypisania jednym zapytaniem i buduje indeks jednostek pracowników."""
+    index = EmployeeUnitIndex()
+    get_template(INTERVALS_SQL).execute(cursor)
+    for row_kind, signature, person_id, has_lead_unit, unit_name, has_lead_unit_code, unit_code, date_from, date_to in cursor.fetchall():
+        if row_kind == "T":
+            index.add_employee(signature, person_id, has_lead_unit, unit_name, has_lead_unit_code, unit_code)
+        else:
+            index.add_assignment(person_id, date_from, date_to, unit_name, unit_code)
+    index.assignments.build()
+    return index
@@ -0,0 +1,740 @@
+import os
+import re
+import json
+import pyodbc
+from dotenv import load_dotenv
+from rich.console import Console
+from rich.progress import Progress
+import argparse
+from commit_control import ChunkedCommitter, add_commit_arguments, validate_commit_arguments
+from bulk_writer import DEFAULT_GROUP_BATCH_SIZE, write_grouped
+from choice_codec import CHOICE_SEPARATOR, choice_name
+from choice_filters import CHOICE_NAME_SQL, choice_predicate, resolve_choices
+from report_sink import DEFAULT_MAX_TABLE_ROWS, Diff, add_report_arguments, create_report_sink, error_status, validate_report_arguments
+
+# Załadowanie zmiennych środowiskowych
+load_dotenv()
+
+# Inicjalizacja konsoli
+console = Console()
+
+# Konfiguracja bazy danych
+DB_SERVER = os.getenv("DB_SERVER")
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+# Katalog plików z regułami (JSON)
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules")
+
+# Część wartości, której dotyczy dopasowanie / zmiana: cała wartość lub nazwa (część po '#')
+MATCH_TARGETS = ("raw", "name")
+
+# Domyślne kolumny listy pozycji: numer projektu i zmieniana nazwa projektu
+DEFAULT_PROJECT_COLUMN = "DET_Att2"
+DEFAULT_COLUMN = "DET_Att4"
+
+# Nazwy kolumn z plików reguł trafiają do tekstu zapytania - dozwolone są tylko identyfikatory
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Powyżej tej liczby parametrów filtr reguł nie jest przenoszony do SQL (limit SQL Server to 2100)
+MAX_FILTER_PARAMS = 2000
+
+# Porównania po stronie serwera (--pushdown) z rozróżnianiem wielkości liter - jak dopasowanie w Pythonie
+BINARY_COLLATION = "Latin1_General_BIN2"
+
+# Porcja UPDATE TOP (n) bez ograniczenia (maksymalna wartość int)
+NO_LIMIT = 2147483647
+
+# Kolumny raportu: (nagłówek, opcje kolumny rich.Table)
+REPORT_COLUMNS = [
+    ("DET_ID", {"style": "dim"}),
+    ("Numer Projektu", {"width": 30}),
+    ("Nazwa Projektu", {"width": 60}),
+    ("Reguła", {"width": 25}),
+    ("Status", {"style": "yellow"}),
+]
+
+
+class RuleError(Exception):
+    """Błąd wczytania lub walidacji pliku reguł."""
+
+
+def get_connection_string():
+    """Tworzy connection string w zależności od metody uwierzytelniania."""
+    if DB_USER and DB_PASSWORD:
+        return f"DRIVER={{ODBC Driver 18 for SQL Server}};SERVER={DB_SERVER};DATABASE={DB_NAME};UID={DB_USER};PWD={DB_PASSWORD};TrustServerCertificate=yes;"
+    else:
+        return f"DRIVER={{ODBC Driver 18 for SQL Server}};SERVER={DB_SERVER};DATABASE={DB_NAME};Trusted_Connection=yes;TrustServerCertificate=yes;"
+
+
+def like_to_regex(pattern):
+    """Zamienia wzorzec LIKE (%, _, [abc], [^abc], [a-z]) na wyrażenie regularne dopasowujące całą wartość.
+
+    W przeciwieństwie do LIKE w SQL Server porównanie rozróżnia wielkość liter - tak jak dotychczasowe
+    sprawdzenia w skryptach ('PAN' in nazwa).
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                raise RuleError(f"Niezamknięty nawias '[' we wzorcu LIKE: {pattern}")
+            body = pattern[i + 1:end]
+            negate = body.startswith("^")
+            if negate:
+                body = body[1:]
+            body = "".join(c if c == "-" else re.escape(c) for c in body)
+            parts.append(f"[{'^' if negate else ''}{body}]")
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    try:
+        return re.compile("".join(parts) + r"\Z", re.DOTALL)
+    except re.error as e:
+        # Np. pusta klasa znaków '[]]'
+        raise RuleError(f"Niepoprawny wzorzec LIKE: {pattern} ({e})")
+
+
+def value_part(value, target):
+    """Zwraca część wartości dla dopasowania: całą wartość ('raw') lub nazwę po '#' ('name')."""
+    return value if target == "raw" else choice_name(value)
+
+
+def apply_to_part(value, target, change):
+    """Stosuje change do całej wartości ('raw') lub tylko do nazwy po '#' ('name'), zachowując ID."""
+    if target == "raw":
+        return change(value)
+    choice_id, separator, name = value.partition(CHOICE_SEPARATOR)
+    if not separator:
+        return change(value)
+    return choice_id + separator + change(name)
+
+
+class Rule:
+    """Reguła: zbiór numerów projektów, dopasowanie (LIKE i/lub regex) oraz akcja (replace / append)."""
+
+    __slots__ = (
+        "name", "order", "projects", "target", "like", "like_regex", "regex",
+        "action", "action_target", "action_kind", "action_args",
+    )
+
+    def __init__(self, definition, order):
+        self.order = order
+        self.name = str(definition.get("name") or f"reguła {order + 1}")
+
+        projects = definition.get("projects")
+        if projects is not None and (not isinstance(projects, list) or not projects):
+            raise RuleError(f"{self.name}: 'projects' musi być niepustą listą numerów projektów.")
+        # None - reguła dotyczy wszystkich projektów
+        self.projects = frozenset(str(p).strip() for p in projects) if projects is not None else None
+
+        match = definition.get("match") or {}
+        if not isinstance(match, dict):
+            raise RuleError(f"{self.name}: 'match' musi być obiektem.")
+        self.target = match.get("on", "raw")
+        if self.target not in MATCH_TARGETS:
+            raise RuleError(f"{self.name}: 'match.on' musi być jedną z wartości: {', '.join(MATCH_TARGETS)}.")
+        self.like = match.get("like")
+        if self.like is not None and not isinstance(self.like, str):
+            raise RuleError(f"{self.name}: 'match.like' musi być tekstem.")
+        try:
+            self.like_regex = like_to_regex(self.like) if self.like else None
+        except RuleError as e:
+            raise RuleError(f"{self.name}: {e}")
+        try:
+            self.regex = re.compile(match["regex"]) if match.get("regex") else None
+        except (re.error, TypeError) as e:
+            raise RuleError(f"{self.name}: niepoprawne wyrażenie regularne: {e}")
+        if not self.like and not self.regex:
+            raise RuleError(f"{self.name}: reguła musi mieć 'match.like' lub 'match.regex'.")
+
+        action = definition.get("action") or {}
+        if not isinstance(action, dict):
+            raise RuleError(f"{self.name}: 'action' musi być obiektem.")
+        self.action_target = action.get("on", "raw")
+        if self.action_target not in MATCH_TARGETS:
+            raise RuleError(f"{self.name}: 'action.on' musi być jedną z wartości: {', '.join(MATCH_TARGETS)}.")
+        if "replace" in action:
+            if not isinstance(action["replace"], dict):
+                raise RuleError(f"{self.name}: 'action.replace' musi być obiektem z 'old' i 'new'.")
+            old, new = action["replace"].get("old"), action["replace"].get("new")
+            if not old or new is None:
+                raise RuleError(f"{self.name}: 'action.replace' wymaga 'old' i 'new'.")
+            if not isinstance(old, str) or not isinstance(new, str):
+                raise RuleError(f"{self.name}: 'old' i 'new' w 'action.replace' muszą być tekstem.")
+            if old == new:
+                raise RuleError(f"{self.name}: 'action.replace' - 'old' i 'new' są takie same.")
+            self.action_kind, self.action_args = "replace", (old, new)
+            self.action = lambda text: text.replace(old, new)
+        elif "append" in action:
+            suffix = action["append"]
+            if not suffix or not isinstance(suffix, str):
+                raise RuleError(f"{self.name}: 'action.append' musi być niepustym tekstem.")
+            self.action_kind, self.action_args = "append", (suffix,)
+            self.action = lambda text: text + suffix
+        else:
+            raise RuleError(f"{self.name}: reguła musi mieć akcję 'replace' lub 'append'.")
+
+    def matches(self, value):
+        part = value_part(value, self.target)
+        if self.like_regex is not None and not self.like_regex.match(part):
+            return False
+        if self.regex is not None and not self.regex.search(part):
+            return False
+        return True
+
+    def apply(self, value):
+        return apply_to_part(value, self.action_target, self.action)
+
+    def sql_like(self):
+        """Wzorzec LIKE dla kolumny w bazie (zawiera co najmniej wartości pasujące do reguły) lub None.
+
+        Nazwa jest końcem całej wartości ('ID#Nazwa'), więc dla dopasowania po nazwie wystarczy
+        poprzedzić wzorzec znakiem '%'.
+        """
+        if not self.like:
+            return None
+        if self.target == "name" and not self.like.startswith("%"):
+            return "%" + self.like
+        return self.like
+
+    def can_push_down(self):
+        """Czy regułę da się wykonać w całości po stronie serwera (--pushdown).
+
+        Wymaga dopasowania samym LIKE i akcji na całej wartości - wyrażeń regularnych
+        ani wydzielania nazwy po '#' nie da się wiernie odtworzyć w SQL.
+        """
+        return self.regex is None and self.target == "raw" and self.action_target == "raw"
+
+    def sql_condition(self, project_column, column, project_choices=None):
+        """Warunek reguły w SQL (dokładny odpowiednik matches dla reguł z can_push_down): (tekst, parametry).
+
+        project_choices: wynik resolve_choices dla numerów projektów reguły (RuleSet.load_project_values).
+        """
+        parts = []
+        params = []
+        if self.projects is not None:
+            predicate, predicate_params = choice_predicate(project_column, *project_choices)
+            parts.append(predicate)
+            params.extend(predicate_params)
+            # UPDATE nie ma etapu sprawdzenia w Pythonie - nazwa projektu sprawdzana dokładnie także w SQL,
+            # jak choice_name(...).strip() w rules_for: bez spacji na brzegach, z rozróżnianiem wielkości liter
+            projects = sorted(self.projects)
+            project_name = f"LTRIM(RTRIM({CHOICE_NAME_SQL.format(column=project_column)}))"
+            parts.append(
+                f"{project_name} COLLATE {BINARY_COLLATION} IN ({', '.join('?' for _ in projects)})"
+            )
+            params.extend(projects)
+        # Puste wartości są pomijane w find_changes (LIKE '%' pasuje także do '')
+        parts.append(f"DATALENGTH({column}) > 0")
+        parts.append(f"{column} COLLATE {BINARY_COLLATION} LIKE ?")
+        params.append(self.like)
+        if self.action_kind == "replace":
+            # Tylko wiersze, w których zamiana coś zmienia (jak warunek new_value != value w evaluate)
+            parts.append(f"CHARINDEX(?, {column} COLLATE {BINARY_COLLATION}) > 0")
+            params.append(self.action_args[0])
+        return "(" + " AND ".join(parts) + ")", params
+
+    def sql_action(self, column):
+        """Nowa wartość kolumny w SQL: (wyrażenie, parametry)."""
+        if self.action_kind == "replace":
+            return f"REPLACE({column} COLLATE {BINARY_COLLATION}, ?, ?)", list(self.action_args)
+        return f"{column} + ?", list(self.action_args)
+
+
+class RuleSet:
+    """Reguły dla jednej kolumny listy pozycji, indeksowane po numerze projektu.
+
+    Dla każdego wiersza sprawdzane są tylko reguły jego projektu (oraz reguły bez listy projektów),
+    w kolejności z pliku. Stosowana jest pierwsza pasująca reguła.
+    """
+
+    def __init__(self, title, wfcon_id, project_column, column, rules):
+        self.title = title
+        self.wfcon_id = wfcon_id
+        self.project_column = project_column
+        self.column = column
+        self.rules = rules
+        self._by_project = {}
+        self._global = []
+        for rule in rules:
+            if rule.projects is None:
+                self._global.append(rule)
+            else:
+                for project in rule.projects:
+                    self._by_project.setdefault(project, []).append(rule)
+        self._candidates = {}
+        self._project_choices = {}
+
+    def rules_for(self, project):
+        """Reguły do sprawdzenia dla numeru projektu (w kolejności z pliku)."""
+        candidates = self._candidates.get(project)
+        if candidates is None:
+            candidates = tuple(sorted(self._by_project.get(project, []) + self._global, key=lambda r: r.order))
+            self._candidates[project] = candidates
+        return candidates
+
+    def evaluate(self, project, value):
+        """Zwraca (reguła, nowa wartość) dla pierwszej pasującej reguły zmieniającej wartość lub None."""
+        for rule in self.rules_for(project):
+            if rule.matches(value):
+                new_value = rule.apply(value)
+                if new_value != value:
+                    return rule, new_value
+        return None
+
+    def load_project_values(self, cursor):
+        """Zamienia numery projektów reguł na ID wartości pola wyboru (resolve_choices).
+
+        Wartości kolumny projektu pobierane są jednym odczytem DISTINCT dla konfiguracji, a zapytania
+        reguł filtrują po prefiksie 'ID#%' (id_predicate) zamiast po wzorcu '%#Numer' bez użycia indeksu.
+        """
+        if all(rule.projects is None for rule in self.rules):
+            return
+        cursor.execute(
+            f"SELECT DISTINCT {self.project_column} FROM dbo.WFELEMENTDETAILS WHERE DET_WFCONID = ?",
+            (self.wfcon_id,),
+        )
+        values = [row[0] for row in cursor.fetchall()]
+        for rule in self.rules:
+            if rule.projects is not None:
+                self._project_choices[rule.order] = resolve_choices(values, rule.projects)
+
+    def project_choices(self, rule):
+        """Wynik resolve_choices dla reguły z listą projektów (wymaga load_project_values)."""
+        if rule.projects is None:
+            return None
+        if rule.order not in self._project_choices:
+            raise RuleError("Numery projektów nie zostały zamienione na ID - brak wywołania load_project_values.")
+        return self._project_choices[rule.order]
+
+    def build_query(self):
+        """Buduje jedno zapytanie dla wszystkich reguł: (tekst SQL, parametry).
+
+        Warunki reguł (projekty i LIKE) łączone są przez OR i zawężają odczyt po stronie serwera.
+        Dokładne dopasowanie reguł odbywa się w Pythonie (evaluate).
+        """
+        query = (
+            f"SELECT DET_ID, {self.project_column} AS Numer_projektu, {self.column} AS Nazwa_projektu\n"
+            f"FROM dbo.WFELEMENTDETAILS\n"
+            f"WHERE DET_WFCONID = ?"
+        )
+        params = [self.wfcon_id]
+
+        conditions = []
+        filter_params = []
+        for rule in self.rules:
+            parts = []
+            if rule.projects is not None:
+                # Prefiksy 'ID#%' zamiast dbo.ClearWFElem - dokładne sprawdzenie numeru projektu w evaluate (rules_for)
+                predicate, predicate_params = choice_predicate(self.project_column, *self.project_choices(rule))
+                parts.append(predicate)
+                filter_params.extend(predicate_params)
+            like = rule.sql_like()
+            if like:
+                parts.append(f"{self.column} LIKE ?")
+                filter_params.append(like)
+            if not parts:
+                # Reguła bez ograniczeń - potrzebne są wszystkie wiersze konfiguracji
+                conditions = None
+                break
+            conditions.append("(" + " AND ".join(parts) + ")")
+
+        if conditions and len(filter_params) > MAX_FILTER_PARAMS:
+            console.print(
+                f"Filtr reguł wymaga {len(filter_params)} parametrów (limit {MAX_FILTER_PARAMS}) - "
+                f"odczyt całej konfiguracji, dopasowanie tylko w Pythonie.",
+                style="yellow",
+            )
+        elif conditions:
+            query += "\n  AND (\n    " + "\n    OR ".join(conditions) + "\n  )"
+            params.extend(filter_params)
+        return query, tuple(params)
+
+    def build_pushdown_update(self, limit, after_id):
+        """Buduje UPDATE ... OUTPUT dla wszystkich reguł (--pushdown): (tekst SQL, parametry).
+
+        Kolejne porcje (TOP (limit)) wybierane są po DET_ID > after_id, więc każdy wiersz jest zmieniany
+        co najwyżej raz - także gdy nowa wartość nadal pasuje do reguły. CASE stosuje pierwszą pasującą
+        regułę, tak jak evaluate. Zmienione wiersze trafiają przez OUTPUT ... INTO do zmiennej tabelarycznej
+        (samo OUTPUT nie jest dozwolone dla tabel z wyzwalaczami) i są zwracane końcowym SELECT.
+        """
+        conditions = []
+        condition_params = []
+        cases = []
+        case_params = []
+        for rule in self.rules:
+            condition, params = rule.sql_condition(self.project_column, self.column, self.project_choices(rule))
+            action, action_params = rule.sql_action(self.column)
+            conditions.append(condition)
+            condition_params.extend(params)
+            cases.append(f"WHEN {condition} THEN {action}")
+            case_params.extend(params + action_params)
+
+        query = (
+            "SET NOCOUNT ON;\n"
+            "DECLARE @Zmienione TABLE (DET_ID int, Numer_projektu nvarchar(max), "
+            "Stara_nazwa nvarchar(max), Nowa_nazwa nvarchar(max));\n"
+            "WITH Porcja AS (\n"
+            f"    SELECT TOP (?) DET_ID, {self.project_column}, {self.column}\n"
+            "    FROM dbo.WFELEMENTDETAILS\n"
+            "    WHERE DET_WFCONID = ? AND DET_ID > ?\n"
+            "      AND (\n        " + "\n        OR ".join(conditions) + "\n      )\n"
+            "    ORDER BY DET_ID\n"
+            ")\n"
+            f"UPDATE Porcja SET {self.column} = CASE\n    " + "\n    ".join(cases) + "\nEND\n"
+            f"OUTPUT inserted.DET_ID, inserted.{self.project_column}, deleted.{self.column}, inserted.{self.column}\n"
+            "INTO @Zmienione;\n"
+            "SELECT DET_ID, Numer_projektu, Stara_nazwa, Nowa_nazwa FROM @Zmienione ORDER BY DET_ID;"
+        )
+        params = [limit, self.wfcon_id, after_id] + condition_params + case_params
+        if len(params) > MAX_FILTER_PARAMS:
+            raise RuleError(
+                f"Zbyt wiele parametrów dla --pushdown ({len(params)}) - podziel reguły na mniejsze pliki."
+            )
+        return query, tuple(params)
+
+
+def load_rule_file(path):
+    """Wczytuje plik reguł JSON."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        raise RuleError(f"Niepoprawny plik reguł {path}: {e}")
+
+
+def load_rule_set(paths):
+    """Wczytuje pliki reguł i łączy je w jeden RuleSet (wszystkie muszą dotyczyć tej samej kolumny)."""
+    rules = []
+    titles = []
+    target = None
+    for path in paths:
+        definition = load_rule_file(path)
+        if not isinstance(definition, dict):
+            raise RuleError(f"Plik reguł musi zawierać obiekt JSON: {path}")
+        if "wfcon_id" not in definition:
+            raise RuleError(f"Brak 'wfcon_id' w pliku reguł: {path}")
+        try:
+            wfcon_id = int(definition["wfcon_id"])
+        except (TypeError, ValueError):
+            raise RuleError(f"Niepoprawne 'wfcon_id' ({definition['wfcon_id']!r}) w pliku reguł: {path}")
+        file_target = (
+            wfcon_id,
+            definition.get("project_column", DEFAULT_PROJECT_COLUMN),
+            definition.get("column", DEFAULT_COLUMN),
+        )
+        for identifier in file_target[1:]:
+            if not isinstance(identifier, str) or not IDENTIFIER_PATTERN.match(identifier):
+                raise RuleError(f"Niepoprawna nazwa kolumny '{identifier}' w pliku reguł: {path}")
+        if target is not None and file_target != target:
+            raise RuleError(
+                f"Plik {path} dotyczy innej konfiguracji lub kolumny niż poprzednie pliki - uruchom go osobno."
+            )
+        target = file_target
+        if not definition.get("rules") or not isinstance(definition["rules"], list):
+            raise RuleError(f"Brak reguł w pliku: {path}")
+        for rule_definition in definition["rules"]:
+            if not isinstance(rule_definition, dict):
+                raise RuleError(f"Reguła {len(rules) + 1} w pliku {path} musi być obiektem.")
+            rules.append(Rule(rule_definition, len(rules)))
+        titles.append(definition.get("title") or os.path.basename(path))
+
+    if target is None:
+        raise RuleError("Nie podano plików reguł.")
+    return RuleSet("; ".join(titles), target[0], target[1], target[2], rules)
+
+
+def find_changes(rows, rule_set):
+    """Jedno przejście po wierszach listy pozycji: zwraca rekordy zmienione przez reguły."""
+    records_to_change = []
+    for row in rows:
+        value = row.Nazwa_projektu
+        if not value:
+            continue
+        project = choice_name(row.Numer_projektu).strip()
+        result = rule_set.evaluate(project, value)
+        if result is None:
+            continue
+        rule, new_value = result
+        records_to_change.append({
+            "det_id": row.DET_ID,
+            "numer_projektu": row.Numer_projektu,
+            "old_nazwa": value,
+            "new_nazwa": new_value,
+            "rule": rule.name,
+        })
+    return records_to_change
+
+
+def run_pushdown(connection, cursor, committer, rule_set, mode):
+    """Wykonuje reguły jednym UPDATE ... OUTPUT po stronie serwera (--pushdown).
+
+    Zwraca rekordy raportu (check_pushdown_rows) z flagą rolled_back. W trybie testowym instrukcja jest
+    wykonywana, a transakcja wycofywana - raport pokazuje dokładne wartości przed i po zmianie.
+    Z --commit-every / --max-txn-seconds zmiana wykonywana jest porcjami TOP (n) po DET_ID, każda
+    w osobnej transakcji. Gdy wynik porcji różni się od reguł w Pythonie, niezatwierdzona transakcja
+    jest wycofywana, a kolejne porcje nie są wykonywane.
+    """
+    if mode == 'update' and committer.is_chunked:
+        batch_size = committer.chunk_size(DEFAULT_GROUP_BATCH_SIZE)
+    else:
+        batch_size = NO_LIMIT
+
+    changed = []
+    # Rekordy bieżącej (niezatwierdzonej) transakcji
+    pending = []
+    after_id = 0
+    while True:
+        query, params = rule_set.build_pushdown_update(batch_size, after_id)
+        if mode == 'update':
+            committer.begin()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        records = check_pushdown_rows(rows, rule_set)
+        changed.extend(records)
+        pending.extend(records)
+
+        if mode == 'update' and not all(record["consistent"] for record in records):
+            committer.rollback()
+            for record in pending:
+                record["rolled_back"] = True
+            console.print(
+                f"Wynik UPDATE różni się od reguł w Pythonie - wycofano {len(pending)} niezatwierdzonych zmian "
+                f"i przerwano zapis.",
+                style="bold red",
+            )
+            return changed
+
+        if mode == 'update':
+            committer.written(len(rows))
+            if not committer.pending_rows:
+                pending = []
+        if len(rows) < batch_size:
+            break
+        after_id = max(row.DET_ID for row in rows)
+
+    if mode != 'update':
+        connection.rollback()
+        for record in changed:
+            record["rolled_back"] = True
+    return changed
+
+
+def check_pushdown_rows(rows, rule_set):
+    """Porównuje wynik UPDATE ... OUTPUT z regułami w Pythonie. Zwraca rekordy raportu z flagą zgodności."""
+    records = []
+    for row in rows:
+        project = choice_name(row.Numer_projektu).strip()
+        result = rule_set.evaluate(project, row.Stara_nazwa or "")
+        records.append({
+            "det_id": row.DET_ID,
+            "numer_projektu": row.Numer_projektu,
+            "old_nazwa": row.Stara_nazwa,
+            "new_nazwa": row.Nowa_nazwa,
+            "rule": result[0].name if result else "",
+            "consistent": result is not None and result[1] == row.Nowa_nazwa,
+            "rolled_back": False,
+        })
+    return records
+
+
+def process_rules(
+    rule_files,
+    mode='test',
+    commit_every=None,
+    max_txn_seconds=None,
+    report="table",
+    report_file=None,
+    max_table_rows=DEFAULT_MAX_TABLE_ROWS,
+    pushdown=False,
+):
+    """Stosuje reguły z plików do listy pozycji w jednym odczycie i opcjonalnie zapisuje zmiany."""
+    connection = None
+    committer = None
+    updated_count = 0
+
+    try:
+        try:
+            rule_set = load_rule_set(rule_files)
+        except (OSError, RuleError) as ex:
+            console.print(f"Błąd wczytywania reguł: {ex}", style="bold red")
+            return
+
+        if pushdown:
+            blockers = [rule.name for rule in rule_set.rules if not rule.can_push_down()]
+            if blockers:
+                console.print(
+                    f"Reguły wymagające dopasowania w Pythonie (regex lub 'on': 'name') - uruchom bez --pushdown: "
+                    f"{', '.join(blockers)}",
+                    style="bold red",
+                )
+                return
+
+        conn_str = get_connection_string()
+        connection = pyodbc.connect(conn_str)
+        cursor = connection.cursor()
+        committer = ChunkedCommitter(connection, commit_every, max_txn_seconds, console)
+        rule_set.load_project_values(cursor)
+
+        if pushdown:
+            console.print(
+                f"Zmiana nazw po stronie serwera ({len(rule_set.rules)} reguł, UPDATE ... OUTPUT"
+                + (", transakcja zostanie wycofana" if mode != 'update' else "") + ")...",
+                style="bold blue",
+            )
+            records_to_change = run_pushdown(connection, cursor, committer, rule_set, mode)
+        else:
+            console.print(
+                f"Pobieranie i przetwarzanie listy pozycji ({len(rule_set.rules)} reguł, jeden odczyt)...",
+                style="bold blue",
+            )
+            query, params = rule_set.build_query()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+            if not rows:
+                console.print("Nie znaleziono żadnych pozycji pasujących do reguł.", style="bold red")
+                return
+
+            records_to_change = find_changes(rows, rule_set)
+
+        if not records_to_change:
+            console.print("Nie znaleziono projektów wymagających aktualizacji.", style="bold yellow")
+            return
+
+        report_sink = create_report_sink(
+            "reguly", f"Raport aktualizacji nazw ({rule_set.title})", REPORT_COLUMNS,
+            report, report_file, max_table_rows, status_column="Status",
+            show_header=True, header_style="bold magenta",
+        )
+
+        try:
+            if pushdown:
+                # Zapis wykonał już UPDATE ... OUTPUT - błąd oznaczałby wycofanie całej instrukcji
+                errors = [None] * len(records_to_change)
+            elif mode == 'update':
+                with Progress() as update_progress:
+                    update_task = update_progress.add_task("Aktualizacja rekordów...", total=len(records_to_change))
+                    errors = write_grouped(
+                        cursor, "WFELEMENTDETAILS", "DET_ID",
+                        [(record["det_id"], {rule_set.column: record["new_nazwa"]}) for record in records_to_change],
+                        committer.chunk_size(DEFAULT_GROUP_BATCH_SIZE), committer,
+                        update_progress, update_task, console=console,
+                    )
+            else:
+                errors = [None] * len(records_to_change)
+
+            for record, error in zip(records_to_change, errors):
+                if pushdown and not record["consistent"]:
+                    # Wynik z serwera różni się od dopasowania reguł w Pythonie - zmiana wycofana
+                    update_status = "[bold red]Niezgodne z regułami[/bold red]"
+                elif mode != 'update':
+                    update_status = "Oczekuje (tryb testowy)"
+                elif pushdown and record["rolled_back"]:
+                    update_status = "[bold yellow]Wycofano[/bold yellow]"
+                elif error is None:
+                    update_status = "[bold green]Zaktualizowano[/bold green]"
+                    updated_count += 1
+                else:
+                    update_status = error_status(error)
+
+                report_sink.add_row(
+                    str(record["det_id"]),
+                    record["numer_projektu"],
+                    Diff(record["old_nazwa"], record["new_nazwa"]),
+                    record["rule"],
+                    update_status
+                )
+        finally:
+            report_sink.close(console)
+
+        if mode == 'update':
+            committer.finish()
+            console.print(f"Zakończono. Zaktualizowano {updated_count} rekordów.", style="bold green")
+        else:
+            console.print(f"Tryb testowy zakończony. {len(records_to_change)} rekordów zostałoby zaktualizowanych.", style="bold yellow")
+
+    except pyodbc.Error as ex:
+        console.print(f"Błąd bazy danych. SQLSTATE: {ex.args[0]}", style="bold red")
+        console.print(f"Pełny komunikat błędu: {ex}", style="bold red")
+        if connection:
+            connection.rollback()
+        if committer and committer.committed_rows:
+            console.print(f"Przed błędem zatwierdzono {committer.committed_rows} rekordów.", style="bold yellow")
+    except Exception as e:
+        console.print(f"Wystąpił nieoczekiwany błąd w skrypcie: {e}", style="bold red")
+    finally:
+        if connection:
+            connection.close()
+            console.print("\nPołączenie z bazą danych zostało zamknięte.", style="bold blue")
+
+
+def run_cli(description, rule_files=None):
+    """Wspólny interfejs wiersza poleceń silnika reguł i skryptów opartych na plikach reguł.
+
+    Bez rule_files pliki reguł podawane są jako argumenty pozycyjne.
+    """
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawTextHelpFormatter)
+    if rule_files is None:
+        parser.add_argument(
+            "rule_files",
+            nargs="+",
+            help="Pliki reguł JSON (np. rules/pan_kaj.json). Reguły z wielu plików stosowane są w jednym odczycie.",
+        )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Uruchamia skrypt w trybie aktualizacji. Domyślnie działa w trybie testowym."
+    )
+    parser.add_argument(
+        "--pushdown",
+        action="store_true",
+        help="Zmiana nazw jedną instrukcją UPDATE ... OUTPUT po stronie serwera (REPLACE / dopisanie).\n"
+             "W trybie testowym instrukcja wykonywana jest w wycofywanej transakcji.\n"
+             "Tylko dla reguł z dopasowaniem LIKE na całej wartości."
+    )
+
+    add_commit_arguments(parser)
+    add_report_arguments(parser)
+
+    args = parser.parse_args()
+
+    error = validate_commit_arguments(args) or validate_report_arguments(args)
+    if error:
+        parser.error(error)
+
+    mode = 'test'
+    if args.update:
+        mode = 'update'
+        console.print("UWAGA: Ta operacja zaktualizuje rekordy w bazie danych.", style="bold yellow")
+        if input("Czy na pewno chcesz kontynuować? (tak/nie): ").lower() != 'tak':
+            console.print("Operacja anulowana przez użytkownika.", style="bold red")
+            exit()
+
+    process_rules(
+        rule_files if rule_files is not None else args.rule_files,
+        mode=mode,
+        commit_every=args.commit_every,
+        max_txn_seconds=args.max_txn_seconds,
+        report=args.report,
+        report_file=args.report_file,
+        max_table_rows=args.max_table_rows,
+        pushdown=args.pushdown,
+    )
+
+
+if __name__ == "__main__":
+    run_cli(
+        "Stosuje reguły zmiany nazw z plików JSON do listy pozycji (WFELEMENTDETAILS) w jednym odczycie.\n\n"
+        "Każda reguła ma listę numerów projektów, dopasowanie (LIKE i/lub regex, na całej wartości\n"
+        "lub na nazwie po '#') oraz akcję (replace / append). Stosowana jest pierwsza pasująca reguła."
+    )
@@ -5,6 +5,9 @@ from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress
 import argparse
+from sql_registry import SqlTemplateError, get_template
+from commit_control import ChunkedCommitter, add_commit_arguments, validate_commit_arguments
+from row_decoding import TEXT, Column, RowDecoder
 
 # Załadowanie zmiennych środowiskowych
 load_dotenv()
@@ -18,8 +21,18 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-# Ścieżka do pliku SQL z zapytaniem pobierającym kontrahentów z bazy
-SQL_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "sql_kontrahenci.sql")
+# Szablon SQL (sql_registry) z zapytaniem pobierającym kontrahentów z bazy
+SQL_TEMPLATE_NAME = "sql/sql_kontrahenci.sql"
+
+# Szablony SQL dla --pushdown: filtr po TypKontrahenta oraz UPDATE ... OUTPUT po stronie serwera
+PUSHDOWN_SELECT_SQL = "sql/kontrahenci_typ_select.sql"
+PUSHDOWN_UPDATE_SQL = "sql/kontrahenci_typ_update.sql"
+
+# UPDATE TOP (n) bez ograniczenia (maksymalna wartość int)
+NO_LIMIT = 2147483647
+
+# Wielkość porcji UPDATE TOP (n) dla --max-txn-seconds bez --commit-every
+PUSHDOWN_BATCH_SIZE = 1000
 
 # Wartość do zamiany
 OLD_VALUE = "NEWDIC/f735d189-8ba1-470f-8254-dc3280e490f2#pusty"
@@ -28,6 +41,19 @@ NEW_VALUE = "f735d189-8ba1-470f-8254-dc3280e490f2#----"
 # Kolumna bazy danych — TypKontrahenta
 DB_COLUMN = "WFD_AttChoose3"
 
+# Kolumny zapytania dekodowane do rekordu (row_decoding.RowDecoder)
+KONTRAHENCI_COLUMNS = (
+    Column("WFD_Signature", "WFD_Signature"),
+    Column("NazwaKontrahenta", "NazwaKontrahenta", TEXT),
+    Column("NIP", "NIP", TEXT),
+    Column("TypKontrahenta", "TypKontrahenta", TEXT),
+)
+
+# Kolumny wierszy zwracanych przez UPDATE ... OUTPUT (--pushdown)
+OUTPUT_COLUMNS = KONTRAHENCI_COLUMNS + (
+    Column("NowyTypKontrahenta", "NowyTypKontrahenta", TEXT),
+)
+
 
 def get_connection_string():
     """Tworzy connection string w zależności od metody uwierzytelniania."""
@@ -37,12 +63,6 @@ def get_connection_string():
         return f"DRIVER={{ODBC Driver 18 for SQL Server}};SERVER={DB_SERVER};DATABASE={DB_NAME};Trusted_Connection=yes;TrustServerCertificate=yes;"
 
 
-def get_sql_from_file(file_path):
-    """Wczytuje zapytanie SQL z pliku."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
-
-
 def update_record(cursor, wfd_signature, new_value):
     """Aktualizuje TypKontrahenta w tabeli WFElements po WFD_Signature."""
     cursor.execute(
@@ -52,24 +72,126 @@ def update_record(cursor, wfd_signature, new_value):
     )
 
 
-def process_typ_kontrahenta(mode='test'):
+def create_report_table(with_types=False):
+    """Tworzy tabelę raportu aktualizacji. with_types: kolumny z TypKontrahenta przed i po zmianie (--pushdown)."""
+    table = Table(title="Raport aktualizacji TypKontrahenta ('pusty' -> '----')", show_header=True, header_style="bold magenta")
+    table.add_column("Sygnatura", style="dim", width=15)
+    table.add_column("Nazwa kontrahenta", width=50)
+    table.add_column("NIP", width=18)
+    if with_types:
+        table.add_column("Typ przed", width=30)
+        table.add_column("Typ po", width=30)
+    table.add_column("Status", style="yellow", width=20)
+    return table
+
+
+def execute_pushdown_template(cursor, name, **values):
+    """Wykonuje szablon --pushdown, przekazując wartości parametrów #{...}# po nazwie."""
+    template = get_template(name)
+    template.execute(cursor, *(values[placeholder] for placeholder in template.placeholders))
+    return cursor.fetchall()
+
+
+def fetch_pushdown_candidates(cursor):
+    """Pobiera tylko kontrahentów z TypKontrahenta = OLD_VALUE (filtr po stronie serwera)."""
+    rows = execute_pushdown_template(cursor, PUSHDOWN_SELECT_SQL, StaraWartosc=OLD_VALUE)
+    return RowDecoder(cursor.description, KONTRAHENCI_COLUMNS, "KontrahentRow").decode_all(rows)
+
+
+def update_pushdown(cursor, limit):
+    """Zamienia OLD_VALUE na NEW_VALUE jedną instrukcją UPDATE TOP (limit). Zwraca zmienione rekordy (OUTPUT)."""
+    rows = execute_pushdown_template(
+        cursor, PUSHDOWN_UPDATE_SQL, Limit=limit, NowaWartosc=NEW_VALUE, StaraWartosc=OLD_VALUE
+    )
+    return RowDecoder(cursor.description, OUTPUT_COLUMNS, "ZmienionyKontrahent").decode_all(rows)
+
+
+def process_pushdown(cursor, committer, mode):
+    """--pushdown: filtr (tryb testowy) albo UPDATE ... OUTPUT wykonywane po stronie serwera.
+
+    Bez --commit-every / --max-txn-seconds cała zamiana to jedno wywołanie. Przy dzieleniu transakcji
+    UPDATE TOP (n) jest powtarzane do wyczerpania pasujących rekordów - zmienione rekordy
+    nie spełniają już warunku, więc kolejne porcje obejmują kolejne rekordy.
+    """
+    table = create_report_table(with_types=True)
+
+    if mode not in ('update', 'single'):
+        console.print("Wyszukiwanie kontrahentów do aktualizacji (filtr po stronie serwera)...", style="bold blue")
+        records = fetch_pushdown_candidates(cursor)
+        if not records:
+            console.print("Nie znaleziono kontrahentów z TypKontrahenta = 'pusty'.", style="bold yellow")
+            return
+
+        for record in records:
+            table.add_row(
+                str(record.WFD_Signature), record.NazwaKontrahenta, record.NIP,
+                record.TypKontrahenta, NEW_VALUE, "Oczekuje (tryb testowy)"
+            )
+        console.print(table)
+        console.print(f"Tryb testowy zakończony. {len(records)} rekordów zostałoby zaktualizowanych.", style="bold yellow")
+        return
+
+    limit = 30 if mode == 'single' else None
+    batch_size = committer.chunk_size(PUSHDOWN_BATCH_SIZE) if committer.is_chunked else NO_LIMIT
+    changed = []
+
+    console.print("Aktualizacja rekordów po stronie serwera...", style="bold blue")
+    while limit is None or len(changed) < limit:
+        top = batch_size if limit is None else min(batch_size, limit - len(changed))
+        committer.begin()
+        batch = update_pushdown(cursor, top)
+        committer.written(len(batch))
+        changed.extend(batch)
+        if len(batch) < top:
+            break
+
+    committer.finish()
+
+    if not changed:
+        console.print("Nie znaleziono kontrahentów z TypKontrahenta = 'pusty'.", style="bold yellow")
+        return
+
+    for record in changed:
+        # Wartości przed i po zmianie z OUTPUT deleted / inserted
+        table.add_row(
+            str(record.WFD_Signature), record.NazwaKontrahenta, record.NIP,
+            record.TypKontrahenta, record.NowyTypKontrahenta, "[bold green]Zaktualizowano[/bold green]"
+        )
+    console.print(table)
+
+    if mode == 'update':
+        console.print(f"Zakończono. Zaktualizowano {len(changed)} rekordów.", style="bold green")
+    else:
+        console.print(f"Tryb testowy (single). Zaktualizowano {len(changed)} z maks. 30 rekordów.", style="bold green")
+
+
+def process_typ_kontrahenta(mode='test', commit_every=None, max_txn_seconds=None, pushdown=False):
     """Znajduje kontrahentów z TypKontrahenta = 'pusty' i zamienia na '----'."""
     connection = None
+    committer = None
     updated_count = 0
     records_to_change = []
 
     try:
         # 1. Wczytanie zapytania SQL
-        if not os.path.exists(SQL_FILE_PATH):
-            console.print(f"Nie znaleziono pliku SQL: {SQL_FILE_PATH}", style="bold red")
+        try:
+            sql_query = get_template(SQL_TEMPLATE_NAME).text
+            if pushdown:
+                get_template(PUSHDOWN_SELECT_SQL)
+                get_template(PUSHDOWN_UPDATE_SQL)
+        except (OSError, SqlTemplateError) as ex:
+            console.print(f"Błąd wczytywania pliku SQL: {ex}", style="bold red")
             return
 
-        sql_query = get_sql_from_file(SQL_FILE_PATH)
-
         # 2. Połączenie z bazą i pobranie kontrahentów
         conn_str = get_connection_string()
         connection = pyodbc.connect(conn_str)
         cursor = connection.cursor()
+        committer = ChunkedCommitter(connection, commit_every, max_txn_seconds, console)
+
+        if pushdown:
+            process_pushdown(cursor, committer, mode)
+            return
 
         console.print("Pobieranie kontrahentów z bazy danych...", style="bold blue")
         cursor.execute(sql_query)
@@ -80,6 +202,7 @@ def process_typ_kontrahenta(mode='test'):
             return
 
         console.print(f"Pobrano {len(db_rows)} kontrahentów z bazy danych.", style="bold blue")
+        db_rows = RowDecoder(cursor.description, KONTRAHENCI_COLUMNS, "KontrahentRow").decode_all(db_rows)
 
         # 3. Filtrowanie rekordów z TypKontrahenta = OLD_VALUE
         with Progress() as progress:
@@ -88,12 +211,11 @@ def process_typ_kontrahenta(mode='test'):
             for db_row in db_rows:
                 progress.advance(task)
 
-                typ_kontrahenta = getattr(db_row, "TypKontrahenta", None) or ""
-                if typ_kontrahenta == OLD_VALUE:
+                if db_row.TypKontrahenta == OLD_VALUE:
                     records_to_change.append({
                         "wfd_signature": db_row.WFD_Signature,
-                        "nazwa": db_row.NazwaKontrahenta or "",
-                        "nip": db_row.NIP or "",
+                        "nazwa": db_row.NazwaKontrahenta,
+                        "nip": db_row.NIP,
                     })
 
         if not records_to_change:
@@ -103,11 +225,7 @@ def process_typ_kontrahenta(mode='test'):
         console.print(f"Znaleziono {len(records_to_change)} rekordów do aktualizacji.\n", style="bold green")
 
         # 4. Aktualizacja i wyświetlenie raportu
-        table = Table(title="Raport aktualizacji TypKontrahenta ('pusty' -> '----')", show_header=True, header_style="bold magenta")
-        table.add_column("Sygnatura", style="dim", width=15)
-        table.add_column("Nazwa kontrahenta", width=50)
-        table.add_column("NIP", width=18)
-        table.add_column("Status", style="yellow", width=20)
+        table = create_report_table()
 
         if mode in ('update', 'single'):
             limit = 30 if mode == 'single' else len(records_to_change)
@@ -115,7 +233,8 @@ def process_typ_kontrahenta(mode='test'):
                 update_task = update_progress.add_task("Aktualizacja rekordów...", total=limit)
                 for record in records_to_change:
                     try:
-                        update_record(cursor, record["wfd_signature"], NEW_VALUE)
+                        with committer.write():
+                            update_record(cursor, record["wfd_signature"], NEW_VALUE)
                         update_status = "[bold green]Zaktualizowano[/bold green]"
                         updated_count += 1
                     except Exception as e:
@@ -144,10 +263,10 @@ def process_typ_kontrahenta(mode='test'):
         console.print(table)
 
         if mode == 'update':
-            connection.commit()
+            committer.finish()
             console.print(f"Zakończono. Zaktualizowano {updated_count} rekordów.", style="bold green")
         elif mode == 'single':
-            connection.commit()
+            committer.finish()
             console.print(f"Tryb testowy (single). Zaktualizowano {updated_count} z maks. 30 rekordów.", style="bold green")
         else:
             console.print(f"Tryb testowy zakończony. {len(records_to_change)} rekordów zostałoby zaktualizowanych.", style="bold yellow")
@@ -157,6 +276,8 @@ def process_typ_kontrahenta(mode='test'):
         console.print(f"Pełny komunikat błędu: {ex}", style="bold red")
         if connection:
             connection.rollback()
+        if committer and committer.committed_rows:
+            console.print(f"Przed błędem zatwierdzono {committer.committed_rows} rekordów.", style="bold yellow")
     except Exception as e:
         console.print(f"Wystąpił nieoczekiwany błąd w skrypcie: {e}", style="bold red")
     finally:
@@ -185,8 +306,21 @@ if __name__ == "__main__":
         help="Aktualizuj WSZYSTKIE pasujące rekordy w bazie danych."
     )
 
+    parser.add_argument(
+        "--pushdown",
+        action="store_true",
+        help="Filtr i zamiana po stronie serwera: tryb testowy pobiera tylko pasujące rekordy,\n"
+             "--update/--single wykonują jedną instrukcję UPDATE ... OUTPUT (raport z jej wyniku)."
+    )
+
+    add_commit_arguments(parser)
+
     args = parser.parse_args()
 
+    error = validate_commit_arguments(args)
+    if error:
+        parser.error(error)
+
     mode = 'test'
     if args.single:
         mode = 'single'
@@ -201,4 +335,9 @@ if __name__ == "__main__":
             console.print("Operacja anulowana przez użytkownika.", style="bold red")
             exit()
 
-    process_typ_kontrahenta(mode=mode)
+    process_typ_kontrahenta(
+        mode=mode,
+        commit_every=args.commit_every,
+        max_txn_seconds=args.max_txn_seconds,
+        pushdown=args.pushdown,
+    )
@@ -1,11 +1,18 @@
 import os
+import sys
 import csv
+import hashlib
 import pyodbc
 from dotenv import load_dotenv
 from rich.console import Console
-from rich.table import Table
 from rich.progress import Progress
 import argparse
+from sql_registry import SqlTemplateError, get_template
+from commit_control import ChunkedCommitter, add_commit_arguments, validate_commit_arguments
+from bulk_writer import DEFAULT_GROUP_BATCH_SIZE, write_grouped
+from row_decoding import TEXT, Column, RowDecoder
+from dimension_cache import read_cache, write_cache
+from report_sink import DEFAULT_MAX_TABLE_ROWS, DiffList, add_report_arguments, create_report_sink, error_status, validate_report_arguments
 
 # Załadowanie zmiennych środowiskowych
 load_dotenv()
@@ -22,8 +29,13 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 # Ścieżka do pliku CSV z danymi kontrahentów
 CSV_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dane_kontrahenci", "kontrahenci_mapped_PROD.csv")
 
-# Ścieżka do pliku SQL z zapytaniem pobierającym kontrahentów z bazy
-SQL_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "sql_kontrahenci.sql")
+# Nazwa pliku pamięci podręcznej (.cache/) z przetworzonym CSV
+CSV_CACHE_NAME = "kontrahenci_csv"
+# Wersja parse_csv_data zapisywana w pamięci podręcznej - zmiana parsera unieważnia wcześniejsze wyniki
+CSV_PARSER_VERSION = 3
+
+# Szablon SQL (sql_registry) z zapytaniem pobierającym kontrahentów z bazy
+SQL_TEMPLATE_NAME = "sql/sql_kontrahenci.sql"
 
 # Mapowanie kolumn CSV na kolumny bazy danych (WFElements)
 # CSV kolumna -> DB kolumna
@@ -34,6 +46,52 @@ CSV_TO_DB_MAPPING = {
     "Typ kontrahenta": "WFD_AttChoose3",
 }
 
+# Kolumny zapytania dekodowane do rekordu (row_decoding.RowDecoder).
+# Pola wyboru dostępne są pod nazwami kolumn bazy, tak jak w CSV_TO_DB_MAPPING.
+KONTRAHENCI_COLUMNS = (
+    Column("WFD_Signature", "WFD_Signature"),
+    Column("NazwaKontrahenta", "NazwaKontrahenta", TEXT),
+    Column("NIP", "NIP", TEXT),
+    Column("WFD_AttChoose12", "GrupaFirm", TEXT),
+    Column("WFD_AttChoose4", "Branza", TEXT),
+    Column("WFD_AttChoose2", "ProfilKontrahenta", TEXT),
+    Column("WFD_AttChoose3", "TypKontrahenta", TEXT),
+)
+
+
+# Tryb --server-diff: dane CSV w tabeli tymczasowej, porównanie w jednym zapytaniu po stronie serwera
+SERVER_DIFF_SQL = "sql/kontrahenci_server_diff.sql"
+STAGING_TABLE = "#KontrahenciCsv"
+
+# Kolumna CSV -> kolumna tabeli tymczasowej i aliasy w kontrahenci_server_diff.sql (obecna, nowa wartość)
+SERVER_DIFF_COLUMNS = {
+    "Grupa firm": ("GrupaFirm", "NowaGrupaFirm"),
+    "Branża": ("Branza", "NowaBranza"),
+    "Profil kontrahenta": ("ProfilKontrahenta", "NowyProfilKontrahenta"),
+    "Typ kontrahenta": ("TypKontrahenta", "NowyTypKontrahenta"),
+}
+
+# Pobieranie kontrahentów tylko dla NIP-ów z CSV (--fetch filtered/auto)
+NIP_CHUNK_SIZE = 600  # Trzy parametry na NIP (z prefiksem 'PL', bez, znormalizowany), limit SQL Server to 2100
+# --fetch auto: powyżej tego udziału NIP-ów z CSV w liczbie kontrahentów wykonywany jest pełny odczyt
+FILTERED_FETCH_MAX_RATIO = 0.2
+# Normalizacja NIP w SQL zgodna z normalize_nip i sql/kontrahenci_server_diff.sql
+# (obcięcie spacji, usunięcie prefiksu 'PL')
+NIP_NORMALIZED_SQL = (
+    "CASE WHEN UPPER(LEFT(LTRIM(RTRIM(D.WFD_AttText3)), 2)) = 'PL' "
+    "THEN SUBSTRING(LTRIM(RTRIM(D.WFD_AttText3)), 3, 4000) "
+    "ELSE LTRIM(RTRIM(D.WFD_AttText3)) END"
+)
+
+# Kolumny raportu (nagłówek, opcje kolumny tabeli)
+REPORT_COLUMNS = [
+    ("Sygnatura", {"style": "dim", "width": 15}),
+    ("Nazwa kontrahenta", {"width": 40}),
+    ("NIP", {"width": 18}),
+    ("Zmiany", {"width": 60}),
+    ("Status", {"style": "yellow", "width": 20}),
+]
+
 
 def get_connection_string():
     """Tworzy connection string w zależności od metody uwierzytelniania."""
@@ -43,12 +101,6 @@ def get_connection_string():
         return f"DRIVER={{ODBC Driver 18 for SQL Server}};SERVER={DB_SERVER};DATABASE={DB_NAME};Trusted_Connection=yes;TrustServerCertificate=yes;"
 
 
-def get_sql_from_file(file_path):
-    """Wczytuje zapytanie SQL z pliku."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
-
-
 def normalize_nip(nip):
     """Normalizuje NIP — usuwa prefiks 'PL' i białe znaki."""
     if not nip:
@@ -59,16 +111,45 @@ def normalize_nip(nip):
     return nip
 
 
-def load_csv_data(csv_path):
-    """Wczytuje dane kontrahentów z pliku CSV. Klucz = znormalizowany NIP."""
+def file_sha256(path):
+    """Skrót SHA-256 zawartości pliku (czytanego porcjami)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_csv_data(csv_path):
+    """Parsuje plik CSV strumieniowo (csv.reader, wiersz po wierszu). Klucz = znormalizowany NIP.
+
+    Zwraca (dane, liczba pominiętych, liczba duplikatów). Powtarzające się wartości pól wyboru są
+    współdzielone (sys.intern), więc duże pliki nie trzymają tysięcy kopii tych samych tekstów.
+    """
     csv_data = {}
     skipped_count = 0
     duplicate_count = 0
 
-    with open(csv_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f, delimiter=';')
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f, delimiter=';')
+        header = next(reader, None)
+        if header is None:
+            return csv_data, skipped_count, duplicate_count
+        positions = {name: i for i, name in enumerate(header)}
+
+        def column(row, name):
+            position = positions.get(name)
+            if position is None or position >= len(row):
+                return ""
+            return row[position].strip()
+
         for row in reader:
-            raw_nip = row.get("NIP", "").strip()
+            # Całkowicie puste linie (np. na końcu pliku) nie są rekordami - pomija je także csv.DictReader.
+            # Linie z samymi separatorami lub spacjami liczone są jako rekordy bez NIP.
+            if not row:
+                continue
+
+            raw_nip = column(row, "NIP")
             if not raw_nip:
                 skipped_count += 1
                 continue
@@ -82,14 +163,36 @@ def load_csv_data(csv_path):
                 duplicate_count += 1
 
             csv_data[normalized] = {
-                "nazwa": row.get("Nazwa kontrahenta", "").strip(),
+                "nazwa": column(row, "Nazwa kontrahenta"),
                 "raw_nip": raw_nip,
-                "Grupa firm": row.get("Grupa firm", "").strip(),
-                "Branża": row.get("Branża", "").strip(),
-                "Profil kontrahenta": row.get("Profil kontrahenta", "").strip(),
-                "Typ kontrahenta": row.get("Typ kontrahenta", "").strip(),
+                "Grupa firm": sys.intern(column(row, "Grupa firm")),
+                "Branża": sys.intern(column(row, "Branża")),
+                "Profil kontrahenta": sys.intern(column(row, "Profil kontrahenta")),
+                "Typ kontrahenta": sys.intern(column(row, "Typ kontrahenta")),
             }
 
+    return csv_data, skipped_count, duplicate_count
+
+
+def load_csv_data(csv_path):
+    """Wczytuje dane kontrahentów z pliku CSV. Klucz = znormalizowany NIP.
+
+    Wynik parsowania zapisywany jest w .cache/ razem ze skrótem SHA-256 pliku i wersją parsera - kolejne
+    uruchomienia na niezmienionym pliku (test, --single, --update) pomijają parsowanie.
+    """
+    sha256 = file_sha256(csv_path)
+    cached, _ = read_cache(CSV_CACHE_NAME, ttl_minutes=None)
+    if cached is not None and cached.get("sha256") == sha256 and cached.get("parser") == CSV_PARSER_VERSION:
+        csv_data, skipped_count, duplicate_count = cached["result"]
+        console.print("Dane CSV wczytane z pamięci podręcznej (plik bez zmian).", style="dim")
+    else:
+        csv_data, skipped_count, duplicate_count = parse_csv_data(csv_path)
+        write_cache(CSV_CACHE_NAME, {
+            "sha256": sha256,
+            "parser": CSV_PARSER_VERSION,
+            "result": (csv_data, skipped_count, duplicate_count),
+        })
+
     console.print(f"Wczytano {len(csv_data)} kontrahentów z CSV.", style="bold blue")
     if skipped_count:
         console.print(f"Pominięto {skipped_count} rekordów bez NIP.", style="yellow")
@@ -111,31 +214,160 @@ def find_fields_to_update(db_row, csv_record):
             continue
 
         # Pobierz aktualną wartość z bazy
-        db_value = getattr(db_row, db_col, None) or ""
+        db_value = getattr(db_row, db_col)
 
         if csv_value != db_value:
             updates[db_col] = csv_value
-            details.append(f"{csv_col}: '{db_value}' -> '{csv_value}'")
+            details.append((csv_col, db_value, csv_value))
 
     return updates, details
 
 
-def update_record(cursor, wfd_signature, updates):
-    """Aktualizuje rekord kontrahenta w tabeli WFElements po WFD_Signature."""
-    set_clauses = []
-    params = []
-    for col, val in updates.items():
-        set_clauses.append(f"{col} = ?")
-        params.append(val)
+def compare_with_csv(db_rows, csv_data):
+    """Dopasowuje kontrahentów z bazy do CSV po NIP. Zwraca (rekordy do zmiany, dopasowani, bez zmian)."""
+    records_to_change = []
+    matched_count = 0
+    no_changes_count = 0
+
+    with Progress() as progress:
+        task = progress.add_task("Porównywanie danych...", total=len(db_rows))
+
+        for db_row in db_rows:
+            db_nip = normalize_nip(db_row.NIP)
+            progress.advance(task)
+
+            if not db_nip:
+                continue
+
+            csv_record = csv_data.get(db_nip)
+            if not csv_record:
+                continue
+
+            matched_count += 1
+            updates, details = find_fields_to_update(db_row, csv_record)
+
+            if not updates:
+                no_changes_count += 1
+                continue
 
-    params.append(wfd_signature)
-    query = f"UPDATE WFElements SET {', '.join(set_clauses)} WHERE WFD_Signature = ?"
-    cursor.execute(query, tuple(params))
+            records_to_change.append({
+                "wfd_signature": db_row.WFD_Signature,
+                "nazwa": db_row.NazwaKontrahenta,
+                "nip": db_row.NIP,
+                "updates": updates,
+                "details": details,
+            })
 
+    return records_to_change, matched_count, no_changes_count
 
-def process_kontrahenci(mode='test'):
+
+def count_contractors(cursor, sql_query):
+    """Zwraca liczbę kontrahentów zwracanych przez zapytanie bazowe."""
+    cursor.execute(f"SELECT COUNT(*) FROM (\n{sql_query.rstrip().rstrip(';')}\n) AS Kontrahenci")
+    return cursor.fetchone()[0]
+
+
+def fetch_contractors(cursor, sql_query, csv_data, strategy="auto"):
+    """Pobiera kontrahentów: wszystkich (full) albo tylko z NIP-ami z CSV (filtered) - porcjami list IN.
+
+    auto wybiera full, gdy NIP-y z CSV stanowią więcej niż FILTERED_FETCH_MAX_RATIO kontrahentów.
+    """
+    nips = sorted(csv_data)
+    if strategy == "auto":
+        total = count_contractors(cursor, sql_query)
+        strategy = "full" if total and len(nips) > total * FILTERED_FETCH_MAX_RATIO else "filtered"
+        console.print(
+            f"Kontrahentów w bazie: {total}, NIP-ów w CSV: {len(nips)} - odczyt: {strategy}.", style="dim"
+        )
+
+    if strategy == "full":
+        cursor.execute(sql_query)
+        return cursor.fetchall()
+
+    # Warunek doklejany w nowej linii - zapytanie bazowe może kończyć się komentarzem
+    base_query = sql_query.rstrip().rstrip(";")
+    db_rows = []
+    for start in range(0, len(nips), NIP_CHUNK_SIZE):
+        chunk = nips[start:start + NIP_CHUNK_SIZE]
+        # Warunek na surowej kolumnie (bez wyrażenia, które wyłącza indeks). '=' w SQL Server pomija
+        # spacje na końcu, a wartości ze spacjami na początku sprawdzane są normalizacją jak w trybie full.
+        # Dokładne dopasowanie po normalize_nip i tak wykonuje compare_with_csv.
+        variants = [variant for nip in chunk for variant in (nip, "PL" + nip)]
+        cursor.execute(
+            f"{base_query}\n    AND (D.WFD_AttText3 IN ({', '.join('?' for _ in variants)})"
+            f"\n        OR (D.WFD_AttText3 LIKE ' %' AND {NIP_NORMALIZED_SQL} IN ({', '.join('?' for _ in chunk)})))",
+            tuple(variants + chunk),
+        )
+        db_rows.extend(cursor.fetchall())
+    return db_rows
+
+
+def stage_csv_data(cursor, csv_data):
+    """Ładuje dane CSV (znormalizowany NIP + cztery pola) do tabeli tymczasowej przez fast_executemany."""
+    value_columns = [staged for staged, _ in SERVER_DIFF_COLUMNS.values()]
+    definitions = ", ".join(
+        f"{col} NVARCHAR(4000) COLLATE Latin1_General_BIN2 NULL" for col in value_columns
+    )
+    cursor.execute(f"IF OBJECT_ID('tempdb..{STAGING_TABLE}') IS NOT NULL DROP TABLE {STAGING_TABLE}")
+    cursor.execute(
+        f"CREATE TABLE {STAGING_TABLE} (NIP NVARCHAR(50) COLLATE Latin1_General_BIN2 PRIMARY KEY, {definitions})"
+    )
+    rows = [
+        # Pusta wartość w CSV = NULL, czyli pole nie jest porównywane (jak w find_fields_to_update)
+        [nip] + [record.get(csv_col) or None for csv_col in SERVER_DIFF_COLUMNS]
+        for nip, record in csv_data.items()
+    ]
+    placeholders = ", ".join("?" for _ in range(1 + len(value_columns)))
+    cursor.fast_executemany = True
+    try:
+        cursor.executemany(
+            f"INSERT INTO {STAGING_TABLE} (NIP, {', '.join(value_columns)}) VALUES ({placeholders})", rows
+        )
+    finally:
+        cursor.fast_executemany = False
+
+
+def fetch_server_diff(cursor, csv_data):
+    """Porównuje dane po stronie serwera i pobiera tylko kontrahentów do zmiany.
+
+    Zwraca (rekordy do zmiany, liczba dopasowanych po NIP). Zapytanie zwraca dwa zestawy wyników:
+    najpierw liczbę dopasowanych, potem wiersze ze zmianami.
+    """
+    stage_csv_data(cursor, csv_data)
+    get_template(SERVER_DIFF_SQL).execute(cursor)
+    matched_count = cursor.fetchone()[0]
+    cursor.nextset()
+    rows = cursor.fetchall()
+    columns = [column[0] for column in cursor.description] if rows else []
+
+    records_to_change = []
+    for row in rows:
+        values = dict(zip(columns, row))
+        updates = {}
+        details = []
+        for csv_col, (current_col, new_col) in SERVER_DIFF_COLUMNS.items():
+            db_value = values[current_col] or ""
+            csv_value = values[new_col]
+            if csv_value and csv_value != db_value:
+                updates[CSV_TO_DB_MAPPING[csv_col]] = csv_value
+                details.append((csv_col, db_value, csv_value))
+        if updates:
+            records_to_change.append({
+                "wfd_signature": values["WFD_Signature"],
+                "nazwa": values["NazwaKontrahenta"] or "",
+                "nip": values["NIP"] or "",
+                "updates": updates,
+                "details": details,
+            })
+    return records_to_change, matched_count
+
+
+def process_kontrahenci(mode='test', commit_every=None, max_txn_seconds=None,
+                        report='table', report_file=None, max_table_rows=DEFAULT_MAX_TABLE_ROWS,
+                        server_diff=False, fetch='auto'):
     """Nawiązuje połączenie z bazą danych, porównuje dane z CSV i opcjonalnie aktualizuje kontrahentów."""
     connection = None
+    committer = None
     updated_count = 0
     records_to_change = []
 
@@ -151,62 +383,39 @@ def process_kontrahenci(mode='test'):
             return
 
         # 2. Wczytanie zapytania SQL
-        if not os.path.exists(SQL_FILE_PATH):
-            console.print(f"Nie znaleziono pliku SQL: {SQL_FILE_PATH}", style="bold red")
+        try:
+            sql_query = get_template(SQL_TEMPLATE_NAME).text
+        except (OSError, SqlTemplateError) as ex:
+            console.print(f"Błąd wczytywania pliku SQL: {ex}", style="bold red")
             return
 
-        sql_query = get_sql_from_file(SQL_FILE_PATH)
-
         # 3. Połączenie z bazą i pobranie kontrahentów
         conn_str = get_connection_string()
         connection = pyodbc.connect(conn_str)
         cursor = connection.cursor()
+        committer = ChunkedCommitter(connection, commit_every, max_txn_seconds, console)
 
-        console.print("Pobieranie kontrahentów z bazy danych...", style="bold blue")
-        cursor.execute(sql_query)
-        db_rows = cursor.fetchall()
-
-        if not db_rows:
-            console.print("Nie znaleziono żadnych kontrahentów w bazie danych.", style="bold red")
-            return
-
-        console.print(f"Pobrano {len(db_rows)} kontrahentów z bazy danych.", style="bold blue")
-
-        # 4. Porównanie i przygotowanie listy aktualizacji
-        matched_count = 0
-        no_changes_count = 0
-
-        with Progress() as progress:
-            task = progress.add_task("Porównywanie danych...", total=len(db_rows))
-
-            for db_row in db_rows:
-                db_nip = normalize_nip(db_row.NIP)
-                progress.advance(task)
-
-                if not db_nip:
-                    continue
-
-                csv_record = csv_data.get(db_nip)
-                if not csv_record:
-                    continue
+        if server_diff:
+            console.print("Porównywanie danych CSV z bazą po stronie serwera...", style="bold blue")
+            records_to_change, matched_count = fetch_server_diff(cursor, csv_data)
+            console.print(f"\nDopasowano {matched_count} kontrahentów po NIP.", style="bold blue")
+            console.print(f"Bez zmian: {matched_count - len(records_to_change)} rekordów.", style="dim")
+        else:
+            console.print("Pobieranie kontrahentów z bazy danych...", style="bold blue")
+            db_rows = fetch_contractors(cursor, sql_query, csv_data, fetch)
 
-                matched_count += 1
-                updates, details = find_fields_to_update(db_row, csv_record)
+            if not db_rows:
+                console.print("Nie znaleziono żadnych kontrahentów w bazie danych.", style="bold red")
+                return
 
-                if not updates:
-                    no_changes_count += 1
-                    continue
+            console.print(f"Pobrano {len(db_rows)} kontrahentów z bazy danych.", style="bold blue")
+            db_rows = RowDecoder(cursor.description, KONTRAHENCI_COLUMNS, "KontrahentRow").decode_all(db_rows)
 
-                records_to_change.append({
-                    "wfd_signature": db_row.WFD_Signature,
-                    "nazwa": db_row.NazwaKontrahenta or "",
-                    "nip": db_row.NIP or "",
-                    "updates": updates,
-                    "details": details,
-                })
+            # 4. Porównanie i przygotowanie listy aktualizacji
+            records_to_change, matched_count, no_changes_count = compare_with_csv(db_rows, csv_data)
 
-        console.print(f"\nDopasowano {matched_count} kontrahentów po NIP.", style="bold blue")
-        console.print(f"Bez zmian: {no_changes_count} rekordów.", style="dim")
+            console.print(f"\nDopasowano {matched_count} kontrahentów po NIP.", style="bold blue")
+            console.print(f"Bez zmian: {no_changes_count} rekordów.", style="dim")
 
         if not records_to_change:
             console.print("Nie znaleziono kontrahentów wymagających aktualizacji.", style="bold yellow")
@@ -214,55 +423,61 @@ def process_kontrahenci(mode='test'):
 
         console.print(f"Do aktualizacji: {len(records_to_change)} rekordów.\n", style="bold green")
 
-        # 5. Aktualizacja i wyświetlenie raportu
-        table = Table(title="Raport aktualizacji kontrahentów", show_header=True, header_style="bold magenta")
-        table.add_column("Sygnatura", style="dim", width=15)
-        table.add_column("Nazwa kontrahenta", width=40)
-        table.add_column("NIP", width=18)
-        table.add_column("Zmiany", width=60)
-        table.add_column("Status", style="yellow", width=20)
-
-        if mode in ('update', 'single'):
-            total = 30 if mode == 'single' else len(records_to_change)
-            with Progress() as update_progress:
-                update_task = update_progress.add_task("Aktualizacja rekordów...", total=total)
-                for record in records_to_change:
-                    try:
-                        update_record(cursor, record["wfd_signature"], record["updates"])
+        # 5. Aktualizacja i raport (wiersze z records_to_change przekazywane do wybranego formatu raportu)
+        report_sink = create_report_sink(
+            "kontrahenci", "Raport aktualizacji kontrahentów", REPORT_COLUMNS,
+            report, report_file, max_table_rows, status_column="Status",
+            show_header=True, header_style="bold magenta",
+        )
+
+        try:
+            if mode in ('update', 'single'):
+                # --single: zapis do osiągnięcia 30 udanych aktualizacji
+                write_limit = 30 if mode == 'single' else None
+                # Zapis grupami o tym samym zestawie zmienianych kolumn (maks. 2^4 wariantów UPDATE)
+                with Progress() as update_progress:
+                    update_task = update_progress.add_task(
+                        "Aktualizacja rekordów...", total=min(len(records_to_change), write_limit or len(records_to_change))
+                    )
+                    errors = write_grouped(
+                        cursor, "WFElements", "WFD_Signature",
+                        [(record["wfd_signature"], record["updates"]) for record in records_to_change],
+                        committer.chunk_size(DEFAULT_GROUP_BATCH_SIZE), committer,
+                        update_progress, update_task, limit=write_limit, console=console,
+                    )
+
+                # errors obejmuje tylko rekordy, których zapis był próbowany
+                for record, error in zip(records_to_change, errors):
+                    if error is None:
                         update_status = "[bold green]Zaktualizowano[/bold green]"
                         updated_count += 1
-                    except Exception as e:
-                        update_status = f"[bold red]Błąd: {e}[/bold red]"
-
-                    update_progress.advance(update_task)
+                    else:
+                        update_status = error_status(error)
 
-                    table.add_row(
+                    report_sink.add_row(
                         str(record["wfd_signature"]),
                         record["nazwa"],
                         record["nip"],
-                        "\n".join(record["details"]),
+                        DiffList(record["details"]),
                         update_status
                     )
-
-                    if mode == 'single' and updated_count >= 30:
-                        break
-        else:
-            for record in records_to_change:
-                table.add_row(
-                    str(record["wfd_signature"]),
-                    record["nazwa"],
-                    record["nip"],
-                    "\n".join(record["details"]),
-                    "Oczekuje (tryb testowy)"
-                )
-
-        console.print(table)
+            else:
+                for record in records_to_change:
+                    report_sink.add_row(
+                        str(record["wfd_signature"]),
+                        record["nazwa"],
+                        record["nip"],
+                        DiffList(record["details"]),
+                        "Oczekuje (tryb testowy)"
+                    )
+        finally:
+            report_sink.close(console)
 
         if mode == 'update':
-            connection.commit()
+            committer.finish()
             console.print(f"Zakończono. Zaktualizowano {updated_count} rekordów.", style="bold green")
         elif mode == 'single':
-            connection.commit()
+            committer.finish()
             console.print(f"Tryb testowy (single). Zaktualizowano {updated_count} z maks. 30 rekordów.", style="bold green")
         else:
             console.print(f"Tryb testowy zakończony. {len(records_to_change)} rekordów zostałoby zaktualizowanych.", style="bold yellow")
@@ -272,6 +487,8 @@ def process_kontrahenci(mode='test'):
         console.print(f"Pełny komunikat błędu: {ex}", style="bold red")
         if connection:
             connection.rollback()
+        if committer and committer.committed_rows:
+            console.print(f"Przed błędem zatwierdzono {committer.committed_rows} rekordów.", style="bold yellow")
     except Exception as e:
         console.print(f"Wystąpił nieoczekiwany błąd w skrypcie: {e}", style="bold red")
     finally:
@@ -300,8 +517,30 @@ if __name__ == "__main__":
         help="Aktualizuj WSZYSTKIE pasujące rekordy w bazie danych."
     )
 
+    parser.add_argument(
+        "--server-diff",
+        action="store_true",
+        help="Załaduj CSV do tabeli tymczasowej i porównaj dane po stronie serwera -\n"
+             "z bazy pobierani są tylko kontrahenci wymagający zmian."
+    )
+
+    parser.add_argument(
+        "--fetch",
+        choices=["auto", "full", "filtered"],
+        default="auto",
+        help="Odczyt kontrahentów: full - wszyscy, filtered - tylko NIP-y z CSV (listy IN po 600),\n"
+             "auto - filtered, chyba że NIP-ów w CSV jest więcej niż 20% kontrahentów w bazie (domyślnie)."
+    )
+
+    add_commit_arguments(parser)
+    add_report_arguments(parser)
+
     args = parser.parse_args()
 
+    error = validate_commit_arguments(args) or validate_report_arguments(args)
+    if error:
+        parser.error(error)
+
     mode = 'test'
     if args.single:
         mode = 'single'
@@ -316,4 +555,6 @@ if __name__ == "__main__":
             console.print("Operacja anulowana przez użytkownika.", style="bold red")
             exit()
 
-    process_kontrahenci(mode=mode)
+    process_kontrahenci(mode=mode, commit_every=args.commit_every, max_txn_seconds=args.max_txn_seconds,
+                        report=args.report, report_file=args.report_file, max_table_rows=args.max_table_rows,
+                        server_diff=args.server_diff, fetch=args.fetch)
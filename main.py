@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 from rich.console import Console
 from rich.table import Table
 import argparse
+from choice_codec import choice_name
 
 # Załadowanie zmiennych środowiskowych z pliku .env
 load_dotenv()
@@ -24,7 +25,7 @@ SELECT
     WFD_AttText10 AS 'Kod_zadania',
     WFD_AttText9 AS 'Numer_tematu',
     WFD_AttText3 AS 'Nazwa_projektu',
-    dbo.ClearWFElem(WFD_AttChoose11) AS 'Status',
+    WFD_AttChoose11 AS 'Status',
     WFD_AttText8 AS 'Klient_skrot'
 FROM
     WFElements
@@ -51,6 +52,11 @@ def fetch_projects(only_missing=False):
         cursor.execute(SQL_QUERY)
         rows = cursor.fetchall()
 
+        # Status pobierany jest w surowej postaci 'ID#Nazwa' - nazwa wyodrębniana jest tutaj,
+        # zamiast wywoływać dbo.ClearWFElem dla każdego wiersza po stronie serwera
+        for row in rows:
+            row.Status = choice_name(row.Status)
+
         if only_missing:
             rows = [row for row in rows if not row.Kod_zadania or not row.Numer_tematu or not row.Klient_skrot]
             console.print("Wyświetlanie tylko rekordów z brakującymi polami.", style="bold yellow")
@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 from rich.console import Console
 from rich.table import Table
 import argparse
+from choice_codec import choice_name
+from commit_control import ChunkedCommitter, add_commit_arguments, validate_commit_arguments
 
 # Załadowanie zmiennych środowiskowych z pliku .env
 load_dotenv()
@@ -25,7 +27,7 @@ SELECT
     WFD_AttText10 AS 'Kod_zadania',
     WFD_AttText9 AS 'Numer_tematu',
     WFD_AttText3 AS 'Nazwa_projektu',
-    dbo.ClearWFElem(WFD_AttChoose11) AS 'Status',
+    WFD_AttChoose11 AS 'Status',
     WFD_AttText8 AS 'Klient_skrot'
 FROM
     WFElements
@@ -53,19 +55,26 @@ def update_database_record(cursor, wfd_id, new_data):
     
     cursor.execute(update_query, tuple(params))
 
-def process_and_update_projects(mode='test', only_missing=False):
+def process_and_update_projects(mode='test', only_missing=False, commit_every=None, max_txn_seconds=None):
     """Nawiązuje połączenie z bazą danych, pobiera, przetwarza i opcjonalnie aktualizuje projekty."""
     connection = None
+    committer = None
     updated_count = 0
     try:
         conn_str = get_connection_string()
         connection = pyodbc.connect(conn_str)
         cursor = connection.cursor()
+        committer = ChunkedCommitter(connection, commit_every, max_txn_seconds, console)
 
         console.print("Pobieranie i przetwarzanie projektów...", style="bold blue")
         cursor.execute(SQL_QUERY)
         rows = cursor.fetchall()
 
+        # Status pobierany jest w surowej postaci 'ID#Nazwa' - nazwa wyodrębniana jest tutaj,
+        # zamiast wywoływać dbo.ClearWFElem dla każdego wiersza po stronie serwera
+        for row in rows:
+            row.Status = choice_name(row.Status)
+
         if only_missing:
             rows = [row for row in rows if not row.Kod_zadania or not row.Numer_tematu or not row.Klient_skrot]
             console.print("Wyświetlanie tylko rekordów z brakującymi polami.", style="bold yellow")
@@ -102,11 +111,12 @@ def process_and_update_projects(mode='test', only_missing=False):
                 processing_info.append(f"Wyodrębniono 'Klient (skrót)' -> {new_data['WFD_AttText8']}")
 
             if new_data and mode != 'test':
-                update_database_record(cursor, row.WFD_ID, new_data)
+                with committer.write():
+                    update_database_record(cursor, row.WFD_ID, new_data)
                 update_status = f"[bold green]Zaktualizowano[/bold green] (ID: {row.WFD_ID})"
                 updated_count += 1
                 if mode == 'single':
-                    connection.commit()
+                    committer.finish()
                     # Add the current row to the table before printing and exiting
                     row_values = [str(item if item is not None else '') for item in row]
                     row_values.append("\n".join(processing_info))
@@ -126,7 +136,7 @@ def process_and_update_projects(mode='test', only_missing=False):
         console.print(table)
         
         if mode == 'all':
-            connection.commit()
+            committer.finish()
             console.print(f"Zakończono. Zaktualizowano {updated_count} rekordów.", style="bold green")
         elif mode == 'single':
              console.print("Nie znaleziono rekordu do aktualizacji w trybie pojedynczym.", style="bold yellow")
@@ -137,6 +147,8 @@ def process_and_update_projects(mode='test', only_missing=False):
         console.print(f"Błąd połączenia z bazą danych: {sqlstate}", style="bold red")
         if connection:
             connection.rollback()
+        if committer and committer.committed_rows:
+            console.print(f"Przed błędem zatwierdzono {committer.committed_rows} rekordów.", style="bold yellow")
     except Exception as e:
         console.print(f"Wystąpił nieoczekiwany błąd: {e}", style="bold red")
     finally:
@@ -153,9 +165,14 @@ if __name__ == "__main__":
     mode_group = parser.add_mutually_exclusive_group()
     mode_group.add_argument("--single", action="store_true", help="Aktualizuj tylko PIERWSZY pasujący rekord i zakończ (do testów zapisu).")
     mode_group.add_argument("--update-all", action="store_true", help="Aktualizuj WSZYSTKIE pasujące rekordy w bazie danych.")
+    add_commit_arguments(parser)
 
     args = parser.parse_args()
 
+    error = validate_commit_arguments(args)
+    if error:
+        parser.error(error)
+
     mode = 'test'
     if args.single:
         mode = 'single'
@@ -168,4 +185,5 @@ if __name__ == "__main__":
             console.print("Operacja anulowana przez użytkownika.", style="bold red")
             exit()
             
-    process_and_update_projects(mode=mode, only_missing=args.only_missing)
\ No newline at end of file
+    process_and_update_projects(mode=mode, only_missing=args.only_missing,
+                                commit_every=args.commit_every, max_txn_seconds=args.max_txn_seconds)
\ No newline at end of file
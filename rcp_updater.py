@@ -1,24 +1,74 @@
-
 import os
+import json
 import pyodbc
 import argparse
 from dotenv import load_dotenv
 from rich.console import Console
-from rich.table import Table
 from rich.progress import Progress
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from sql_registry import SqlTemplateError, get_template, load_registry
+from employee_units import load_employee_unit_index
+from bulk_writer import WriteStats, fetch_column_types, write_executemany, write_staging
+from commit_control import ChunkedCommitter, add_commit_arguments, validate_commit_arguments
+from report_sink import add_report_arguments, create_report_sink, validate_report_arguments
 
 # Inicjalizacja konsoli Rich
 console = Console()
 
-def get_sql_from_file(file_path):
-    """Odczytuje treść zapytania SQL z pliku."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        console.print(f"[bold red]Błąd: Nie znaleziono pliku SQL: {file_path}[/bold red]")
-        return None
+# Szablony SQL (wczytywane raz na proces przez sql_registry)
+UNIT_SQL = 'resources/get_employee_unit.sql'
+UNIT_CODE_SQL = 'resources/get_employee_unit_code.sql'
+BATCH_SQL = 'resources/get_rcp_values_batch.sql'
+
+# Plik stanu trybu z punktami kontrolnymi (--checkpoint-every / --resume)
+CHECKPOINT_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.rcp_updater_state.json')
+
+# Kolumny tabeli tymczasowej dla zapisu przez staging (--write-method staging).
+# Typy odczytywane są z WFElements (fetch_column_types), żeby np. WFD_AttDecimal3 miała ten sam DECIMAL(p, s).
+RCP_STAGING_COLUMNS = ('WFD_AttText9', 'WFD_AttText8', 'WFD_AttDecimal3')
+
+# Typy kolumn tabeli tymczasowej - odczytywane raz na proces
+_staging_column_types = None
+
+# Domyślna liczba wpisów pobieranych i analizowanych w jednej porcji (--batch-size)
+DEFAULT_BATCH_SIZE = 5000
+
+# Kolumny raportu zmian (nagłówek, opcje kolumny tabeli)
+REPORT_COLUMNS = [
+    ('WFD_ID', {'style': 'cyan'}),
+    ('Pracownik', {'style': 'magenta'}),
+    ('Data', {'style': 'yellow'}),
+    ('Pole', {'style': 'bold'}),
+    ('Stara wartość', {'style': 'red'}),
+    ('Nowa wartość', {'style': 'green'}),
+]
+
+
+class RcpEntry:
+    """Wpis RCP pobrany z bazy (kolejność pól zgodna z kolumnami zapytania w fetch_data_to_update)."""
+
+    __slots__ = ('wfd_id', 'employee_id', 'work_date', 'unit', 'unit_code', 'total_time')
+
+    def __init__(self, wfd_id, employee_id, work_date, unit, unit_code, total_time):
+        self.wfd_id = wfd_id
+        self.employee_id = employee_id
+        self.work_date = work_date
+        self.unit = unit
+        self.unit_code = unit_code
+        self.total_time = total_time
+
+
+class RcpChange:
+    """Wpis RCP wymagający zmiany wraz z nowymi wartościami."""
+
+    __slots__ = ('entry', 'new_unit', 'new_unit_code', 'new_total_time')
+
+    def __init__(self, entry, new_unit, new_unit_code, new_total_time):
+        self.entry = entry
+        self.new_unit = new_unit
+        self.new_unit_code = new_unit_code
+        self.new_total_time = new_total_time
 
 def get_db_connection():
     """Nawiązuje i zwraca połączenie z bazą danych."""
@@ -47,10 +97,28 @@ def get_db_connection():
         console.print(ex)
         return None
 
-def fetch_data_to_update(cursor, start_date, end_date):
-    """Pobiera wpisy RCP do aktualizacji z podanego zakresu dat."""
+# Warunek wyboru wpisów z brakującymi danymi (pomijany w trybie --only-total-time)
+MISSING_VALUES_FILTER = """
+        AND (
+            WFD_AttText9 IS NULL OR WFD_AttText9 = '' OR
+            WFD_AttText8 IS NULL OR WFD_AttText8 = '' OR
+            WFD_AttDecimal3 IS NULL OR
+            WFD_AttText9 LIKE '%KTP%'
+        )
+"""
+
+def fetch_data_to_update(cursor, start_date, end_date, only_total_time=False, end_inclusive=True,
+                         after_wfd_id=None, limit=None):
+    """Pobiera wpisy RCP do aktualizacji z podanego zakresu dat.
+
+    W trybie only_total_time zwraca wszystkie wpisy z zakresu, bo nieaktualny łączny czas
+    może wystąpić także we wpisach z uzupełnionymi polami. end_inclusive=False zamyka zakres
+    z prawej strony (używane przy podziale zakresu na fragmenty). Podanie after_wfd_id i limit
+    zwraca kolejną stronę wpisów w kolejności WFD_ID (keyset). Wiersze są odczytywane przez
+    fetchmany i od razu zamieniane na zwarte obiekty RcpEntry.
+    """
     query = """
-    SELECT
+    SELECT {top}
         WFD_ID,
         WFD_AttText7 as 'ID_Pracownika',
         WFD_AttDateTime10 as 'Dzien_Roboczy',
@@ -61,54 +129,375 @@ def fetch_data_to_update(cursor, start_date, end_date):
     WHERE
         WFD_DTYPEID = '56'
         AND WFD_AttDateTime10 >= ?
-        AND WFD_AttDateTime10 <= ?
-        AND (
-            WFD_AttText9 IS NULL OR WFD_AttText9 = '' OR
-            WFD_AttText8 IS NULL OR WFD_AttText8 = '' OR
-            WFD_AttDecimal3 IS NULL OR
-            WFD_AttText9 LIKE '%KTP%'
-        )
-    """
-    cursor.execute(query, start_date, end_date)
-    columns = [column[0] for column in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        AND WFD_AttDateTime10 {end_operator} ?
+    """.format(top='TOP (?)' if limit else '', end_operator='<=' if end_inclusive else '<')
+    params = [start_date, end_date]
+    if limit:
+        params.insert(0, limit)
+    if not only_total_time:
+        query += MISSING_VALUES_FILTER
+    if after_wfd_id is not None:
+        query += "        AND WFD_ID > ?\n    ORDER BY WFD_ID\n"
+        params.append(after_wfd_id)
+    cursor.execute(query, *params)
 
-def get_new_values(cursor, employee_id, work_date, wfd_id):
-    """Pobiera nowe wartości dla jednostki, kodu jednostki i łącznego czasu."""
-    
-    # Pobranie zapytań z plików
-    unit_sql = get_sql_from_file('resources/get_employee_unit.sql')
-    unit_code_sql = get_sql_from_file('resources/get_employee_unit_code.sql')
-    total_time_sql = "SELECT SUM(DET_Value1) FROM WFElementDetails WHERE DET_WFDID = ?"
+    entries = []
+    while True:
+        rows = cursor.fetchmany(cursor.arraysize)
+        if not rows:
+            break
+        entries.extend(RcpEntry(*row) for row in rows)
+    return entries
 
-    new_unit, new_unit_code, new_total_time = None, None, None
+
+def iter_entry_batches(cursor, start_date, end_date, only_total_time, batch_size,
+                       end_inclusive=True, after_wfd_id=0):
+    """Zwraca kolejne porcje wpisów (stronicowanie po WFD_ID). W pamięci jest najwyżej jedna porcja."""
+    cursor.arraysize = min(batch_size, 1000)
+    while True:
+        entries = fetch_data_to_update(cursor, start_date, end_date, only_total_time, end_inclusive,
+                                       after_wfd_id=after_wfd_id, limit=batch_size)
+        if not entries:
+            return
+        yield entries
+        after_wfd_id = entries[-1].wfd_id
+
+def get_new_values(cursor, employee_id, work_date):
+    """Pobiera nowe wartości dla jednostki i kodu jednostki (łączny czas liczy fetch_total_times)."""
+    new_unit, new_unit_code = None, None
 
     # Pobranie nowej jednostki organizacyjnej
-    if unit_sql:
-        # Użycie parametryzacji zapytań w celu uniknięcia błędów składni i SQL Injection
-        query = unit_sql.replace("#{Numer_teczki_pracownika}#", "?").replace("#{Data_dnia_roboczego}#", "?")
-        # Każdy plik SQL używa tych parametrów dwukrotnie
-        cursor.execute(query, employee_id, employee_id, work_date, work_date)
-        result = cursor.fetchone()
-        if result:
-            new_unit = result[0]
+    # Każdy plik SQL używa parametrów dwukrotnie: numer teczki, numer teczki, data, data
+    get_template(UNIT_SQL).execute(cursor, employee_id, employee_id, work_date, work_date)
+    result = cursor.fetchone()
+    if result:
+        new_unit = result[0]
 
     # Pobranie nowego kodu jednostki
-    if unit_code_sql:
-        # Użycie parametryzacji zapytań
-        query = unit_code_sql.replace("#{Numer_teczki_pracownika}#", "?").replace("#{Data_dnia_roboczego}#", "?")
-        cursor.execute(query, employee_id, employee_id, work_date, work_date)
-        result = cursor.fetchone()
-        if result:
-            new_unit_code = result[0]
-
-    # Pobranie łącznego czasu
-    cursor.execute(total_time_sql, wfd_id)
+    get_template(UNIT_CODE_SQL).execute(cursor, employee_id, employee_id, work_date, work_date)
     result = cursor.fetchone()
-    if result and result[0] is not None:
-        new_total_time = float(result[0])
+    if result:
+        new_unit_code = result[0]
+
+    return new_unit, new_unit_code
+
+
+def stage_entries(cursor, records):
+    """Zapisuje wpisy RCP (WFD_ID, pracownik, dzień roboczy) do tabeli tymczasowej #RcpEntries."""
+    cursor.execute("IF OBJECT_ID('tempdb..#RcpEntries') IS NOT NULL DROP TABLE #RcpEntries")
+    cursor.execute("""
+    CREATE TABLE #RcpEntries (
+        WFD_ID INT PRIMARY KEY,
+        ID_Pracownika NVARCHAR(4000) NULL,
+        Dzien_Roboczy DATETIME NULL
+    )
+    """)
+    # Jedna paczka parametrów zamiast osobnego INSERT dla każdego wpisu
+    cursor.fast_executemany = True
+    try:
+        cursor.executemany(
+            "INSERT INTO #RcpEntries (WFD_ID, ID_Pracownika, Dzien_Roboczy) VALUES (?, ?, ?)",
+            [(entry.wfd_id, entry.employee_id, entry.work_date) for entry in records]
+        )
+    finally:
+        cursor.fast_executemany = False
+
+
+def get_new_values_batch(cursor, records):
+    """Wyznacza nowe wartości dla wszystkich wpisów naraz. Zwraca słownik WFD_ID -> (jednostka, kod, czas)."""
+    stage_entries(cursor, records)
+    get_template(BATCH_SQL).execute(cursor)
+
+    resolved = {}
+    for wfd_id, new_unit, new_unit_code, total_time in cursor.fetchall():
+        new_total_time = float(total_time) if total_time is not None else None
+        resolved[wfd_id] = (new_unit, new_unit_code, new_total_time)
+    return resolved
+
+
+def fetch_total_times(cursor, records):
+    """Liczy łączny czas dla wszystkich wpisów jednym zapytaniem GROUP BY. Zwraca słownik WFD_ID -> czas."""
+    stage_entries(cursor, records)
+    cursor.execute("""
+    SELECT wed.DET_WFDID, SUM(wed.DET_Value1)
+    FROM WFElementDetails wed
+    JOIN #RcpEntries e ON e.WFD_ID = wed.DET_WFDID
+    GROUP BY wed.DET_WFDID
+    """)
+    return {wfd_id: float(total_time) for wfd_id, total_time in cursor.fetchall() if total_time is not None}
+
+
+def get_new_values_index(cursor, records, index):
+    """Wyznacza nowe wartości z indeksu przypisań w pamięci - bez zapytań SQL per wpis."""
+    total_times = fetch_total_times(cursor, records)
+
+    resolved = {}
+    for entry in records:
+        new_unit, new_unit_code = index.resolve(entry.employee_id, entry.work_date)
+        resolved[entry.wfd_id] = (new_unit, new_unit_code, total_times.get(entry.wfd_id))
+    return resolved
+
+
+def analyze_records(cursor, records, args, index=None, progress=None, task=None):
+    """Wyznacza nowe wartości dla porcji wpisów i zwraca wyłącznie wpisy wymagające zmiany (RcpChange)."""
+    resolved = None
+    total_times = None
+    if args.only_total_time:
+        total_times = fetch_total_times(cursor, records)
+    elif args.resolver == 'batch':
+        resolved = get_new_values_batch(cursor, records)
+    elif args.resolver == 'index':
+        resolved = get_new_values_index(cursor, records, index)
+    else:
+        total_times = fetch_total_times(cursor, records)
+
+    changes = []
+    for entry in records:
+        if resolved is not None:
+            new_unit, new_unit_code, new_total_time = resolved.get(entry.wfd_id, (None, None, None))
+        else:
+            if args.only_total_time:
+                # Jednostki pozostają bez zmian - porównujemy tylko łączny czas
+                new_unit, new_unit_code = entry.unit, entry.unit_code
+            else:
+                new_unit, new_unit_code = get_new_values(cursor, entry.employee_id, entry.work_date)
+            new_total_time = total_times.get(entry.wfd_id)
+
+        # Sprawdzamy, czy jest cokolwiek do zaktualizowania
+        if new_unit != entry.unit or new_unit_code != entry.unit_code or (new_total_time is not None and new_total_time != entry.total_time):
+            changes.append(RcpChange(entry, new_unit, new_unit_code, new_total_time))
+        if progress is not None:
+            progress.update(task, advance=1)
+
+    return changes
+
+
+def analyze_range(cursor, args, start_date, end_date, index=None, end_inclusive=True, progress=None, task=None):
+    """Analizuje zakres dat porcjami. Zwraca (liczba przeanalizowanych wpisów, lista zmian)."""
+    found_count = 0
+    changes = []
+    for entries in iter_entry_batches(cursor, start_date, end_date, args.only_total_time, args.batch_size, end_inclusive):
+        found_count += len(entries)
+        changes.extend(analyze_records(cursor, entries, args, index, progress, task))
+    return found_count, changes
+
+
+def split_date_range(start_date, end_date, shard):
+    """Dzieli zakres dat na fragmenty (dzień/tydzień). Zwraca listę (początek, koniec, czy_koniec_włącznie)."""
+    step = timedelta(days=7 if shard == 'week' else 1)
+    shards = []
+    shard_start = start_date
+    while shard_start + step <= end_date:
+        shards.append((shard_start, shard_start + step, False))
+        shard_start += step
+    # Ostatni fragment zachowuje warunek '<= data końcowa' z trybu szeregowego
+    shards.append((shard_start, end_date, True))
+    return shards
+
+
+class ShardConnectionError(Exception):
+    """Wątek analizy nie uzyskał połączenia z bazą danych."""
+
+
+def analyze_shard(shard, args, index):
+    """Pobiera i analizuje jeden fragment zakresu dat na osobnym połączeniu (wywoływane w puli wątków)."""
+    shard_start, shard_end, end_inclusive = shard
+    conn = get_db_connection()
+    if not conn:
+        raise ShardConnectionError(f"brak połączenia z bazą dla fragmentu {shard_start:%d.%m.%Y}")
+    try:
+        return analyze_range(conn.cursor(), args, shard_start, shard_end, index, end_inclusive)
+    finally:
+        conn.close()
+
+
+def analyze_parallel(args, start_date, end_date, index):
+    """Analizuje zakres dat równolegle - każdy fragment na własnym połączeniu.
+
+    Zwraca None, gdy któryś wątek nie uzyska połączenia z bazą. Po błędzie dowolnego fragmentu
+    fragmenty jeszcze nieuruchomione są anulowane, a pozostałe błędy są przekazywane dalej.
+    """
+    shards = split_date_range(start_date, end_date, args.shard)
+    console.print(f"Podział zakresu na {len(shards)} fragmentów, {args.workers} wątków...")
+
+    found_count = 0
+    updates = []
+    with Progress() as progress:
+        task = progress.add_task("[cyan]Analizowanie fragmentów...", total=len(shards))
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(analyze_shard, shard, args, index) for shard in shards]
+            for future in as_completed(futures):
+                try:
+                    shard_count, shard_updates = future.result()
+                except Exception as ex:
+                    # Błąd jednego fragmentu przerywa analizę - fragmenty jeszcze nieuruchomione są anulowane
+                    for pending in futures:
+                        pending.cancel()
+                    if isinstance(ex, ShardConnectionError):
+                        console.print(f"[bold red]Błąd: {ex}. Analiza przerwana.[/bold red]")
+                        return None
+                    raise
+                found_count += shard_count
+                updates.extend(shard_updates)
+                progress.update(task, advance=1)
+
+    console.print(f"Przeanalizowano {found_count} wpisów.")
+    # Deterministyczna kolejność niezależnie od kolejności zakończenia wątków
+    updates.sort(key=lambda u: (u.entry.work_date, u.entry.wfd_id))
+    return updates
+
+
+def get_checkpoint_params(args):
+    """Parametry przebiegu zapisywane w pliku stanu - wznowienie jest możliwe tylko z identycznymi."""
+    return {
+        "start_date": args.start_date,
+        "end_date": args.end_date,
+        "only_total_time": args.only_total_time,
+        "resolver": args.resolver,
+    }
+
+
+def load_checkpoint(args):
+    """Wczytuje ostatni zatwierdzony WFD_ID z pliku stanu. Zwraca None, gdy nie można wznowić."""
+    if not os.path.exists(CHECKPOINT_FILE_PATH):
+        console.print(f"[bold red]Błąd: Brak pliku stanu {CHECKPOINT_FILE_PATH} - nie ma czego wznawiać.[/bold red]")
+        return None
+    try:
+        with open(CHECKPOINT_FILE_PATH, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError) as ex:
+        console.print(f"[bold red]Błąd: Nie można odczytać pliku stanu {CHECKPOINT_FILE_PATH}: {ex}[/bold red]")
+        return None
+    if not isinstance(state, dict) or not all(
+            key in state for key in ("last_wfd_id", "processed_count", "updated_count")):
+        console.print(f"[bold red]Błąd: Plik stanu {CHECKPOINT_FILE_PATH} jest niekompletny.[/bold red]")
+        return None
+    if state.get("params") != get_checkpoint_params(args):
+        console.print(f"[bold red]Błąd: Parametry przebiegu różnią się od zapisanych w pliku stanu: {state.get('params')}[/bold red]")
+        return None
+    return state
+
+
+def save_checkpoint(args, last_wfd_id, processed_count, updated_count):
+    """Zapisuje stan po zatwierdzeniu porcji (atomowo - przez plik tymczasowy)."""
+    state = {
+        "params": get_checkpoint_params(args),
+        "last_wfd_id": last_wfd_id,
+        "processed_count": processed_count,
+        "updated_count": updated_count,
+        "saved_at": datetime.now().isoformat(timespec='seconds'),
+    }
+    temp_path = CHECKPOINT_FILE_PATH + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, CHECKPOINT_FILE_PATH)
+
+
+def run_checkpointed(conn, cursor, args, start_date, end_date, index):
+    """Przetwarza wpisy porcjami w kolejności WFD_ID, zatwierdzając i zapisując stan po każdej porcji."""
+    last_wfd_id, processed_count, updated_count = 0, 0, 0
+    if args.resume:
+        state = load_checkpoint(args)
+        if state is None:
+            return
+        last_wfd_id = state["last_wfd_id"]
+        processed_count = state["processed_count"]
+        updated_count = state["updated_count"]
+        console.print(f"Wznawianie od WFD_ID > {last_wfd_id} (przetworzono wcześniej {processed_count} wpisów).")
+
+    batches = iter_entry_batches(cursor, start_date, end_date, args.only_total_time, args.checkpoint_every,
+                                 after_wfd_id=last_wfd_id)
+    # Raport obejmuje zmiany zatwierdzone w tym uruchomieniu (wiersze dopisywane po każdej porcji)
+    report_sink = create_report_sink("rcp", "Podsumowanie zmian", REPORT_COLUMNS,
+                                     args.report, args.report_file, args.max_table_rows)
+    try:
+        for records in batches:
+            updates = analyze_records(cursor, records, args, index)
+            if updates:
+                write_updates(cursor, updates, args.write_method)
+            conn.commit()
+            add_report_rows(report_sink, updates)
+
+            last_wfd_id = records[-1].wfd_id
+            processed_count += len(records)
+            updated_count += len(updates)
+            save_checkpoint(args, last_wfd_id, processed_count, updated_count)
+            console.print(f"Punkt kontrolny: WFD_ID {last_wfd_id}, przetworzono {processed_count}, zaktualizowano {updated_count}.")
+    finally:
+        report_sink.close(console)
+
+    if os.path.exists(CHECKPOINT_FILE_PATH):
+        os.remove(CHECKPOINT_FILE_PATH)
+    console.print(f"\n[bold green]Aktualizacja zakończona pomyślnie! Przetworzono {processed_count} wpisów, zaktualizowano {updated_count}.[/bold green]")
+
+
+def get_column_changes(u):
+    """Zwraca słownik kolumna -> nowa wartość wyłącznie dla pól, które faktycznie się zmieniają."""
+    entry = u.entry
+    # Używamy nowych wartości, ale jeśli któraś jest None, zachowujemy starą.
+    final_unit = u.new_unit if u.new_unit is not None else entry.unit
+    final_unit_code = u.new_unit_code if u.new_unit_code is not None else entry.unit_code
+    final_total_time = u.new_total_time if u.new_total_time is not None else entry.total_time
+
+    changes = {}
+    if final_unit != entry.unit:
+        changes['WFD_AttText9'] = final_unit
+    if final_unit_code != entry.unit_code:
+        changes['WFD_AttText8'] = final_unit_code
+    if final_total_time != entry.total_time:
+        changes['WFD_AttDecimal3'] = final_total_time
+    return changes
 
-    return new_unit, new_unit_code, new_total_time
+
+def get_staging_column_types(cursor):
+    """Zwraca typy kolumn tabeli tymczasowej zgodne z WFElements (odczyt przy pierwszym użyciu)."""
+    global _staging_column_types
+    if _staging_column_types is None:
+        _staging_column_types = fetch_column_types(cursor, 'WFElements', RCP_STAGING_COLUMNS)
+    return _staging_column_types
+
+
+def add_report_rows(report_sink, updates):
+    """Przekazuje zmiany do raportu - jeden wiersz na każde zmieniane pole wpisu."""
+    for u in updates:
+        entry = u.entry
+        work_day = entry.work_date.strftime('%Y-%m-%d')
+        if entry.unit != u.new_unit:
+            report_sink.add_row(str(entry.wfd_id), entry.employee_id, work_day, "Jednostka Org.", str(entry.unit), str(u.new_unit))
+        if entry.unit_code != u.new_unit_code:
+            report_sink.add_row(str(entry.wfd_id), entry.employee_id, work_day, "Kod Jednostki", str(entry.unit_code), str(u.new_unit_code))
+        if entry.total_time != u.new_total_time and u.new_total_time is not None:
+            report_sink.add_row(str(entry.wfd_id), entry.employee_id, work_day, "Łączny czas", f"{entry.total_time:.4f}" if entry.total_time is not None else "None", f"{u.new_total_time:.4f}" if u.new_total_time is not None else "None")
+
+
+def write_updates(cursor, updates, method):
+    """Zapisuje zmiany w WFElements wybraną metodą i zwraca statystyki zapisu."""
+    changes = [(u.entry.wfd_id, get_column_changes(u)) for u in updates]
+    if method == 'staging':
+        return write_staging(cursor, 'WFElements', 'WFD_ID', 'INT', get_staging_column_types(cursor), changes)
+    return write_executemany(cursor, 'WFElements', 'WFD_ID', changes)
+
+
+def write_updates_chunked(conn, cursor, updates, args):
+    """Zapisuje zmiany porcjami, zatwierdzając je zgodnie z --commit-every / --max-txn-seconds."""
+    committer = ChunkedCommitter(conn, args.commit_every, args.max_txn_seconds, console)
+    chunk_size = committer.chunk_size(DEFAULT_BATCH_SIZE) if committer.is_chunked else len(updates)
+
+    total = WriteStats(args.write_method)
+    try:
+        for start in range(0, len(updates), chunk_size):
+            chunk = updates[start:start + chunk_size]
+            with committer.write(rows=len(chunk)):
+                stats = write_updates(cursor, chunk, args.write_method)
+            total.rows += stats.rows
+            total.calls += stats.calls
+            total.seconds += stats.seconds
+    except pyodbc.Error:
+        if committer.committed_rows:
+            console.print(f"[bold yellow]Przed błędem zatwierdzono {committer.committed_rows} wpisów.[/bold yellow]")
+        raise
+    committer.finish()
+    return total
 
 
 def main():
@@ -116,6 +505,28 @@ def main():
     parser.add_argument('--start-date', required=True, help="Data początkowa w formacie DD.MM.RRRR")
     parser.add_argument('--end-date', required=True, help="Data końcowa w formacie DD.MM.RRRR")
     parser.add_argument('--update', action='store_true', help="Uruchamia tryb aktualizacji danych w bazie.")
+    parser.add_argument('--only-total-time', action='store_true',
+                        help="Przelicza wyłącznie 'Łączny czas' dla wszystkich wpisów z zakresu (jedno zapytanie GROUP BY).")
+    parser.add_argument('--resolver', choices=['entry', 'batch', 'index'], default='entry',
+                        help="Sposób wyznaczania nowych wartości: 'entry' - trzy zapytania na wpis, "
+                             "'batch' - jedno zapytanie dla wszystkich wpisów (tabela tymczasowa), "
+                             "'index' - przypisania wczytane raz do pamięci, bez zapytań per wpis.")
+    parser.add_argument('--write-method', choices=['executemany', 'staging'], default='executemany',
+                        help="Sposób zapisu: 'executemany' - paczki parametrów (fast_executemany), "
+                             "'staging' - tabela tymczasowa i jeden UPDATE ... FROM.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Liczba równoległych wątków analizy (każdy z własnym połączeniem). Domyślnie 1.")
+    parser.add_argument('--shard', choices=['day', 'week'], default='day',
+                        help="Wielkość fragmentu zakresu dat przy --workers > 1.")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Liczba wpisów pobieranych i analizowanych w jednej porcji. Domyślnie {DEFAULT_BATCH_SIZE}.")
+    parser.add_argument('--checkpoint-every', type=int,
+                        help="Tryb z punktami kontrolnymi (wymaga --update): przetwarza wpisy po WFD_ID, "
+                             "zatwierdza co N wpisów i zapisuje stan do pliku.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Wznawia przerwany przebieg z --checkpoint-every od ostatniego zatwierdzonego WFD_ID.")
+    add_commit_arguments(parser)
+    add_report_arguments(parser)
     args = parser.parse_args()
 
     try:
@@ -125,6 +536,39 @@ def main():
         console.print("[bold red]Błąd: Daty muszą być w formacie DD.MM.RRRR.[/bold red]")
         return
 
+    if args.workers < 1 or args.batch_size < 1:
+        console.print("[bold red]Błąd: --workers i --batch-size muszą być liczbami dodatnimi.[/bold red]")
+        return
+
+    error = validate_commit_arguments(args) or validate_report_arguments(args)
+    if error:
+        console.print(f"[bold red]Błąd: {error}[/bold red]")
+        return
+
+    if args.resume and not args.checkpoint_every:
+        console.print("[bold red]Błąd: --resume wymaga podania --checkpoint-every.[/bold red]")
+        return
+    if args.checkpoint_every is not None:
+        if args.checkpoint_every < 1 or not args.update or args.workers > 1:
+            console.print("[bold red]Błąd: --checkpoint-every wymaga dodatniej liczby, flagi --update i pracy w jednym wątku.[/bold red]")
+            return
+        # Porcja punktu kontrolnego jest jednocześnie transakcją - stan zapisywany jest po jej zatwierdzeniu
+        if args.commit_every or args.max_txn_seconds:
+            console.print("[bold red]Błąd: --checkpoint-every zatwierdza zmiany co N wpisów - "
+                          "nie łącz go z --commit-every ani --max-txn-seconds.[/bold red]")
+            return
+        # Nowy przebieg nadpisałby punkt wznowienia przerwanego przebiegu
+        if not args.resume and os.path.exists(CHECKPOINT_FILE_PATH):
+            console.print(f"[bold red]Błąd: Istnieje plik stanu przerwanego przebiegu {CHECKPOINT_FILE_PATH}. "
+                          f"Użyj --resume, aby go wznowić, albo usuń plik, aby zacząć od początku.[/bold red]")
+            return
+
+    try:
+        load_registry()
+    except (OSError, SqlTemplateError) as ex:
+        console.print(f"[bold red]Błąd wczytywania plików SQL: {ex}[/bold red]")
+        return
+
     conn = get_db_connection()
     if not conn:
         return
@@ -132,78 +576,57 @@ def main():
     try:
         cursor = conn.cursor()
         
-        console.print(f"Pobieranie wpisów RCP od {args.start_date} do {args.end_date}...")
-        records_to_process = fetch_data_to_update(cursor, start_date_dt, end_date_dt)
-        
-        if not records_to_process:
-            console.print("[green]Nie znaleziono wpisów do aktualizacji w podanym zakresie dat.[/green]")
+        index = None
+        if args.resolver == 'index' and not args.only_total_time:
+            console.print("Wczytywanie przypisań pracowników do jednostek...")
+            index = load_employee_unit_index(cursor)
+
+        if args.checkpoint_every:
+            console.print(f"[bold yellow]Tryb z punktami kontrolnymi: zmiany będą zatwierdzane co {args.checkpoint_every} wpisów.[/bold yellow]")
+            if console.input("Czy na pewno chcesz zaktualizować wpisy RCP w bazie danych? (y/n): ").lower() == 'y':
+                run_checkpointed(conn, cursor, args, start_date_dt, end_date_dt, index)
+            else:
+                console.print("[bold red]Aktualizacja anulowana przez użytkownika.[/bold red]")
             return
 
-        console.print(f"Znaleziono {len(records_to_process)} wpisów do przetworzenia. Analiza danych...")
+        if args.workers > 1:
+            console.print(f"Pobieranie i analiza wpisów RCP od {args.start_date} do {args.end_date}...")
+            updates = analyze_parallel(args, start_date_dt, end_date_dt, index)
+            if updates is None:
+                return
+        else:
+            console.print(f"Pobieranie i analiza wpisów RCP od {args.start_date} do {args.end_date}...")
+            with Progress() as progress:
+                task = progress.add_task("[cyan]Analizowanie wpisów...", total=None)
+                found_count, updates = analyze_range(cursor, args, start_date_dt, end_date_dt, index,
+                                                     progress=progress, task=task)
 
-        updates = []
-        with Progress() as progress:
-            task = progress.add_task("[cyan]Analizowanie wpisów...", total=len(records_to_process))
-            for rec in records_to_process:
-                new_unit, new_unit_code, new_total_time = get_new_values(cursor, rec['ID_Pracownika'], rec['Dzien_Roboczy'], rec['WFD_ID'])
-                
-                # Sprawdzamy, czy jest cokolwiek do zaktualizowania
-                if new_unit != rec['Jednostka_Organizacyjna'] or new_unit_code != rec['Kod_Jednostki_Organizacyjnej'] or (new_total_time is not None and new_total_time != rec['Laczny_Czas']):
-                    updates.append({
-                        "WFD_ID": rec['WFD_ID'],
-                        "ID_Pracownika": rec['ID_Pracownika'],
-                        "Dzien_Roboczy": rec['Dzien_Roboczy'].strftime('%Y-%m-%d'),
-                        "old_unit": rec['Jednostka_Organizacyjna'], "new_unit": new_unit,
-                        "old_unit_code": rec['Kod_Jednostki_Organizacyjnej'], "new_unit_code": new_unit_code,
-                        "old_total_time": rec['Laczny_Czas'], "new_total_time": new_total_time
-                    })
-                progress.update(task, advance=1)
+            if not found_count:
+                console.print("[green]Nie znaleziono wpisów do aktualizacji w podanym zakresie dat.[/green]")
+                return
+
+            console.print(f"Przeanalizowano {found_count} wpisów.")
 
         if not updates:
             console.print("[green]Wszystkie wpisy w podanym zakresie są aktualne. Brak zmian do wykonania.[/green]")
             return
 
-        # Wyświetlanie tabeli zmian
-        table = Table(title="Podsumowanie zmian")
-        table.add_column("WFD_ID", style="cyan")
-        table.add_column("Pracownik", style="magenta")
-        table.add_column("Data", style="yellow")
-        table.add_column("Pole", style="bold")
-        table.add_column("Stara wartość", style="red")
-        table.add_column("Nowa wartość", style="green")
-
-        for u in updates:
-            if u['old_unit'] != u['new_unit']:
-                table.add_row(str(u['WFD_ID']), u['ID_Pracownika'], u['Dzien_Roboczy'], "Jednostka Org.", str(u['old_unit']), str(u['new_unit']))
-            if u['old_unit_code'] != u['new_unit_code']:
-                table.add_row(str(u['WFD_ID']), u['ID_Pracownika'], u['Dzien_Roboczy'], "Kod Jednostki", str(u['old_unit_code']), str(u['new_unit_code']))
-            if u['old_total_time'] != u['new_total_time'] and u['new_total_time'] is not None:
-                 table.add_row(str(u['WFD_ID']), u['ID_Pracownika'], u['Dzien_Roboczy'], "Łączny czas", f"{u['old_total_time']:.4f}" if u['old_total_time'] is not None else "None", f"{u['new_total_time']:.4f}" if u['new_total_time'] is not None else "None")
-
-        console.print(table)
+        # Raport zmian (wiersze z updates przekazywane do wybranego formatu raportu)
+        report_sink = create_report_sink("rcp", "Podsumowanie zmian", REPORT_COLUMNS,
+                                         args.report, args.report_file, args.max_table_rows)
+        try:
+            add_report_rows(report_sink, updates)
+        finally:
+            report_sink.close(console)
 
         if args.update:
             console.print(f"\n[bold yellow]Znaleziono {len(updates)} zmian do wprowadzenia.[/bold yellow]")
             if console.input("Czy na pewno chcesz zaktualizować te wpisy w bazie danych? (y/n): ").lower() == 'y':
                 
-                update_query = """
-                UPDATE WFElements
-                SET WFD_AttText9 = ?, WFD_AttText8 = ?, WFD_AttDecimal3 = ?
-                WHERE WFD_ID = ?
-                """
-                
-                with Progress() as progress:
-                    task = progress.add_task("[cyan]Aktualizowanie bazy danych...", total=len(updates))
-                    for u in updates:
-                        # Używamy nowych wartości, ale jeśli któraś jest None, zachowujemy starą, chyba że stara też jest None.
-                        final_unit = u['new_unit'] if u['new_unit'] is not None else u['old_unit']
-                        final_unit_code = u['new_unit_code'] if u['new_unit_code'] is not None else u['old_unit_code']
-                        final_total_time = u['new_total_time'] if u['new_total_time'] is not None else u['old_total_time']
-                        
-                        cursor.execute(update_query, final_unit, final_unit_code, final_total_time, u['WFD_ID'])
-                        progress.update(task, advance=1)
-                
-                conn.commit()
+                with console.status("[cyan]Aktualizowanie bazy danych..."):
+                    stats = write_updates_chunked(conn, cursor, updates, args)
+                console.print(f"Zapis {stats.describe()}")
+
                 console.print("\n[bold green]Aktualizacja zakończona pomyślnie![/bold green]")
             else:
                 console.print("[bold red]Aktualizacja anulowana przez użytkownika.[/bold red]")
@@ -0,0 +1,254 @@
+import csv
+import json
+import os
+from collections import Counter
+from datetime import datetime
+
+from rich.markup import escape
+from rich.table import Table
+from rich.text import Text
+
+# Dostępne formaty raportu (--report)
+REPORT_FORMATS = ("table", "csv", "jsonl", "summary")
+
+# Domyślna maksymalna liczba wierszy tabeli wyświetlanej w konsoli (None - bez limitu, jak dotychczas)
+DEFAULT_MAX_TABLE_ROWS = None
+
+
+def add_report_arguments(parser):
+    """Dodaje do parsera wspólne parametry raportu."""
+    parser.add_argument(
+        "--report",
+        choices=REPORT_FORMATS,
+        default="table",
+        help="Format raportu: table - tabela w konsoli (domyślnie), csv / jsonl - zapis wiersz po wierszu\n"
+        "do pliku (--report-file), summary - tylko liczniki.",
+    )
+    parser.add_argument(
+        "--report-file",
+        type=str,
+        help="Plik raportu dla --report csv/jsonl (domyślnie raport_<skrypt>_<data>.<format>).",
+    )
+    parser.add_argument(
+        "--max-table-rows",
+        type=int,
+        default=DEFAULT_MAX_TABLE_ROWS,
+        help="Maksymalna liczba wierszy tabeli w konsoli (liczba dodatnia, domyślnie bez limitu).",
+    )
+
+
+def validate_report_arguments(args):
+    """Zwraca komunikat błędu dla niepoprawnych wartości lub None."""
+    if args.max_table_rows is not None and args.max_table_rows < 1:
+        return "--max-table-rows musi być liczbą dodatnią (bez parametru tabela nie ma limitu)."
+    if args.report_file and args.report not in ("csv", "jsonl"):
+        return "--report-file wymaga --report csv lub --report jsonl."
+    return None
+
+
+class Diff:
+    """Komórka raportu: wartość pola przed i po zmianie. Markup powstaje dopiero przy wyświetlaniu."""
+
+    __slots__ = ("old", "new")
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+
+    def markup(self):
+        if self.old == self.new:
+            return f"[dim]{escape(str(self.old))}[/dim]"
+        return f"[red]{escape(str(self.old))}[/red]\n-> [green]{escape(str(self.new))}[/green]"
+
+    def plain(self):
+        if self.old == self.new:
+            return str(self.old)
+        return f"{self.old} -> {self.new}"
+
+    def json_value(self):
+        return {"old": self.old, "new": self.new}
+
+
+class DiffList:
+    """Komórka raportu: lista zmian (etykieta, stara wartość, nowa wartość), jedna zmiana w wierszu."""
+
+    __slots__ = ("items",)
+
+    def __init__(self, items):
+        self.items = items
+
+    def markup(self):
+        return "\n".join(escape(f"{label}: '{old}' -> '{new}'") for label, old, new in self.items)
+
+    def plain(self):
+        return "\n".join(f"{label}: '{old}' -> '{new}'" for label, old, new in self.items)
+
+    def json_value(self):
+        return {label: {"old": old, "new": new} for label, old, new in self.items}
+
+
+def error_status(error):
+    """Status wiersza dla błędu zapisu. Treść błędu (np. '[Microsoft][ODBC Driver ...]') nie jest markupem."""
+    return f"[bold red]Błąd: {escape(str(error))}[/bold red]"
+
+
+def markup_text(value, is_markup=False):
+    """Zamienia wartość komórki na tekst z markupem rich do tabeli w konsoli.
+
+    Markup zawierają tylko statusy tworzone przez skrypty (is_markup=True). Pozostałe wartości
+    pochodzą z bazy (np. nazwa jednostki 'X [Y]') i są escapowane.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (Diff, DiffList)):
+        return value.markup()
+    if is_markup:
+        return str(value)
+    return escape(str(value))
+
+
+def plain_text(value, is_markup=False):
+    """Zamienia wartość komórki (status z markupem rich, Diff, DiffList, wartość z bazy) na zwykły tekst do pliku."""
+    if value is None:
+        return ""
+    if isinstance(value, (Diff, DiffList)):
+        return value.plain()
+    if is_markup:
+        return Text.from_markup(str(value)).plain
+    return str(value)
+
+
+def json_value(value, is_markup=False):
+    """Zamienia wartość komórki na wartość JSON (zmiany jako obiekty old/new)."""
+    if isinstance(value, (Diff, DiffList)):
+        return value.json_value()
+    return plain_text(value, is_markup)
+
+
+class ReportSink:
+    """Odbiorca wierszy raportu (add_row). Skrypty wyznaczają najpierw pełną listę zmian, a dopiero potem
+    przekazują ją do odbiorcy - od formatu zależy tylko wyjście: pliki CSV/JSONL zapisywane są
+    wiersz po wierszu, a tabela w konsoli przechowuje co najwyżej max_rows wierszy.
+
+    columns: lista (nagłówek, opcje kolumny rich.Table). status_column: nagłówek kolumny, której
+    wartości są zliczane w podsumowaniu (np. "Status"). Tylko ta kolumna może zawierać markup rich.
+    """
+
+    def __init__(self, title, columns, status_column=None):
+        self.title = title
+        self.columns = columns
+        self.headers = [header for header, _ in columns]
+        self.row_count = 0
+        self.statuses = Counter()
+        self._status_index = self.headers.index(status_column) if status_column else None
+
+    def add_row(self, *values):
+        self.row_count += 1
+        if self._status_index is not None:
+            self.statuses[plain_text(values[self._status_index], is_markup=True)] += 1
+        self._write(values)
+
+    def _cells(self, values, convert):
+        """Zamienia wartości wiersza funkcją convert (markup_text, plain_text, json_value)."""
+        return [convert(value, index == self._status_index) for index, value in enumerate(values)]
+
+    def _write(self, values):
+        pass
+
+    def close(self, console):
+        """Kończy raport i wypisuje podsumowanie."""
+        summary = ", ".join(f"{status}: {count}" for status, count in self.statuses.most_common())
+        console.print(
+            f"{self.title}: {self.row_count} wierszy" + (f" ({summary})." if summary else "."),
+            style="dim",
+        )
+
+
+class TableSink(ReportSink):
+    """Tabela rich w konsoli, ograniczona do max_rows wierszy (pozostałe są tylko liczone)."""
+
+    def __init__(self, title, columns, status_column=None, max_rows=DEFAULT_MAX_TABLE_ROWS, **table_options):
+        super().__init__(title, columns, status_column)
+        self.max_rows = max_rows
+        self.table = Table(title=title, **table_options)
+        for header, options in columns:
+            self.table.add_column(header, **options)
+
+    def _write(self, values):
+        if not self.max_rows or self.row_count <= self.max_rows:
+            self.table.add_row(*self._cells(values, markup_text))
+
+    def close(self, console):
+        console.print(self.table)
+        if self.max_rows and self.row_count > self.max_rows:
+            console.print(
+                f"Wyświetlono {self.max_rows} z {self.row_count} wierszy (--max-table-rows). "
+                f"Pełny raport: --report csv lub --report jsonl.",
+                style="yellow",
+            )
+
+
+class CsvSink(ReportSink):
+    """Zapis strumieniowy do pliku CSV (separator ';', kodowanie zgodne z Excelem)."""
+
+    def __init__(self, title, columns, path, status_column=None):
+        super().__init__(title, columns, status_column)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file, delimiter=";")
+        self._writer.writerow(self.headers)
+
+    def _write(self, values):
+        self._writer.writerow(self._cells(values, plain_text))
+
+    def close(self, console):
+        self._file.close()
+        super().close(console)
+        console.print(f"Zapisano raport: {self.path}", style="bold blue")
+
+
+class JsonlSink(ReportSink):
+    """Zapis strumieniowy do pliku JSON Lines - jeden obiekt na wiersz (np. do przeglądania przez jq)."""
+
+    def __init__(self, title, columns, path, status_column=None):
+        super().__init__(title, columns, status_column)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write(self, values):
+        record = dict(zip(self.headers, self._cells(values, json_value)))
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self, console):
+        self._file.close()
+        super().close(console)
+        console.print(f"Zapisano raport: {self.path}", style="bold blue")
+
+
+class SummarySink(ReportSink):
+    """Tylko liczniki wierszy i statusów - bez przechowywania wierszy."""
+
+
+def default_report_path(script_name, report_format):
+    """Domyślna nazwa pliku raportu w bieżącym katalogu."""
+    return os.path.abspath(f"raport_{script_name}_{datetime.now():%Y%m%d_%H%M%S}.{report_format}")
+
+
+def create_report_sink(
+    script_name,
+    title,
+    columns,
+    report_format="table",
+    report_file=None,
+    max_table_rows=DEFAULT_MAX_TABLE_ROWS,
+    status_column=None,
+    **table_options
+):
+    """Tworzy odbiorcę raportu dla podanego formatu (--report / --report-file / --max-table-rows)."""
+    if report_format in ("csv", "jsonl"):
+        path = report_file or default_report_path(script_name, report_format)
+        sink_class = CsvSink if report_format == "csv" else JsonlSink
+        return sink_class(title, columns, path, status_column)
+    if report_format == "summary":
+        return SummarySink(title, columns, status_column)
+    return TableSink(title, columns, status_column, max_table_rows, **table_options)
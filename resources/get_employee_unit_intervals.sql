@@ -0,0 +1,40 @@
+-- Jednorazowe pobranie wszystkich danych potrzebnych do wyznaczenia jednostki pracownika w dowolnym dniu.
+-- Wiersze 'T': teczki pracowników (DTYPEID 46) wraz z jednostką wiodącą (Priorytet 1 w get_employee_unit.sql).
+-- Wiersze 'P': przypisania z list 'Pracownik w jednostce' / 'Przełożony w jednostce' z zakresem dat (Priorytet 2).
+-- Przycinanie nazw jednostek do znaku '[' wykonuje employee_units.trim_unit_name.
+SELECT
+    'T' AS RowKind,
+    teczka.WFD_Signature AS Signature,
+    CAST(teczka.WFD_ID AS NVARCHAR(50)) AS PersonID,
+    CASE
+        WHEN teczka.WFD_AttChoose11 IS NOT NULL AND teczka.WFD_AttChoose11 <> '' THEN 1
+        ELSE 0
+    END AS HasLeadUnit,
+    dbo.ClearWFElem(teczka.WFD_AttChoose11) AS UnitName,
+    CASE WHEN jednostki.WFD_ID IS NOT NULL THEN 1 ELSE 0 END AS HasLeadUnitCode,
+    jednostki.WFD_AttText2 AS UnitCode,
+    CAST(NULL AS date) AS DateFrom,
+    CAST(NULL AS date) AS DateTo
+FROM WFElements AS teczka
+LEFT JOIN WFElements AS jednostki
+    ON jednostki.WFD_DTYPEID = '121' -- ID procesu 'Jednostki organizacyjne'
+    AND teczka.WFD_AttChoose11 IS NOT NULL AND teczka.WFD_AttChoose11 <> ''
+    AND jednostki.WFD_ID = dbo.ClearWFElemID(teczka.WFD_AttChoose11)
+WHERE teczka.WFD_DTYPEID = 46 -- ID procesu 'Teczka Pracownika'
+UNION ALL
+SELECT
+    'P' AS RowKind,
+    NULL AS Signature,
+    CAST(dbo.ClearWFElemID(DET_Att1) AS NVARCHAR(50)) AS PersonID,
+    0 AS HasLeadUnit,
+    WFD_AttText1 AS UnitName,
+    0 AS HasLeadUnitCode,
+    WFD_AttText2 AS UnitCode,
+    CAST(DET_Att2 AS date) AS DateFrom,
+    CAST(DET_Att3 AS date) AS DateTo
+FROM WFElements we
+JOIN WFElementDetails wed on we.WFD_ID = wed.DET_WFDID
+JOIN WFConfigurations wfcon on wed.DET_WFCONID = wfcon.WFCON_ID
+-- GUID'y listy pozycji 'Pracownik w jednostce' oraz 'Przełożony w jednostce'
+WHERE wfcon.WFCON_Guid IN ('924e9282-f968-408d-ae7a-492d1ad46144', 'a575d010-c775-4b02-84a4-b5e886a08645')
+  AND we.WFD_STPID = 313; -- Krok obiegu, na którym znajdują się aktywne przypisania
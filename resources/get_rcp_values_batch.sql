@@ -0,0 +1,90 @@
+-- Zbiorcze wyznaczenie jednostki, kodu jednostki i łącznego czasu dla wszystkich wpisów RCP
+-- zapisanych wcześniej w tabeli tymczasowej #RcpEntries (WFD_ID, ID_Pracownika, Dzien_Roboczy).
+-- Logika dla pojedynczego wpisu jest identyczna z get_employee_unit.sql i get_employee_unit_code.sql:
+-- Priorytet 1 = jednostka wiodąca z teczki, Priorytet 2 = jednostka z przypisania obowiązującego w dniu roboczym.
+WITH Przypisania AS (
+    -- Podzapytanie oparte na [SO]_Pracownicy_Jednostki_Przelozeni.sql
+    SELECT
+        dbo.ClearWFElemID(DET_Att1) as PersonID,
+        WFD_AttText1 as UnitName,
+        WFD_AttText2 as UnitCode,
+        DET_Att2 AS DateFrom,
+        DET_Att3 AS DateTo
+    FROM WFElements we
+    JOIN WFElementDetails wed on we.WFD_ID = wed.DET_WFDID
+    JOIN WFConfigurations wfcon on wed.DET_WFCONID = wfcon.WFCON_ID
+    -- GUID'y listy pozycji 'Pracownik w jednostce' oraz 'Przełożony w jednostce'
+    WHERE wfcon.WFCON_Guid IN ('924e9282-f968-408d-ae7a-492d1ad46144', 'a575d010-c775-4b02-84a4-b5e886a08645')
+      AND we.WFD_STPID = 313 -- Krok obiegu, na którym znajdują się aktywne przypisania
+)
+SELECT
+    e.WFD_ID,
+    Jednostka.UnitName,
+    KodJednostki.UnitCode,
+    Czas.TotalTime
+FROM #RcpEntries e
+OUTER APPLY (
+    -- Nazwa jednostki (get_employee_unit.sql)
+    SELECT TOP 1 W.UnitName
+    FROM (
+        SELECT
+            CASE
+                WHEN CHARINDEX('[', dbo.ClearWFElem(WFD_AttChoose11)) > 0
+                THEN LTRIM(RTRIM(SUBSTRING(dbo.ClearWFElem(WFD_AttChoose11), 1, CHARINDEX('[', dbo.ClearWFElem(WFD_AttChoose11)) - 1)))
+                ELSE dbo.ClearWFElem(WFD_AttChoose11)
+            END AS UnitName,
+            1 AS Priority
+        FROM WFElements
+        WHERE
+            WFD_DTYPEID = 46 -- ID procesu 'Teczka Pracownika'
+            AND WFD_Signature = e.ID_Pracownika
+            AND WFD_AttChoose11 IS NOT NULL AND WFD_AttChoose11 <> ''
+        UNION ALL
+        SELECT
+            CASE
+                WHEN CHARINDEX('[', Q1.UnitName) > 0
+                THEN LTRIM(RTRIM(SUBSTRING(Q1.UnitName, 1, CHARINDEX('[', Q1.UnitName) - 1)))
+                ELSE Q1.UnitName
+            END AS UnitName,
+            2 AS Priority
+        FROM Przypisania AS Q1
+        WHERE
+            Q1.PersonID = (SELECT WFD_ID FROM WFElements WHERE WFD_DTYPEID = 46 AND WFD_Signature = e.ID_Pracownika)
+            AND CAST(e.Dzien_Roboczy AS date) >= Q1.DateFrom
+            AND (Q1.DateTo IS NULL OR CAST(e.Dzien_Roboczy AS date) <= Q1.DateTo)
+    ) AS W
+    ORDER BY W.Priority ASC
+) AS Jednostka
+OUTER APPLY (
+    -- Kod jednostki (get_employee_unit_code.sql)
+    SELECT TOP 1 W.UnitCode
+    FROM (
+        SELECT
+            jednostki.WFD_AttText2 AS UnitCode,
+            1 AS Priority
+        FROM WFElements AS teczka_pracownika
+        JOIN WFElements AS jednostki
+            ON jednostki.WFD_DTYPEID = '121' -- ID procesu 'Jednostki organizacyjne'
+            AND jednostki.WFD_ID = dbo.ClearWFElemID(teczka_pracownika.WFD_AttChoose11)
+        WHERE
+            teczka_pracownika.WFD_DTYPEID = 46
+            AND teczka_pracownika.WFD_Signature = e.ID_Pracownika
+            AND teczka_pracownika.WFD_AttChoose11 IS NOT NULL AND teczka_pracownika.WFD_AttChoose11 <> ''
+        UNION ALL
+        SELECT
+            Q1.UnitCode,
+            2 AS Priority
+        FROM Przypisania AS Q1
+        WHERE
+            Q1.PersonID = (SELECT WFD_ID FROM WFElements WHERE WFD_DTYPEID = 46 AND WFD_Signature = e.ID_Pracownika)
+            AND CAST(e.Dzien_Roboczy AS date) >= Q1.DateFrom
+            AND (Q1.DateTo IS NULL OR CAST(e.Dzien_Roboczy AS date) <= Q1.DateTo)
+    ) AS W
+    ORDER BY W.Priority ASC
+) AS KodJednostki
+OUTER APPLY (
+    -- Łączny czas
+    SELECT SUM(DET_Value1) AS TotalTime
+    FROM WFElementDetails
+    WHERE DET_WFDID = e.WFD_ID
+) AS Czas;
@@ -0,0 +1,122 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+# Rodzaje kolumn obsługiwane przez RowDecoder
+RAW = "raw"    # wartość bez zmian
+TEXT = "text"  # None -> "" (odpowiednik `getattr(row, ..., "") or ""`)
+DATE = "date"  # tekst/datetime -> date, niepoprawna wartość -> None
+
+
+class RowDecodingError(Exception):
+    """Błąd dopasowania kolumn zapytania do definicji rekordu."""
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(date_str):
+    """Zamienia tekst daty (YYYY-MM-DD lub DD.MM.YYYY) na date. Wyniki są zapamiętywane."""
+    try:
+        # Format standardowy ISO: YYYY-MM-DD
+        if "-" in date_str:
+            return datetime.strptime(date_str, "%Y-%m-%d").date()
+        # Format polski: DD.MM.YYYY
+        elif "." in date_str:
+            return datetime.strptime(date_str, "%d.%m.%Y").date()
+    except ValueError:
+        pass
+    return None
+
+
+def parse_date(date_val):
+    """Próbuje bezpiecznie przekształcić string/datetime do obiektu daty w celach porównawczych."""
+    if not date_val:
+        return None
+
+    if isinstance(date_val, datetime):
+        return date_val.date()
+
+    if isinstance(date_val, date):
+        return date_val
+
+    if isinstance(date_val, str):
+        date_str = date_val.strip()[:10]
+        if not date_str:
+            return None
+        return _parse_date_text(date_str)
+
+    return None
+
+
+class Column:
+    """Definicja pola rekordu: nazwa atrybutu, nazwa kolumny w zapytaniu i sposób dekodowania."""
+
+    __slots__ = ("attr", "name", "kind", "optional")
+
+    def __init__(self, attr, name, kind=RAW, optional=False):
+        self.attr = attr
+        self.name = name
+        self.kind = kind
+        # Kolumna opcjonalna może nie występować w zapytaniu - pole ma wtedy wartość None
+        self.optional = optional
+
+
+class DecodedRecord:
+    """Klasa bazowa rekordów tworzonych przez RowDecoder."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+def _find_column(names, name):
+    """Zwraca indeks kolumny po nazwie (dokładnie, a w drugiej kolejności bez rozróżniania wielkości liter)."""
+    if name in names:
+        return names.index(name)
+    lowered = [n.lower() for n in names]
+    if name.lower() in lowered:
+        return lowered.index(name.lower())
+    return None
+
+
+class RowDecoder:
+    """Zamienia wiersze pyodbc na rekordy ze slotami.
+
+    Indeksy kolumn wyznaczane są raz na podstawie cursor.description, zamiast wyszukiwania po nazwie
+    (np. getattr(row, "Nazwa jednostki")) dla każdego pola każdego wiersza. Daty są parsowane
+    podczas dekodowania, a te same teksty dat są zamieniane tylko raz (parse_date z pamięcią podręczną).
+    """
+
+    def __init__(self, description, columns, record_name="Record"):
+        names = [column[0] for column in description]
+        missing = []
+        self._plan = []
+        for column in columns:
+            position = _find_column(names, column.name)
+            if position is None and not column.optional:
+                missing.append(column.name)
+            self._plan.append((column.attr, position, column.kind))
+        if missing:
+            raise RowDecodingError(
+                f"Zapytanie nie zwraca kolumn: {', '.join(missing)} (dostępne: {', '.join(names)})"
+            )
+        self.record_class = type(
+            record_name, (DecodedRecord,), {"__slots__": tuple(column.attr for column in columns)}
+        )
+
+    def decode(self, row):
+        """Zamienia jeden wiersz na rekord."""
+        record = self.record_class.__new__(self.record_class)
+        for attr, position, kind in self._plan:
+            value = row[position] if position is not None else None
+            if kind == TEXT:
+                value = value or ""
+            elif kind == DATE:
+                value = parse_date(value)
+            setattr(record, attr, value)
+        return record
+
+    def decode_all(self, rows):
+        """Zamienia listę wierszy na listę rekordów."""
+        decode = self.decode
+        return [decode(row) for row in rows]
@@ -0,0 +1,23 @@
+-- Dokumenty (D63) bez złączeń z Teczką, strukturą i jednostkami.
+-- Używane przez unified_unit_updater.py --cached-dimensions: przypisania do jednostek
+-- pobierane są z sql/unified_dim_*.sql, przechowywane lokalnie (.cache/) i łączone w Pythonie.
+SELECT
+    D63.WFD_ID,
+    D63.WFD_Signature,
+    D63.WFD_Guid,
+    D63.WFD_AttChoose10 AS 'Zgłaszający SmartPTR',
+    dbo.ClearWFElemID(D63.WFD_AttChoose10) AS 'ID z Teczki',
+    D63.WFD_AttChoose13 AS 'JO zgłaszającego (SmartPTR)',
+    D63.WFD_AttChoose12 AS 'JO prowadząca',
+    D63.WFD_AttChoose3 AS 'Prowadzący',
+    D63.WFD_AttChoose4 AS 'Przypisani',
+    D63.WFD_TSInsert AS 'Data utworzenia projektu'
+FROM
+    WFElements D63
+JOIN
+    WFSteps S63 ON D63.WFD_STPID = S63.STP_ID
+JOIN
+    WorkFlows W63 ON S63.STP_WFID = W63.WF_ID
+WHERE
+    W63.WF_Guid = '9d1b70e8-9161-4287-97d0-67d1e34e9c3e'
+    AND D63.WFD_IsDeleted = 0;
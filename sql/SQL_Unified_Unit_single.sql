@@ -0,0 +1,82 @@
+-- Wariant SQL_Unified_Unit.sql zwracający dokładnie jeden wiersz na dokument.
+-- Wybór jednostki obowiązującej w dniu utworzenia projektu odbywa się po stronie serwera (ROW_NUMBER),
+-- zamiast grupowania wierszy (dokument x przedział przypisania) w Pythonie.
+-- Warunek zgodny z unified_unit_updater.select_unit: brak daty lub niepoprawna data = przedział otwarty,
+-- nazwa jednostki nie może być pusta. Przy kilku pasujących przedziałach wygrywa najpóźniejsza 'Data od'.
+WITH Przypisania AS (
+    SELECT
+        D53.WFD_AttText16 AS ID_Uzytkownika,
+        D78.WFD_ID AS ID_Jednostki,
+        D78.WFD_AttText1 AS Nazwa_Jednostki,
+        DET73.DET_TSInsert,
+        CASE
+            WHEN CHARINDEX('-', LEFT(LTRIM(DET73.DET_Att2), 10)) > 0 THEN TRY_CONVERT(date, LEFT(LTRIM(DET73.DET_Att2), 10), 23)
+            WHEN CHARINDEX('.', LEFT(LTRIM(DET73.DET_Att2), 10)) > 0 THEN TRY_CONVERT(date, LEFT(LTRIM(DET73.DET_Att2), 10), 104)
+        END AS Data_Od,
+        CASE
+            WHEN CHARINDEX('-', LEFT(LTRIM(DET73.DET_Att3), 10)) > 0 THEN TRY_CONVERT(date, LEFT(LTRIM(DET73.DET_Att3), 10), 23)
+            WHEN CHARINDEX('.', LEFT(LTRIM(DET73.DET_Att3), 10)) > 0 THEN TRY_CONVERT(date, LEFT(LTRIM(DET73.DET_Att3), 10), 104)
+        END AS Data_Do
+    -- SQL_53 (Teczka)
+    FROM WFElements D53
+    JOIN WFSteps S53 ON D53.WFD_STPID = S53.STP_ID
+    JOIN WorkFlows W53 ON S53.STP_WFID = W53.WF_ID
+    -- SQL_73 (Lista Pozycji - Struktura)
+    JOIN WFElementDetails DET73 ON CAST(D53.WFD_ID AS VARCHAR) = dbo.ClearWFElemID(DET73.DET_Att1)
+    JOIN WFConfigurations WFCON ON DET73.DET_WFCONID = WFCON.WFCON_ID
+    -- SQL_78 (Jednostka)
+    JOIN WFElements D78 ON DET73.DET_WFDID = D78.WFD_ID
+    JOIN WFSteps S78 ON D78.WFD_STPID = S78.STP_ID
+    JOIN WorkFlows W78 ON S78.STP_WFID = W78.WF_ID
+    WHERE W53.WF_Guid = '535ce703-16c1-4df2-a38d-8f4dc42cac0e'
+      AND D53.WFD_IsDeleted = 0
+      AND WFCON.WFCON_Guid IN (
+        '924e9282-f968-408d-ae7a-492d1ad46144', -- Pracownicy
+        'a575d010-c775-4b02-84a4-b5e886a08645'  -- Przełożeni
+      )
+      AND DET73.DET_IsDeleted = 0
+      AND W78.WF_Guid = '2f2358bf-e7b0-4d9a-9931-b7e9db3d70f7'
+      AND D78.WFD_IsDeleted = 0
+      AND D78.WFD_AttText1 IS NOT NULL AND D78.WFD_AttText1 <> ''
+),
+Jednostki AS (
+    SELECT
+        D63.WFD_ID AS ID_Dokumentu,
+        P.ID_Jednostki,
+        P.Nazwa_Jednostki,
+        ROW_NUMBER() OVER (
+            PARTITION BY D63.WFD_ID
+            ORDER BY P.Data_Od DESC, P.DET_TSInsert DESC
+        ) AS Kolejnosc
+    FROM WFElements D63
+    JOIN WFSteps S63 ON D63.WFD_STPID = S63.STP_ID
+    JOIN WorkFlows W63 ON S63.STP_WFID = W63.WF_ID
+    JOIN Przypisania P ON dbo.ClearWFElemID(D63.WFD_AttChoose10) = P.ID_Uzytkownika
+    WHERE W63.WF_Guid = '9d1b70e8-9161-4287-97d0-67d1e34e9c3e'
+      AND D63.WFD_IsDeleted = 0
+      AND (P.Data_Od IS NULL OR CAST(D63.WFD_TSInsert AS date) >= P.Data_Od)
+      AND (P.Data_Do IS NULL OR CAST(D63.WFD_TSInsert AS date) <= P.Data_Do)
+)
+SELECT
+    D63.WFD_ID,
+    D63.WFD_Signature,
+    D63.WFD_Guid,
+    D63.WFD_AttChoose10 AS 'Zgłaszający SmartPTR',
+    dbo.ClearWFElemID(D63.WFD_AttChoose10) AS 'ID z Teczki',
+    D63.WFD_AttChoose13 AS 'JO zgłaszającego (SmartPTR)',
+    D63.WFD_AttChoose12 AS 'JO prowadząca',
+    D63.WFD_AttChoose3 AS 'Prowadzący',
+    D63.WFD_AttChoose4 AS 'Przypisani',
+    J.ID_Jednostki AS 'ID_Jednostki_Organizacyjnej',
+    J.Nazwa_Jednostki AS 'Nazwa jednostki',
+    D63.WFD_TSInsert AS 'Data utworzenia projektu'
+FROM
+    WFElements D63
+JOIN
+    WFSteps S63 ON D63.WFD_STPID = S63.STP_ID
+JOIN
+    WorkFlows W63 ON S63.STP_WFID = W63.WF_ID
+LEFT JOIN Jednostki J ON J.ID_Dokumentu = D63.WFD_ID AND J.Kolejnosc = 1
+WHERE
+    W63.WF_Guid = '9d1b70e8-9161-4287-97d0-67d1e34e9c3e'
+    AND D63.WFD_IsDeleted = 0;
@@ -0,0 +1,62 @@
+-- Porównanie kontrahentów z plikiem CSV po stronie serwera (kontrahenci_updater.py --server-diff).
+-- Dane CSV ładowane są wcześniej do #KontrahenciCsv (NIP już znormalizowany, pusta wartość = NULL).
+-- Normalizacja NIP jak normalize_nip: obcięcie spacji i usunięcie prefiksu 'PL' (bez rozróżniania wielkości liter).
+-- Porównanie wartości binarne (Latin1_General_BIN2) i z długością, bo '=' w SQL Server ignoruje spacje na końcu.
+-- Dwa zestawy wyników: liczba kontrahentów dopasowanych po NIP (także gdy nic się nie zmienia)
+-- oraz tylko kontrahenci, dla których zmienia się co najmniej jedno pole.
+SET NOCOUNT ON;
+
+IF OBJECT_ID('tempdb..#KontrahenciDopasowani') IS NOT NULL DROP TABLE #KontrahenciDopasowani;
+
+WITH Kontrahenci AS (
+    SELECT
+        D.WFD_Signature,
+        D.WFD_AttText17 AS NazwaKontrahenta,
+        D.WFD_AttText3 AS NIP,
+        CASE
+            WHEN UPPER(LEFT(LTRIM(RTRIM(D.WFD_AttText3)), 2)) = 'PL'
+                THEN SUBSTRING(LTRIM(RTRIM(D.WFD_AttText3)), 3, 4000)
+            ELSE LTRIM(RTRIM(D.WFD_AttText3))
+        END AS NIP_Znormalizowany,
+        ISNULL(D.WFD_AttChoose12, '') AS GrupaFirm,
+        ISNULL(D.WFD_AttChoose4, '') AS Branza,
+        ISNULL(D.WFD_AttChoose2, '') AS ProfilKontrahenta,
+        ISNULL(D.WFD_AttChoose3, '') AS TypKontrahenta
+    FROM
+        dbo.WFElements D
+    JOIN
+        dbo.WFSteps S ON D.WFD_STPID = S.STP_ID
+    JOIN
+        dbo.WorkFlows W ON S.STP_WFID = W.WF_ID
+    WHERE
+        W.WF_Guid = 'aee5a82c-5eed-465a-8cfc-cf41089c5731'
+        AND D.WFD_IsDeleted = 0
+        AND D.WFD_AttText3 IS NOT NULL
+)
+SELECT
+    K.WFD_Signature,
+    K.NazwaKontrahenta,
+    K.NIP,
+    K.GrupaFirm, C.GrupaFirm AS NowaGrupaFirm,
+    K.Branza, C.Branza AS NowaBranza,
+    K.ProfilKontrahenta, C.ProfilKontrahenta AS NowyProfilKontrahenta,
+    K.TypKontrahenta, C.TypKontrahenta AS NowyTypKontrahenta
+INTO #KontrahenciDopasowani
+FROM Kontrahenci K
+JOIN #KontrahenciCsv C
+    ON C.NIP = K.NIP_Znormalizowany COLLATE Latin1_General_BIN2;
+
+SELECT COUNT(*) AS LiczbaDopasowanych
+FROM #KontrahenciDopasowani;
+
+SELECT *
+FROM #KontrahenciDopasowani
+WHERE
+    (NowaGrupaFirm IS NOT NULL
+        AND (NowaGrupaFirm <> GrupaFirm COLLATE Latin1_General_BIN2 OR DATALENGTH(NowaGrupaFirm) <> DATALENGTH(GrupaFirm)))
+    OR (NowaBranza IS NOT NULL
+        AND (NowaBranza <> Branza COLLATE Latin1_General_BIN2 OR DATALENGTH(NowaBranza) <> DATALENGTH(Branza)))
+    OR (NowyProfilKontrahenta IS NOT NULL
+        AND (NowyProfilKontrahenta <> ProfilKontrahenta COLLATE Latin1_General_BIN2 OR DATALENGTH(NowyProfilKontrahenta) <> DATALENGTH(ProfilKontrahenta)))
+    OR (NowyTypKontrahenta IS NOT NULL
+        AND (NowyTypKontrahenta <> TypKontrahenta COLLATE Latin1_General_BIN2 OR DATALENGTH(NowyTypKontrahenta) <> DATALENGTH(TypKontrahenta)));
@@ -0,0 +1,18 @@
+-- Kontrahenci z podanym TypKontrahenta (kontrahenci_typ_updater.py --pushdown, tryb testowy).
+-- Filtr po stronie serwera zamiast pobierania wszystkich kontrahentów i porównania w Pythonie.
+-- Porównanie binarne (Latin1_General_BIN2) - z rozróżnianiem wielkości liter, jak '==' w Pythonie.
+SELECT
+    D.WFD_Signature,
+    D.WFD_AttText17 AS NazwaKontrahenta,
+    D.WFD_AttText3 AS NIP,
+    D.WFD_AttChoose3 AS TypKontrahenta
+FROM
+    dbo.WFElements D
+JOIN
+    dbo.WFSteps S ON D.WFD_STPID = S.STP_ID
+JOIN
+    dbo.WorkFlows W ON S.STP_WFID = W.WF_ID
+WHERE
+    W.WF_Guid = 'aee5a82c-5eed-465a-8cfc-cf41089c5731'
+    AND D.WFD_IsDeleted = 0
+    AND D.WFD_AttChoose3 COLLATE Latin1_General_BIN2 = #{StaraWartosc}#
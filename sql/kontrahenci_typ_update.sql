@@ -0,0 +1,36 @@
+-- Zamiana TypKontrahenta jedną instrukcją UPDATE (kontrahenci_typ_updater.py --pushdown --update/--single).
+-- TOP (Limit) ogranicza liczbę zmienianych rekordów (--single, porcje --commit-every).
+-- Zmienione wiersze zwracane są przez OUTPUT ... INTO zmiennej tabelarycznej - samo OUTPUT bez INTO
+-- nie jest dozwolone dla tabel z wyzwalaczami. SET NOCOUNT ON: pierwszym wynikiem jest końcowy SELECT.
+SET NOCOUNT ON;
+
+DECLARE @Zmienione TABLE (
+    WFD_Signature nvarchar(max),
+    NazwaKontrahenta nvarchar(max),
+    NIP nvarchar(max),
+    TypKontrahenta nvarchar(max),
+    NowyTypKontrahenta nvarchar(max)
+);
+
+UPDATE TOP (#{Limit}#) D
+SET D.WFD_AttChoose3 = #{NowaWartosc}#
+OUTPUT
+    inserted.WFD_Signature,
+    inserted.WFD_AttText17,
+    inserted.WFD_AttText3,
+    deleted.WFD_AttChoose3,
+    inserted.WFD_AttChoose3
+INTO @Zmienione
+FROM
+    dbo.WFElements D
+JOIN
+    dbo.WFSteps S ON D.WFD_STPID = S.STP_ID
+JOIN
+    dbo.WorkFlows W ON S.STP_WFID = W.WF_ID
+WHERE
+    W.WF_Guid = 'aee5a82c-5eed-465a-8cfc-cf41089c5731'
+    AND D.WFD_IsDeleted = 0
+    AND D.WFD_AttChoose3 COLLATE Latin1_General_BIN2 = #{StaraWartosc}#;
+
+SELECT WFD_Signature, NazwaKontrahenta, NIP, TypKontrahenta, NowyTypKontrahenta
+FROM @Zmienione;
@@ -15,5 +15,6 @@ JOIN
 WHERE 
     W.WF_Guid = 'aee5a82c-5eed-465a-8cfc-cf41089c5731'
     AND D.WFD_IsDeleted = 0
-    -- Dodany filtr:
-    -- AND dbo.ClearWFElem(D.WFD_AttChoose12) = 'Twoja Wartość Tekstowa'
\ No newline at end of file
+    -- Dodany filtr (bez dbo.ClearWFElem - funkcja wywoływana dla każdego wiersza): po ID wartości pola wyboru
+    -- wzorcem z prefiksem, który może korzystać z indeksu (zob. choice_filters.id_predicate):
+    -- AND D.WFD_AttChoose12 LIKE '123#%'
@@ -0,0 +1,9 @@
+-- SQL_78 (Jednostka): WFD_ID jednostki -> nazwa
+SELECT
+    D78.WFD_ID,
+    D78.WFD_AttText1
+FROM WFElements D78
+JOIN WFSteps S78 ON D78.WFD_STPID = S78.STP_ID
+JOIN WorkFlows W78 ON S78.STP_WFID = W78.WF_ID
+WHERE W78.WF_Guid = '2f2358bf-e7b0-4d9a-9931-b7e9db3d70f7'
+  AND D78.WFD_IsDeleted = 0;
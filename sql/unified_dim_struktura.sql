@@ -0,0 +1,14 @@
+-- SQL_73 (Lista Pozycji - Struktura): przypisania teczek do jednostek z zakresem dat
+SELECT
+    DET73.DET_WFDID,
+    dbo.ClearWFElemID(DET73.DET_Att1) AS DET_Att1_ID,
+    DET73.DET_Att2,
+    DET73.DET_Att3,
+    DET73.DET_TSInsert
+FROM WFElementDetails DET73
+JOIN WFConfigurations WFCON ON DET73.DET_WFCONID = WFCON.WFCON_ID
+WHERE WFCON.WFCON_Guid IN (
+    '924e9282-f968-408d-ae7a-492d1ad46144', -- Pracownicy
+    'a575d010-c775-4b02-84a4-b5e886a08645'  -- Przełożeni
+  )
+  AND DET73.DET_IsDeleted = 0;
@@ -0,0 +1,9 @@
+-- SQL_53 (Teczka): ID użytkownika (WFD_AttText16) -> WFD_ID teczki
+SELECT
+    D53.WFD_ID,
+    D53.WFD_AttText16
+FROM WFElements D53
+JOIN WFSteps S53 ON D53.WFD_STPID = S53.STP_ID
+JOIN WorkFlows W53 ON S53.STP_WFID = W53.WF_ID
+WHERE W53.WF_Guid = '535ce703-16c1-4df2-a38d-8f4dc42cac0e'
+  AND D53.WFD_IsDeleted = 0;
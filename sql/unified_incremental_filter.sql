@@ -0,0 +1,34 @@
+-- Warunek doklejany do zapytań SQL_Unified_Unit*.sql w trybie --incremental.
+-- Dokument jest analizowany ponownie, gdy: został utworzony/zmieniony od ostatniego przebiegu
+-- albo zmieniła się Teczka zgłaszającego lub jego przypisania do jednostek.
+-- Dopasowanie Teczki bez dbo.ClearWFElemID: wartość pola wyboru 'ID#Nazwa' zaczyna się od ID Teczki
+-- (LIKE z prefiksem). ID są liczbowe, więc nie zawierają znaków specjalnych LIKE.
+AND (
+    D63.WFD_TSInsert >= #{Dokumenty}#
+    OR D63.WFD_TSUpdate >= #{Dokumenty}#
+    OR EXISTS (
+        SELECT 1
+        FROM WFElements D53
+        JOIN WFSteps S53 ON D53.WFD_STPID = S53.STP_ID
+        JOIN WorkFlows W53 ON S53.STP_WFID = W53.WF_ID
+        WHERE W53.WF_Guid = '535ce703-16c1-4df2-a38d-8f4dc42cac0e'
+          AND D53.WFD_TSUpdate >= #{Teczki}#
+          AND D63.WFD_AttChoose10 LIKE D53.WFD_AttText16 + '#%'
+    )
+    OR EXISTS (
+        SELECT 1
+        FROM WFElements D53
+        JOIN WFSteps S53 ON D53.WFD_STPID = S53.STP_ID
+        JOIN WorkFlows W53 ON S53.STP_WFID = W53.WF_ID
+        JOIN WFElementDetails DET73 ON DET73.DET_Att1 LIKE CAST(D53.WFD_ID AS VARCHAR(20)) + '#%'
+        JOIN WFConfigurations WFCON ON DET73.DET_WFCONID = WFCON.WFCON_ID
+        JOIN WFElements D78 ON DET73.DET_WFDID = D78.WFD_ID
+        WHERE W53.WF_Guid = '535ce703-16c1-4df2-a38d-8f4dc42cac0e'
+          AND WFCON.WFCON_Guid IN (
+            '924e9282-f968-408d-ae7a-492d1ad46144', -- Pracownicy
+            'a575d010-c775-4b02-84a4-b5e886a08645'  -- Przełożeni
+          )
+          AND (DET73.DET_TSInsert >= #{Struktura}# OR D78.WFD_TSUpdate >= #{Jednostki}#)
+          AND D63.WFD_AttChoose10 LIKE D53.WFD_AttText16 + '#%'
+    )
+)
@@ -0,0 +1,26 @@
+-- Znacznik zmian dla unified_unit_updater.py --incremental.
+-- Najpóźniejsze znaczniki czasu dokumentów (D63), Teczek (D53), pozycji struktury (DET73) i jednostek (D78).
+-- Edycja listy pozycji zapisuje jednostkę, więc usunięcie/zmiana przypisania podnosi D78.WFD_TSUpdate.
+SELECT
+    (SELECT MAX(CASE WHEN D63.WFD_TSUpdate > D63.WFD_TSInsert THEN D63.WFD_TSUpdate ELSE D63.WFD_TSInsert END)
+     FROM WFElements D63
+     JOIN WFSteps S63 ON D63.WFD_STPID = S63.STP_ID
+     JOIN WorkFlows W63 ON S63.STP_WFID = W63.WF_ID
+     WHERE W63.WF_Guid = '9d1b70e8-9161-4287-97d0-67d1e34e9c3e') AS Dokumenty,
+    (SELECT MAX(D53.WFD_TSUpdate)
+     FROM WFElements D53
+     JOIN WFSteps S53 ON D53.WFD_STPID = S53.STP_ID
+     JOIN WorkFlows W53 ON S53.STP_WFID = W53.WF_ID
+     WHERE W53.WF_Guid = '535ce703-16c1-4df2-a38d-8f4dc42cac0e') AS Teczki,
+    (SELECT MAX(DET73.DET_TSInsert)
+     FROM WFElementDetails DET73
+     JOIN WFConfigurations WFCON ON DET73.DET_WFCONID = WFCON.WFCON_ID
+     WHERE WFCON.WFCON_Guid IN (
+        '924e9282-f968-408d-ae7a-492d1ad46144', -- Pracownicy
+        'a575d010-c775-4b02-84a4-b5e886a08645'  -- Przełożeni
+     )) AS Struktura,
+    (SELECT MAX(D78.WFD_TSUpdate)
+     FROM WFElements D78
+     JOIN WFSteps S78 ON D78.WFD_STPID = S78.STP_ID
+     JOIN WorkFlows W78 ON S78.STP_WFID = W78.WF_ID
+     WHERE W78.WF_Guid = '2f2358bf-e7b0-4d9a-9931-b7e9db3d70f7') AS Jednostki;
@@ -0,0 +1,121 @@
+import os
+import re
+
+# Katalog projektu - ścieżki do plików SQL są liczone względem modułu, a nie bieżącego katalogu (np. cron)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Katalogi, z których wczytywane są wszystkie pliki *.sql
+SQL_DIRECTORIES = ("sql", "resources")
+
+# Zmienne w stylu WEBCON, np. #{Numer_teczki_pracownika}#, zamieniane na parametry pyodbc '?'
+PLACEHOLDER_PATTERN = re.compile(r"#\{([^{}#]+)\}#")
+
+_registry = None
+
+
+class SqlTemplateError(Exception):
+    """Błąd wczytania lub użycia szablonu SQL."""
+
+
+class SqlTemplate:
+    """Gotowe do wykonania zapytanie SQL wraz z oczekiwaną liczbą parametrów."""
+
+    __slots__ = ("name", "path", "text", "param_count", "placeholders")
+
+    def __init__(self, name, path, text, param_count, placeholders):
+        self.name = name
+        self.path = path
+        self.text = text
+        self.param_count = param_count
+        self.placeholders = placeholders
+
+    def params(self, *params):
+        """Sprawdza liczbę parametrów i zwraca je jako krotkę dla cursor.execute."""
+        if len(params) != self.param_count:
+            raise SqlTemplateError(
+                f"Zapytanie {self.name} oczekuje {self.param_count} parametrów, przekazano {len(params)}."
+            )
+        return params
+
+    def execute(self, cursor, *params):
+        """Wykonuje zapytanie na podanym kursorze. Ten sam tekst zapytania pozwala sterownikowi ponownie użyć planu."""
+        return cursor.execute(self.text, self.params(*params))
+
+
+def count_parameters(sql_text):
+    """Zlicza parametry '?' poza literałami tekstowymi, identyfikatorami [..] i komentarzami."""
+    count = 0
+    i = 0
+    length = len(sql_text)
+    while i < length:
+        char = sql_text[i]
+        if char == "-" and sql_text.startswith("--", i):
+            end = sql_text.find("\n", i)
+            i = length if end == -1 else end + 1
+            continue
+        if char == "/" and sql_text.startswith("/*", i):
+            end = sql_text.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char in ("'", "["):
+            closing = "'" if char == "'" else "]"
+            i += 1
+            while i < length:
+                if sql_text[i] == closing:
+                    # Podwojony znak zamykający oznacza znak wewnątrz literału ('' lub ]])
+                    if i + 1 < length and sql_text[i + 1] == closing:
+                        i += 2
+                        continue
+                    break
+                i += 1
+            i += 1
+            continue
+        if char == "?":
+            count += 1
+        i += 1
+    return count
+
+
+def _load_template(name, path):
+    """Wczytuje plik SQL, zamienia zmienne #{...}# na '?' i waliduje wynik."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw_text = f.read()
+
+    if not raw_text.strip():
+        raise SqlTemplateError(f"Plik SQL jest pusty: {path}")
+
+    placeholders = tuple(PLACEHOLDER_PATTERN.findall(raw_text))
+    text = PLACEHOLDER_PATTERN.sub("?", raw_text)
+    if "#{" in text:
+        raise SqlTemplateError(f"Niepoprawna zmienna #{{...}}# w pliku SQL: {path}")
+
+    return SqlTemplate(name, path, text, count_parameters(text), placeholders)
+
+
+def load_registry():
+    """Wczytuje jednokrotnie (na proces) wszystkie pliki SQL z katalogów sql/ i resources/."""
+    global _registry
+    if _registry is not None:
+        return _registry
+
+    registry = {}
+    for directory in SQL_DIRECTORIES:
+        dir_path = os.path.join(BASE_DIR, directory)
+        if not os.path.isdir(dir_path):
+            continue
+        for file_name in sorted(os.listdir(dir_path)):
+            if not file_name.lower().endswith(".sql"):
+                continue
+            name = f"{directory}/{file_name}"
+            registry[name] = _load_template(name, os.path.join(dir_path, file_name))
+
+    _registry = registry
+    return _registry
+
+
+def get_template(name):
+    """Zwraca szablon po nazwie względnej, np. 'resources/get_employee_unit.sql'."""
+    template = load_registry().get(name.replace("\\", "/"))
+    if template is None:
+        raise SqlTemplateError(f"Nie znaleziono pliku SQL: {os.path.join(BASE_DIR, name)}")
+    return template
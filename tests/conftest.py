@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Skrypty leżą w katalogu głównym projektu - testy importują je bezpośrednio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,96 @@
+import pytest
+
+from bulk_writer import build_update_statement, group_by_columns, write_grouped
+from commit_control import ChunkedCommitter
+
+
+class FakeCursor:
+    """Kursor zapisujący wywołania; wiersz z kluczem z failing_keys powoduje błąd zapisu."""
+
+    def __init__(self, failing_keys=()):
+        self.failing_keys = set(failing_keys)
+        self.fast_executemany = False
+        self.batches = []
+        self.rows = []
+
+    def executemany(self, statement, params):
+        if any(row[-1] in self.failing_keys for row in params):
+            raise RuntimeError("błąd porcji")
+        self.batches.append((statement, list(params)))
+
+    def execute(self, statement, params):
+        if params[-1] in self.failing_keys:
+            raise RuntimeError(f"błąd rekordu {params[-1]}")
+        self.rows.append((statement, params))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def test_group_by_columns_groups_by_column_set_in_order():
+    groups = group_by_columns([
+        (1, {"B": 2, "A": 1}),
+        (2, {"A": 3}),
+        (3, {}),
+        (4, {"A": 5, "B": 6}),
+    ])
+
+    assert list(groups) == [("A", "B"), ("A",)]
+    assert groups[("A", "B")] == [(1, (1, 2)), (4, (5, 6))]
+    assert groups[("A",)] == [(2, (3,))]
+
+
+def test_build_update_statement():
+    assert build_update_statement("WFElements", "WFD_ID", ("A", "B")) == \
+        "UPDATE WFElements SET A = ?, B = ? WHERE WFD_ID = ?"
+
+
+def test_write_grouped_batches_per_column_set():
+    cursor = FakeCursor()
+    changes = [(key, {"A": key}) for key in range(5)] + [(9, {"A": 0, "B": 1})]
+
+    errors = write_grouped(cursor, "T", "ID", changes, batch_size=2)
+
+    assert errors == [None] * 6
+    assert [len(params) for _, params in cursor.batches] == [2, 2, 1, 1]
+    assert cursor.batches[-1] == ("UPDATE T SET A = ?, B = ? WHERE ID = ?", [(0, 1, 9)])
+    assert cursor.fast_executemany is False
+
+
+def test_write_grouped_falls_back_to_single_rows_on_batch_error():
+    cursor = FakeCursor(failing_keys={2})
+    connection = FakeConnection()
+    committer = ChunkedCommitter(connection)
+    changes = [(key, {"A": key}) for key in range(4)]
+
+    errors = write_grouped(cursor, "T", "ID", changes, batch_size=10, committer=committer)
+
+    assert [error is None for error in errors] == [True, True, False, True]
+    assert [params[-1] for _, params in cursor.rows] == [0, 1, 3]
+    assert committer.pending_rows == 3
+
+
+@pytest.mark.parametrize("failing_keys, expected_keys", [
+    ((), [0, 1, 2]),
+    ((1,), [0, 1, 2, 3]),
+    ((0, 1, 2, 3, 4, 5), [0, 1, 2, 3, 4, 5]),
+])
+def test_write_grouped_limit_counts_only_successful_writes(failing_keys, expected_keys):
+    cursor = FakeCursor(failing_keys=failing_keys)
+    changes = [(key, {"A": key}) for key in range(6)]
+
+    errors = write_grouped(cursor, "T", "ID", changes, batch_size=10, limit=3)
+
+    assert len(errors) == len(expected_keys)
+    assert errors.count(None) == min(3, len(changes) - len(failing_keys))
+    written = [params[-1] for _, batch in cursor.batches for params in batch]
+    written += [params[-1] for _, params in cursor.rows]
+    assert sorted(written) == [key for key in expected_keys if key not in failing_keys]
@@ -0,0 +1,51 @@
+from choice_codec import ChoiceList, choice_name, encode_choice, parse_choice, parse_choice_list
+
+
+def test_parse_choice_splits_on_first_separator():
+    assert parse_choice("12#Nazwa#z#krzyżykiem") == ("12", "Nazwa#z#krzyżykiem")
+    assert parse_choice(" 12 # Nazwa ") == ("12", " Nazwa")
+    assert parse_choice("Bez ID") == (None, "Bez ID")
+    assert parse_choice("") is None
+    assert parse_choice(None) is None
+
+
+def test_parse_choice_returns_cached_object():
+    assert parse_choice("7#Kraków") is parse_choice("7#Kraków")
+
+
+def test_choice_name():
+    assert choice_name("7#Kraków") == "Kraków"
+    assert choice_name("Kraków") == "Kraków"
+    assert choice_name(None) == ""
+
+
+def test_encode_choice_round_trip():
+    assert encode_choice("7", "Kraków") == "7#Kraków"
+    assert encode_choice(None, "Kraków") == "Kraków"
+    assert encode_choice(" ", "Kraków") == "Kraków"
+    assert parse_choice(encode_choice("7", "Kraków")) == ("7", "Kraków")
+
+
+def test_choice_list_skips_empty_and_duplicate_ids():
+    choices = ChoiceList("1#Jan;;2#Anna; 1#Jan Kowalski ;Bez ID")
+
+    assert [choice.id for choice in choices] == ["1", "2", None]
+    assert len(choices) == 3
+    assert "1#Inna nazwa" in choices
+    assert "Bez ID" in choices
+    assert "3#Piotr" not in choices
+    assert choices.encode() == "1#Jan;2#Anna;Bez ID"
+
+
+def test_choice_list_appended_keeps_raw_text():
+    choices = ChoiceList("1#Jan;2#Anna")
+
+    assert choices.appended("3#Piotr") == "1#Jan;2#Anna ; 3#Piotr"
+    assert choices.appended("2#Anna Nowak") == "1#Jan;2#Anna"
+    assert choices.appended("") == "1#Jan;2#Anna"
+    assert ChoiceList(None).appended("3#Piotr") == "3#Piotr"
+    assert choices.raw == "1#Jan;2#Anna"
+
+
+def test_parse_choice_list_is_cached():
+    assert parse_choice_list("1#Jan;2#Anna") is parse_choice_list("1#Jan;2#Anna")
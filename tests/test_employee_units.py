@@ -0,0 +1,68 @@
+from datetime import date, datetime
+
+from employee_units import EmployeeUnitIndex, UnitIntervalIndex, trim_unit_name
+
+
+def test_trim_unit_name_cuts_at_bracket():
+    assert trim_unit_name("Dział IT [DIT]") == "Dział IT"
+    assert trim_unit_name("Dział IT") == "Dział IT"
+    assert trim_unit_name(None) is None
+
+
+def test_interval_bounds_are_inclusive():
+    index = UnitIntervalIndex()
+    index.add(1, date(2024, 1, 1), date(2024, 1, 31), "A")
+
+    assert index.lookup(1, date(2023, 12, 31)) is None
+    assert index.lookup(1, date(2024, 1, 1)) == "A"
+    assert index.lookup(1, date(2024, 1, 31)) == "A"
+    assert index.lookup(1, date(2024, 2, 1)) is None
+
+
+def test_overlapping_intervals_resolve_to_latest_start():
+    index = UnitIntervalIndex()
+    index.add(1, date(2024, 1, 1), None, "A")
+    index.add(1, date(2024, 3, 1), date(2024, 3, 31), "B")
+
+    assert index.lookup(1, date(2024, 2, 15)) == "A"
+    assert index.lookup(1, date(2024, 3, 15)) == "B"
+    # Po zakończeniu późniejszego przypisania obowiązuje znów wcześniejsze (otwarte)
+    assert index.lookup(1, date(2024, 4, 1)) == "A"
+
+
+def test_lookup_keys_ignore_case_and_trailing_spaces():
+    index = UnitIntervalIndex()
+    index.add("ab1 ", datetime(2024, 1, 1, 8, 30), None, "A")
+
+    assert index.lookup("AB1", datetime(2024, 1, 1, 12, 0)) == "A"
+    assert index.lookup("other", date(2024, 1, 1)) is None
+    assert index.lookup("AB1", None) is None
+
+
+def test_lead_unit_has_priority_over_assignment():
+    index = EmployeeUnitIndex()
+    index.add_employee("T/1", 10, True, "Wiodąca [W]", True, "W01")
+    index.add_assignment(10, date(2024, 1, 1), None, "Przypisana [P]", "P01")
+
+    assert index.resolve("T/1", date(2024, 6, 1)) == ("Wiodąca", "W01")
+
+
+def test_assignment_fills_missing_lead_unit_or_code():
+    index = EmployeeUnitIndex()
+    index.add_employee("T/1", 10, False, None, True, "W01")
+    index.add_employee("T/2", 20, True, "Wiodąca", False, None)
+    index.add_assignment(10, date(2024, 1, 1), None, "Przypisana [P]", "P01")
+    index.add_assignment(20, date(2024, 1, 1), None, "Inna", "I01")
+
+    assert index.resolve("T/1", date(2024, 6, 1)) == ("Przypisana", "W01")
+    assert index.resolve("T/2", date(2024, 6, 1)) == ("Wiodąca", "I01")
+    assert index.resolve("T/1", date(2023, 6, 1)) == (None, "W01")
+
+
+def test_assignment_without_start_date_is_ignored():
+    index = EmployeeUnitIndex()
+    index.add_employee("T/1", 10, False, None, False, None)
+    index.add_assignment(10, None, None, "Przypisana", "P01")
+
+    assert index.resolve("T/1", date(2024, 6, 1)) == (None, None)
+    assert index.resolve("brak", date(2024, 6, 1)) == (None, None)
@@ -0,0 +1,84 @@
+import pytest
+
+# pyodbc bez biblioteki unixODBC zgłasza ImportError (libodbc), a nie ModuleNotFoundError
+pytest.importorskip("pyodbc", exc_type=ImportError)
+pytest.importorskip("dotenv")
+pytest.importorskip("rich")
+
+from kontrahenci_updater import normalize_nip, parse_csv_data  # noqa: E402
+
+HEADER = "Nazwa kontrahenta;NIP;Grupa firm;Branża;Profil kontrahenta;Typ kontrahenta"
+
+
+def write_csv(tmp_path, *lines):
+    path = tmp_path / "kontrahenci.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8-sig")
+    return str(path)
+
+
+def test_normalize_nip():
+    assert normalize_nip(" PL1234567890 ") == "1234567890"
+    assert normalize_nip("pl1234567890") == "1234567890"
+    assert normalize_nip("1234567890") == "1234567890"
+    assert normalize_nip(None) == ""
+
+
+def test_parse_csv_data_keys_records_by_normalized_nip(tmp_path):
+    path = write_csv(
+        tmp_path,
+        HEADER,
+        'Firma "A";PL123; 1#Grupa ;2#Budownictwo;3#Profil;4#Typ',
+        "Firma B;456;;;;",
+    )
+
+    csv_data, skipped, duplicates = parse_csv_data(path)
+
+    assert (skipped, duplicates) == (0, 0)
+    assert csv_data["123"] == {
+        "nazwa": 'Firma "A"',
+        "raw_nip": "PL123",
+        "Grupa firm": "1#Grupa",
+        "Branża": "2#Budownictwo",
+        "Profil kontrahenta": "3#Profil",
+        "Typ kontrahenta": "4#Typ",
+    }
+    assert csv_data["456"]["Grupa firm"] == ""
+
+
+def test_parse_csv_data_counts_skipped_and_duplicates(tmp_path):
+    path = write_csv(
+        tmp_path,
+        HEADER,
+        "Firma A;123;1#Stara;;;",
+        "",
+        "Bez NIP;;;;;",
+        ";;;;;",
+        "   ",
+        "Tylko prefiks;PL;;;;",
+        "Firma A nowa;PL123;1#Nowa;;;",
+    )
+
+    csv_data, skipped, duplicates = parse_csv_data(path)
+
+    assert list(csv_data) == ["123"]
+    assert csv_data["123"]["Grupa firm"] == "1#Nowa"
+    # Pusta linia nie jest rekordem; pozostałe linie bez NIP są pomijane i liczone
+    assert skipped == 4
+    assert duplicates == 1
+
+
+def test_parse_csv_data_handles_missing_columns(tmp_path):
+    path = write_csv(tmp_path, "NIP;Nazwa kontrahenta", "123", "456;Firma")
+
+    csv_data, skipped, duplicates = parse_csv_data(path)
+
+    assert csv_data["123"]["nazwa"] == ""
+    assert csv_data["456"]["Branża"] == ""
+    assert (skipped, duplicates) == (0, 0)
+
+
+def test_parse_csv_data_empty_file(tmp_path):
+    path = tmp_path / "pusty.csv"
+    path.write_text("", encoding="utf-8")
+
+    assert parse_csv_data(str(path)) == ({}, 0, 0)
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+# pyodbc bez biblioteki unixODBC zgłasza ImportError (libodbc), a nie ModuleNotFoundError
+pytest.importorskip("pyodbc", exc_type=ImportError)
+pytest.importorskip("dotenv")
+pytest.importorskip("rich")
+
+from rcp_updater import split_date_range  # noqa: E402
+
+
+def test_split_by_day_keeps_last_shard_inclusive():
+    shards = split_date_range(datetime(2024, 1, 1), datetime(2024, 1, 3), "day")
+
+    assert shards == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 2), False),
+        (datetime(2024, 1, 2), datetime(2024, 1, 3), False),
+        (datetime(2024, 1, 3), datetime(2024, 1, 3), True),
+    ]
+
+
+def test_split_by_week_ends_with_partial_inclusive_shard():
+    shards = split_date_range(datetime(2024, 1, 1), datetime(2024, 1, 10), "week")
+
+    assert shards == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 8), False),
+        (datetime(2024, 1, 8), datetime(2024, 1, 10), True),
+    ]
+
+
+def test_split_covers_range_without_gaps():
+    start, end = datetime(2024, 1, 1), datetime(2024, 3, 1)
+    shards = split_date_range(start, end, "day")
+
+    assert shards[0][0] == start
+    assert shards[-1][1] == end
+    assert all(previous[1] == current[0] for previous, current in zip(shards, shards[1:]))
+    assert [inclusive for _, _, inclusive in shards].count(True) == 1
+
+
+def test_split_single_day_range():
+    day = datetime(2024, 1, 1)
+
+    assert split_date_range(day, day, "day") == [(day, day, True)]
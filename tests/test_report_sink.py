@@ -0,0 +1,103 @@
+import argparse
+import csv
+import json
+
+import pytest
+
+pytest.importorskip("rich")
+
+from report_sink import (  # noqa: E402
+    Diff,
+    DiffList,
+    add_report_arguments,
+    create_report_sink,
+    error_status,
+    validate_report_arguments,
+)
+
+COLUMNS = [("Sygnatura", {}), ("Zmiany", {}), ("Status", {})]
+
+
+class FakeConsole:
+    def __init__(self):
+        self.printed = []
+
+    def print(self, *values, **options):
+        self.printed.extend(values)
+
+
+def parse_report_args(*argv):
+    parser = argparse.ArgumentParser()
+    add_report_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_csv_sink_escapes_separators_and_strips_status_markup(tmp_path):
+    path = tmp_path / "raport.csv"
+    sink = create_report_sink("test", "Raport", COLUMNS, "csv", str(path), status_column="Status")
+
+    sink.add_row('A;1 "x"', Diff("Dział [IT]", "Dział\nHR"), "[green]Zaktualizowano[/green]")
+    sink.add_row("[bold]B[/bold]", DiffList([("Nazwa", "a", "b")]), error_status("[Microsoft][ODBC] błąd"))
+    sink.close(FakeConsole())
+
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+    assert rows == [
+        ["Sygnatura", "Zmiany", "Status"],
+        ['A;1 "x"', "Dział [IT] -> Dział\nHR", "Zaktualizowano"],
+        ["[bold]B[/bold]", "Nazwa: 'a' -> 'b'", "Błąd: [Microsoft][ODBC] błąd"],
+    ]
+
+
+def test_jsonl_sink_writes_one_object_per_row(tmp_path):
+    path = tmp_path / "raport.jsonl"
+    sink = create_report_sink("test", "Raport", COLUMNS, "jsonl", str(path), status_column="Status")
+
+    sink.add_row("Zażółć \"x\"\n", Diff(1, 2), "[yellow]Test[/yellow]")
+    sink.add_row("[b]", DiffList([("Nazwa", "a", None)]), None)
+    sink.close(FakeConsole())
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"Sygnatura": "Zażółć \"x\"\n", "Zmiany": {"old": 1, "new": 2}, "Status": "Test"},
+        {"Sygnatura": "[b]", "Zmiany": {"Nazwa": {"old": "a", "new": None}}, "Status": ""},
+    ]
+    assert "Zażółć" in lines[0]
+
+
+def test_summary_sink_counts_plain_statuses():
+    sink = create_report_sink("test", "Raport", COLUMNS, "summary", status_column="Status")
+    console = FakeConsole()
+
+    sink.add_row("A", None, "[green]OK[/green]")
+    sink.add_row("B", None, "OK")
+    sink.add_row("C", None, error_status("x"))
+    sink.close(console)
+
+    assert sink.statuses == {"OK": 2, "Błąd: x": 1}
+    assert console.printed == ["Raport: 3 wierszy (OK: 2, Błąd: x: 1)."]
+
+
+def test_table_sink_limits_shown_rows():
+    sink = create_report_sink("test", "Raport", COLUMNS, max_table_rows=2, status_column="Status")
+    console = FakeConsole()
+
+    for index in range(5):
+        sink.add_row(f"[{index}]", Diff("a", "b"), "OK")
+    sink.close(console)
+
+    assert sink.row_count == 5
+    assert sink.table.row_count == 2
+    assert "Wyświetlono 2 z 5 wierszy" in console.printed[-1]
+
+
+@pytest.mark.parametrize("argv, valid", [
+    ((), True),
+    (("--max-table-rows", "1"), True),
+    (("--max-table-rows", "0"), False),
+    (("--report", "csv", "--report-file", "r.csv"), True),
+    (("--report-file", "r.csv"), False),
+])
+def test_validate_report_arguments(argv, valid):
+    assert (validate_report_arguments(parse_report_args(*argv)) is None) == valid
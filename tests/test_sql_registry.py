@@ -0,0 +1,56 @@
+import pytest
+
+from sql_registry import SqlTemplateError, _load_template, count_parameters, load_registry
+
+
+def test_count_parameters_counts_plain_markers():
+    assert count_parameters("SELECT * FROM T WHERE A = ? AND B IN (?, ?)") == 3
+
+
+def test_count_parameters_skips_literals_and_identifiers():
+    sql = "SELECT '?', 'it''s ?', [col?], [a]]?] FROM T WHERE A = ?"
+    assert count_parameters(sql) == 1
+
+
+def test_count_parameters_skips_comments():
+    sql = (
+        "-- czy ? jest parametrem\n"
+        "SELECT A FROM T /* ? ? */ WHERE A = ?\n"
+        "-- ostatni komentarz bez nowej linii ?"
+    )
+    assert count_parameters(sql) == 1
+
+
+def test_load_template_replaces_placeholders(tmp_path):
+    path = tmp_path / "query.sql"
+    path.write_text(
+        "SELECT * FROM T WHERE A = #{Numer_teczki}# AND B = #{Data}# -- #{Komentarz}#?\n",
+        encoding="utf-8",
+    )
+
+    template = _load_template("sql/query.sql", str(path))
+
+    assert template.placeholders == ("Numer_teczki", "Data", "Komentarz")
+    assert template.param_count == 2
+    assert template.params(1, 2) == (1, 2)
+    with pytest.raises(SqlTemplateError):
+        template.params(1)
+
+
+def test_load_template_rejects_empty_file(tmp_path):
+    path = tmp_path / "empty.sql"
+    path.write_text("  \n", encoding="utf-8")
+
+    with pytest.raises(SqlTemplateError):
+        _load_template("sql/empty.sql", str(path))
+
+
+def test_registry_loads_project_sql_files():
+    registry = load_registry()
+
+    assert registry
+    assert all(name.startswith(("sql/", "resources/")) for name in registry)
+    for template in registry.values():
+        # Zmienne #{...}# są jedynym źródłem '?' w plikach, które ich używają
+        if template.placeholders:
+            assert template.param_count == len(template.placeholders), template.name
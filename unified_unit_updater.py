@@ -1,11 +1,27 @@
 import os
+import csv
+import json
 import pyodbc
 from dotenv import load_dotenv
 from rich.console import Console
-from rich.table import Table
 from rich.progress import Progress
 import argparse
 from datetime import datetime
+from sql_registry import SqlTemplateError, get_template
+from commit_control import ChunkedCommitter, add_commit_arguments, validate_commit_arguments
+from bulk_writer import DEFAULT_GROUP_BATCH_SIZE, write_grouped
+from row_decoding import DATE, RAW, TEXT, Column, RowDecoder, parse_date
+from dimension_cache import DEFAULT_TTL_MINUTES, load_cached
+from employee_units import UnitIntervalIndex
+from choice_codec import encode_choice, parse_choice_list
+from report_sink import (
+    DEFAULT_MAX_TABLE_ROWS,
+    Diff,
+    add_report_arguments,
+    create_report_sink,
+    error_status,
+    validate_report_arguments,
+)
 
 # Załadowanie zmiennych środowiskowych
 load_dotenv()
@@ -19,10 +35,38 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-# Ścieżka do pliku SQL z zapytaniem pobierającym dane
-SQL_FILE_PATH = os.path.join(
-    os.path.dirname(os.path.abspath(__file__)), "sql", "SQL_Unified_Unit.sql"
+# Szablony SQL (sql_registry) z zapytaniem pobierającym dane
+SQL_TEMPLATE_NAME = "sql/SQL_Unified_Unit.sql"
+# Wariant z wyborem jednostki po stronie serwera - jeden wiersz na dokument
+SQL_SINGLE_TEMPLATE_NAME = "sql/SQL_Unified_Unit_single.sql"
+# Tryb --cached-dimensions: same dokumenty D63 + wymiary przechowywane lokalnie i łączone w Pythonie
+SQL_DOCUMENTS_TEMPLATE_NAME = "sql/SQL_Unified_Unit_documents.sql"
+DIM_TECZKI_SQL = "sql/unified_dim_teczki.sql"
+DIM_STRUKTURA_SQL = "sql/unified_dim_struktura.sql"
+DIM_JEDNOSTKI_SQL = "sql/unified_dim_jednostki.sql"
+DIMENSIONS_CACHE_NAME = "unified_unit_dimensions"
+
+# Tryb --incremental: znacznik zmian z ostatniego pełnego przebiegu aktualizacji
+WATERMARK_SQL = "sql/unified_watermark.sql"
+INCREMENTAL_FILTER_SQL = "sql/unified_incremental_filter.sql"
+STATE_FILE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".unified_unit_state.json"
 )
+WATERMARK_KEYS = ("Dokumenty", "Teczki", "Struktura", "Jednostki")
+WATERMARK_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+# Kolumny raportu (nagłówek, opcje kolumny tabeli)
+REPORT_COLUMNS = [
+    ("Sygnatura", {"style": "dim", "width": 12}),
+    ("JO zgłaszającego", {"width": 25}),
+    ("JO prowadząca", {"width": 25}),
+    ("Przypisani", {"width": 25}),
+    ("Prowadzący", {"width": 25}),
+    ("Status", {"style": "yellow", "width": 15}),
+]
+
+# Do tej liczby sygnatur (--signatures-file) filtr to lista IN (...), powyżej - tabela tymczasowa
+SIGNATURE_IN_LIMIT = 1000
 
 # Mapowanie kolumn, które chcemy zaktualizować (do dostosowania nazwy w bazie jeśli są inne)
 # WFD_AttChoose13 = JO zgłaszającego
@@ -33,6 +77,34 @@ SQL_FILE_PATH = os.path.join(
 # 'Nazwa jednostki' -> D78_T.WFD_AttText1
 # 'Zgłaszający SmartPTR' -> D63.WFD_AttChoose10
 
+# Kolumny zapytania dekodowane do rekordu (row_decoding.RowDecoder)
+UNIFIED_COLUMNS = (
+    Column("signature", "WFD_Signature"),
+    Column("zglaszajacy", "Zgłaszający SmartPTR", TEXT),
+    Column("jo_zglaszajacego", "JO zgłaszającego (SmartPTR)", TEXT),
+    Column("jo_prowadzaca", "JO prowadząca", TEXT),
+    Column("prowadzacy", "Prowadzący", TEXT),
+    Column("przypisani", "Przypisani", TEXT),
+    Column("id_jednostki", "ID_Jednostki_Organizacyjnej", RAW),
+    Column("nazwa_jednostki", "Nazwa jednostki", TEXT),
+    # Brak w sql/SQL_Unified_Unit_single.sql - przedział dat sprawdzany jest w SQL
+    Column("data_od", "Data od", DATE, optional=True),
+    Column("data_do", "Data do", DATE, optional=True),
+    Column("data_utworzenia", "Data utworzenia projektu", DATE),
+)
+
+# Kolumny sql/SQL_Unified_Unit_documents.sql (bez danych jednostki)
+DOCUMENT_COLUMNS = (
+    Column("signature", "WFD_Signature"),
+    Column("id_z_teczki", "ID z Teczki"),
+    Column("zglaszajacy", "Zgłaszający SmartPTR", TEXT),
+    Column("jo_zglaszajacego", "JO zgłaszającego (SmartPTR)", TEXT),
+    Column("jo_prowadzaca", "JO prowadząca", TEXT),
+    Column("prowadzacy", "Prowadzący", TEXT),
+    Column("przypisani", "Przypisani", TEXT),
+    Column("data_utworzenia", "Data utworzenia projektu", DATE),
+)
+
 
 def get_connection_string():
     """Tworzy connection string w zależności od metody uwierzytelniania."""
@@ -42,78 +114,366 @@ def get_connection_string():
         return f"DRIVER={{ODBC Driver 18 for SQL Server}};SERVER={DB_SERVER};DATABASE={DB_NAME};Trusted_Connection=yes;TrustServerCertificate=yes;"
 
 
-def get_sql_from_file(file_path):
-    """Wczytuje zapytanie SQL z pliku."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read()
+def unit_from_row(row):
+    """Zwraca jednostkę z rekordu ('ID#Nazwa') lub pusty tekst, gdy rekord nie ma nazwy jednostki."""
+    if not row.nazwa_jednostki:
+        return ""
+    return encode_choice(row.id_jednostki, row.nazwa_jednostki)
+
+
+def select_unit(rows):
+    """Wybiera jednostkę z pierwszego rekordu, którego przedział dat obejmuje datę utworzenia projektu.
+
+    Używane dla sql/SQL_Unified_Unit.sql (wiersz na każdy przedział przypisania). Wariant
+    sql/SQL_Unified_Unit_single.sql wykonuje ten wybór w SQL - wtedy wystarcza unit_from_row.
+    """
+    for row in rows:
+        data_utworzenia = row.data_utworzenia
+
+        is_valid = True
+        if data_utworzenia:
+            if row.data_od and data_utworzenia < row.data_od:
+                is_valid = False
+            if row.data_do and data_utworzenia > row.data_do:
+                is_valid = False
+
+        if is_valid:
+            unit = unit_from_row(row)
+            if unit:
+                return unit
+    return ""
+
+
+def fetch_unit_dimensions(cursor):
+    """Pobiera Teczki (D53), strukturę (DET73) i jednostki (D78) jako słowniki do złączenia w Pythonie."""
+    teczki = {}
+    get_template(DIM_TECZKI_SQL).execute(cursor)
+    for wfd_id, id_uzytkownika in cursor.fetchall():
+        if id_uzytkownika:
+            teczki.setdefault(id_uzytkownika, []).append(str(wfd_id))
+
+    struktura = {}
+    get_template(DIM_STRUKTURA_SQL).execute(cursor)
+    for det_wfdid, id_teczki, data_od, data_do, det_tsinsert in cursor.fetchall():
+        if id_teczki:
+            struktura.setdefault(id_teczki.strip(), []).append(
+                (det_wfdid, parse_date(data_od), parse_date(data_do), det_tsinsert)
+            )
 
+    jednostki = {}
+    get_template(DIM_JEDNOSTKI_SQL).execute(cursor)
+    for wfd_id, nazwa in cursor.fetchall():
+        if nazwa:
+            jednostki[wfd_id] = nazwa
+
+    return {"teczki": teczki, "struktura": struktura, "jednostki": jednostki}
+
+
+def build_unit_index(dimensions):
+    """Buduje indeks przedziałów: ID z Teczki -> (ID jednostki, nazwa) obowiązujące w danym dniu.
+
+    Rozstrzyganie jak w sql/SQL_Unified_Unit_single.sql: najpóźniejsza 'Data od', a przy równej
+    dacie - najpóźniej dodana pozycja struktury.
+    """
+    index = UnitIntervalIndex()
+    jednostki = dimensions["jednostki"]
+    struktura = dimensions["struktura"]
+    for id_uzytkownika, teczki_ids in dimensions["teczki"].items():
+        przypisania = []
+        for teczka_id in teczki_ids:
+            przypisania.extend(struktura.get(teczka_id, ()))
+        # UnitIntervalIndex przy równej dacie początkowej zostawia przedział dodany jako pierwszy
+        przypisania.sort(key=lambda p: p[3] or datetime.min, reverse=True)
+        for det_wfdid, data_od, data_do, _ in przypisania:
+            nazwa = jednostki.get(det_wfdid)
+            if nazwa:
+                index.add(id_uzytkownika, data_od, data_do, (det_wfdid, nazwa))
+    return index.build()
+
+
+def evaluate_document(signature, base_row, valid_nazwa_z_id):
+    """Wyznacza zmiany dla jednego dokumentu. Zwraca rekord do aktualizacji lub None, gdy brak zmian."""
+    zglaszajacy_smartptr = base_row.zglaszajacy
+
+    aktualne_jo_zglaszajacego = base_row.jo_zglaszajacego
+    aktualna_jo_prowadzaca = base_row.jo_prowadzaca
+    aktualny_prowadzacy = base_row.prowadzacy
+    aktualni_przypisani = base_row.przypisani
+
+    # Zakładamy nowe wartości na podstawie wymagań
+    nowe_jo_zglaszajacego = valid_nazwa_z_id
+    nowe_jo_prowadzaca = valid_nazwa_z_id
+
+    # Jeśli nie ma "Nazwa jednostki" z poprawnego przedziału dat, nie nadpisuj JO
+    if not valid_nazwa_z_id and aktualne_jo_zglaszajacego:
+        nowe_jo_zglaszajacego = aktualne_jo_zglaszajacego
+        nowe_jo_prowadzaca = aktualna_jo_prowadzaca
+
+    # Aktualizacja pola Przypisani: dopisujemy Zgłaszającego, jeśli jeszcze go tam nie ma (porównanie po ID)
+    nowy_przypisani = parse_choice_list(aktualni_przypisani).appended(zglaszajacy_smartptr)
+
+    nowy_prowadzacy = zglaszajacy_smartptr
+
+    # Zmiany zapisywane jako (kolumna, stara wartość, nowa wartość) - markup powstaje dopiero w raporcie
+    diffs = (
+        ("WFD_AttChoose13", aktualne_jo_zglaszajacego, nowe_jo_zglaszajacego),
+        ("WFD_AttChoose12", aktualna_jo_prowadzaca, nowe_jo_prowadzaca),
+        ("WFD_AttChoose4", aktualni_przypisani, nowy_przypisani),
+        ("WFD_AttChoose3", aktualny_prowadzacy, nowy_prowadzacy),
+    )
+    updates = {column: new for column, old, new in diffs if old != new}
 
-def parse_date(date_val):
-    """Próbuje bezpiecznie przekształcić string/datetime do obiektu daty w celach porównawczych."""
-    if not date_val:
+    if not updates:
         return None
 
-    if isinstance(date_val, datetime):
-        return date_val.date()
+    return {
+        "wfd_signature": signature,
+        "updates": updates,
+        "diffs": diffs,
+    }
+
+
+def load_signatures(path):
+    """Wczytuje sygnatury z pliku - jedna w wierszu lub CSV (pierwsza kolumna, separator ';' lub ',').
+
+    Pomija puste wiersze, nagłówek ('WFD_Signature'/'Sygnatura') i duplikaty; kolejność jest zachowana.
+    """
+    with open(path, "r", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = ";" if ";" in sample else ","
+        signatures = []
+        seen = set()
+        for row in csv.reader(f, delimiter=delimiter):
+            if not row:
+                continue
+            signature = row[0].strip()
+            if not signature or signature.lower() in ("wfd_signature", "sygnatura"):
+                continue
+            if signature not in seen:
+                seen.add(signature)
+                signatures.append(signature)
+    return signatures
+
+
+def apply_signature_filter(cursor, sql_query, target_signature=None, signatures=None):
+    """Dokleja do zapytania filtr po sygnaturze/sygnaturach. Zwraca (zapytanie, parametry).
+
+    Dla listy do SIGNATURE_IN_LIMIT sygnatur używa IN (?, ...), dla dłuższej ładuje sygnatury
+    do tabeli tymczasowej #Signatures - w obu przypadkach całość to jedno zapytanie.
+    """
+    # Usuwamy z końcówki ';' jeżeli jest, żeby bezpiecznie dokleić AND
+    base_query = sql_query.rstrip().rstrip(";")
+    if target_signature:
+        return base_query + " AND D63.WFD_Signature = ?;", (target_signature,)
+    if not signatures:
+        return sql_query, ()
+
+    if len(signatures) <= SIGNATURE_IN_LIMIT:
+        placeholders = ", ".join("?" for _ in signatures)
+        return base_query + f" AND D63.WFD_Signature IN ({placeholders});", tuple(signatures)
+
+    cursor.execute("IF OBJECT_ID('tempdb..#Signatures') IS NOT NULL DROP TABLE #Signatures")
+    cursor.execute(
+        "CREATE TABLE #Signatures (WFD_Signature NVARCHAR(100) COLLATE DATABASE_DEFAULT PRIMARY KEY)"
+    )
+    cursor.fast_executemany = True
+    try:
+        cursor.executemany(
+            "INSERT INTO #Signatures (WFD_Signature) VALUES (?)",
+            [(signature,) for signature in signatures],
+        )
+    finally:
+        cursor.fast_executemany = False
+    return (
+        base_query + " AND D63.WFD_Signature IN (SELECT WFD_Signature FROM #Signatures);",
+        (),
+    )
 
-    if isinstance(date_val, str):
-        date_str = date_val.strip()[:10]
-        if not date_str:
-            return None
-        try:
-            # Format standardowy ISO: YYYY-MM-DD
-            if "-" in date_str:
-                return datetime.strptime(date_str, "%Y-%m-%d").date()
-            # Format polski: DD.MM.YYYY
-            elif "." in date_str:
-                return datetime.strptime(date_str, "%d.%m.%Y").date()
-        except ValueError:
-            pass
 
-    return None
+def fetch_watermark(cursor):
+    """Pobiera bieżący znacznik zmian (najpóźniejsze znaczniki czasu dokumentów i wymiarów)."""
+    get_template(WATERMARK_SQL).execute(cursor)
+    row = cursor.fetchone()
+    return dict(zip(WATERMARK_KEYS, row))
 
 
-def update_record(cursor, wfd_signature, updates):
-    """Aktualizuje rekord w tabeli WFElements po WFD_Signature."""
-    set_clauses = []
-    params = []
-    for col, val in updates.items():
-        set_clauses.append(f"{col} = ?")
-        params.append(val)
+class StateFileError(Exception):
+    """Pliku stanu (znacznika zmian) nie można odczytać - jest uszkodzony lub niekompletny."""
 
-    params.append(wfd_signature)
-    query = f"UPDATE WFElements SET {', '.join(set_clauses)} WHERE WFD_Signature = ?"
-    cursor.execute(query, tuple(params))
 
+def load_watermark():
+    """Wczytuje znacznik z pliku stanu. Zwraca None, gdy brak pliku lub niepełnych danych.
 
-def process_unified_unit(mode="test", target_signature=None, limit_count=30):
-    """Nawiązuje połączenie z bazą danych, pobiera dane z zapytania i opcjonalnie aktualizuje rekordy."""
+    Uszkodzony plik (niepoprawny JSON, brak kluczy, zły format daty) zgłaszany jest jako StateFileError.
+    """
+    if not os.path.exists(STATE_FILE_PATH):
+        return None
+    try:
+        with open(STATE_FILE_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        watermark = {}
+        for key in WATERMARK_KEYS:
+            value = state["watermark"][key]
+            if not value:
+                return None
+            watermark[key] = datetime.strptime(value, WATERMARK_FORMAT)
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError) as ex:
+        raise StateFileError(f"{type(ex).__name__}: {ex}")
+    return watermark
+
+
+def save_watermark(watermark, updated_count):
+    """Zapisuje znacznik po pełnym przebiegu aktualizacji (atomowo - przez plik tymczasowy)."""
+    state = {
+        "watermark": {
+            key: value.strftime(WATERMARK_FORMAT) if value else None
+            for key, value in watermark.items()
+        },
+        "updated_count": updated_count,
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    temp_path = STATE_FILE_PATH + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, STATE_FILE_PATH)
+
+
+def apply_incremental_filter(sql_query, watermark):
+    """Dokleja warunek trybu przyrostowego. Zwraca (zapytanie, parametry)."""
+    template = get_template(INCREMENTAL_FILTER_SQL)
+    params = template.params(*(watermark[name] for name in template.placeholders))
+    return sql_query.rstrip().rstrip(";") + "\n" + template.text.rstrip() + ";", params
+
+
+def save_watermark_if_complete(watermark, mode, targeted, updated_count=0, expected_count=0):
+    """Zapisuje znacznik zmian tylko po pełnym (bez filtrów sygnatur i limitów) i bezbłędnym przebiegu --update."""
+    if watermark is None or mode != "update" or targeted:
+        return
+    if updated_count < expected_count:
+        console.print(
+            f"Nie zapisano znacznika zmian: zaktualizowano {updated_count} z {expected_count} rekordów.",
+            style="bold yellow",
+        )
+        return
+    save_watermark(watermark, updated_count)
+    console.print(f"Zapisano znacznik zmian w {STATE_FILE_PATH}.", style="dim")
+
+
+def process_unified_unit(
+    mode="test",
+    target_signature=None,
+    limit_count=30,
+    commit_every=None,
+    max_txn_seconds=None,
+    unit_selection="sql",
+    cached_dimensions=False,
+    cache_ttl=DEFAULT_TTL_MINUTES,
+    refresh_cache=False,
+    signatures=None,
+    incremental=None,
+    report="table",
+    report_file=None,
+    max_table_rows=DEFAULT_MAX_TABLE_ROWS,
+):
+    """Nawiązuje połączenie z bazą danych, pobiera dane z zapytania i opcjonalnie aktualizuje rekordy.
+
+    incremental: None - bez znacznika zmian, "incremental" - tylko dokumenty zmienione od ostatniego
+    pełnego przebiegu, "full" - wszystkie dokumenty; w obu przypadkach --update zapisuje nowy znacznik.
+    """
     connection = None
+    committer = None
     updated_count = 0
     records_to_change = []
 
     try:
         # 1. Wczytanie zapytania SQL
-        if not os.path.exists(SQL_FILE_PATH):
-            console.print(
-                f"Nie znaleziono pliku SQL: {SQL_FILE_PATH}", style="bold red"
-            )
+        try:
+            if cached_dimensions:
+                template_name = SQL_DOCUMENTS_TEMPLATE_NAME
+            elif unit_selection == "sql":
+                template_name = SQL_SINGLE_TEMPLATE_NAME
+            else:
+                template_name = SQL_TEMPLATE_NAME
+            sql_query = get_template(template_name).text
+        except (OSError, SqlTemplateError) as ex:
+            console.print(f"Błąd wczytywania pliku SQL: {ex}", style="bold red")
             return
 
-        sql_query = get_sql_from_file(SQL_FILE_PATH)
-
         # 2. Połączenie z bazą i pobranie danych
         conn_str = get_connection_string()
         connection = pyodbc.connect(conn_str)
         cursor = connection.cursor()
+        committer = ChunkedCommitter(
+            connection, commit_every, max_txn_seconds, console
+        )
+
+        watermark = None
+        if incremental:
+            # Znacznik odczytany przed analizą - zmiany wprowadzone w trakcie przebiegu trafią do następnego
+            watermark = fetch_watermark(cursor)
+
+        unit_index = None
+        if cached_dimensions:
+            # Zapisywany znacznik zmian dotyczy też Teczek, struktury i jednostek - dane z pamięci
+            # podręcznej mogłyby nie zawierać zmian sprzed znacznika, które nie wróciłyby już w kolejnych
+            # przebiegach --incremental. Ze znacznikiem wymiary są zawsze pobierane z bazy.
+            if incremental and not refresh_cache:
+                console.print(
+                    "Tryb ze znacznikiem zmian: Teczki, struktura i jednostki zostaną pobrane z bazy.",
+                    style="dim",
+                )
+            dimensions, cache_age = load_cached(
+                DIMENSIONS_CACHE_NAME,
+                lambda: fetch_unit_dimensions(cursor),
+                cache_ttl,
+                refresh_cache or bool(incremental),
+            )
+            if cache_age is None:
+                console.print(
+                    "Pobrano Teczki, strukturę i jednostki z bazy (zapisano w pamięci podręcznej).",
+                    style="bold blue",
+                )
+            else:
+                console.print(
+                    f"Teczki, struktura i jednostki z pamięci podręcznej (wiek {cache_age / 60:.0f} min).",
+                    style="dim",
+                )
+            unit_index = build_unit_index(dimensions)
+
+        incremental_params = ()
+        if incremental:
+            try:
+                previous = load_watermark() if incremental == "incremental" else None
+            except StateFileError as ex:
+                console.print(
+                    f"Nie można odczytać pliku stanu {STATE_FILE_PATH} ({ex}). Usuń plik albo uruchom "
+                    f"pełny przebieg --full --update, który zapisze nowy znacznik zmian.",
+                    style="bold red",
+                    markup=False,
+                )
+                return
+            if previous:
+                sql_query, incremental_params = apply_incremental_filter(sql_query, previous)
+                console.print(
+                    f"Tryb przyrostowy: zmiany od {previous['Dokumenty']:%Y-%m-%d %H:%M:%S}.",
+                    style="bold blue",
+                )
+            elif incremental == "incremental":
+                console.print(
+                    "Brak zapisanego znacznika zmian - wykonywany jest pełny przebieg.",
+                    style="yellow",
+                )
 
         console.print("Pobieranie danych z bazy...", style="bold blue")
-        if target_signature:
-            # Używamy REPLACE, żeby usunąć z końcówki ';' jeżeli jest, żeby bezpiecznie dokleić AND
-            safe_query = sql_query.rstrip().rstrip(";") + " AND D63.WFD_Signature = ?;"
-            cursor.execute(safe_query, (target_signature,))
+        query, params = apply_signature_filter(
+            cursor, sql_query, target_signature, signatures
+        )
+        params = tuple(incremental_params) + tuple(params)
+        if params:
+            cursor.execute(query, params)
         else:
-            cursor.execute(sql_query)
+            cursor.execute(query)
 
         db_rows = cursor.fetchall()
 
@@ -121,6 +481,7 @@ def process_unified_unit(mode="test", target_signature=None, limit_count=30):
             console.print(
                 "Nie znaleziono żadnych rekordów w bazie danych.", style="bold red"
             )
+            save_watermark_if_complete(watermark, mode, target_signature or signatures)
             return
 
         console.print(
@@ -128,150 +489,59 @@ def process_unified_unit(mode="test", target_signature=None, limit_count=30):
         )
 
         # 3. Analiza danych i przygotowanie listy aktualizacji
-        from collections import defaultdict
-
-        grouped_rows = defaultdict(list)
-        for row in db_rows:
-            grouped_rows[row.WFD_Signature].append(row)
-
-        matched_count = len(grouped_rows)
+        columns = DOCUMENT_COLUMNS if unit_index is not None else UNIFIED_COLUMNS
+        decoder = RowDecoder(cursor.description, columns, "UnifiedUnitRow")
+        records = decoder.decode_all(db_rows)
+
+        if unit_index is not None:
+            # Złączenie z lokalnymi wymiarami - jednostka obowiązująca w dniu utworzenia projektu
+            documents = []
+            for row in records:
+                unit = unit_index.lookup(row.id_z_teczki, row.data_utworzenia)
+                documents.append(
+                    (row.signature, row, encode_choice(*unit) if unit else "")
+                )
+        elif unit_selection == "sql":
+            # Jednostka wybrana po stronie serwera - jeden wiersz na dokument
+            documents = [
+                (row.signature, row, unit_from_row(row)) for row in records
+            ]
+        else:
+            from collections import defaultdict
+
+            grouped_rows = defaultdict(list)
+            for row in records:
+                grouped_rows[row.signature].append(row)
+            documents = [
+                (signature, rows[0], select_unit(rows))
+                for signature, rows in grouped_rows.items()
+            ]
+
+        matched_count = len(documents)
+        if signatures:
+            # Porównanie w SQL Server nie rozróżnia wielkości liter
+            found = set(str(signature).lower() for signature, _, _ in documents)
+            missing = [s for s in signatures if s.lower() not in found]
+            if missing:
+                console.print(
+                    f"Nie znaleziono {len(missing)} z {len(signatures)} sygnatur z pliku, "
+                    f"np.: {', '.join(missing[:5])}",
+                    style="yellow",
+                )
         no_changes_count = 0
 
         with Progress() as progress:
-            task = progress.add_task("Analiza danych...", total=len(grouped_rows))
+            task = progress.add_task("Analiza danych...", total=len(documents))
 
-            for signature, rows in grouped_rows.items():
+            for signature, base_row, valid_nazwa_z_id in documents:
                 progress.advance(task)
 
-                base_row = rows[0]
-                zglaszajacy_smartptr = (
-                    getattr(base_row, "Zgłaszający SmartPTR", "") or ""
-                )
-
-                aktualne_jo_zglaszajacego = (
-                    getattr(base_row, "JO zgłaszjącego (SmartPTR)", "") or ""
-                )
-                aktualna_jo_prowadzaca = getattr(base_row, "JO prowadząca", "") or ""
-                aktualny_prowadzacy = getattr(base_row, "Prowadzący", "") or ""
-                aktualni_przypisani = getattr(base_row, "Przypisani", "") or ""
-
-                # Szukamy prawidłowej "Nazwa jednostki" analizując przedziały czasowe we wszystkich wierszach
-                valid_nazwa_jednostki = ""
-                valid_nazwa_z_id = ""
-                for row in rows:
-                    data_od = parse_date(getattr(row, "Data od", None))
-                    data_do = parse_date(getattr(row, "Data do", None))
-                    data_utworzenia = parse_date(
-                        getattr(row, "Data utworzenia projektu", None)
-                    )
-
-                    is_valid = True
-                    if data_utworzenia:
-                        if data_od and data_utworzenia < data_od:
-                            is_valid = False
-                        if data_do and data_utworzenia > data_do:
-                            is_valid = False
-
-                    if is_valid:
-                        nazwa = getattr(row, "Nazwa jednostki", "") or ""
-                        id_jednostki = getattr(row, "ID_Jednostki_Organizacyjnej", "")
-                        if nazwa:
-                            valid_nazwa_jednostki = nazwa
-                            if id_jednostki is not None and str(id_jednostki).strip():
-                                valid_nazwa_z_id = f"{id_jednostki}#{nazwa}"
-                            else:
-                                valid_nazwa_z_id = nazwa
-                            break
-
-                updates = {}
-
-                # Zakładamy nowe wartości na podstawie wymagań
-                nowe_jo_zglaszajacego = valid_nazwa_z_id
-                nowe_jo_prowadzaca = valid_nazwa_z_id
-
-                # Jeśli nie ma "Nazwa jednostki" z poprawnego przedziału dat, nie nadpisuj JO
-                if not valid_nazwa_z_id and aktualne_jo_zglaszajacego:
-                    nowe_jo_zglaszajacego = aktualne_jo_zglaszajacego
-                    nowe_jo_prowadzaca = aktualna_jo_prowadzaca
-
-                # Aktualizacja pola Przypisani: dopisujemy Zgłaszającego, jeśli jeszcze go tam nie ma
-                if aktualni_przypisani:
-                    przypisani_list = [
-                        p.strip() for p in aktualni_przypisani.split(";") if p.strip()
-                    ]
-                    if (
-                        zglaszajacy_smartptr
-                        and zglaszajacy_smartptr not in przypisani_list
-                    ):
-                        nowy_przypisani = (
-                            aktualni_przypisani + f" ; {zglaszajacy_smartptr}"
-                        )
-                    else:
-                        nowy_przypisani = aktualni_przypisani
-                else:
-                    nowy_przypisani = zglaszajacy_smartptr
-
-                nowy_prowadzacy = zglaszajacy_smartptr
-
-                columns_info = {
-                    "jo_zglaszajacego": "",
-                    "jo_prowadzaca": "",
-                    "przypisani": "",
-                    "prowadzacy": "",
-                }
-
-                # Sprawdzamy co trzeba zaktualizować
-                # JO zgłaszającego
-                if aktualne_jo_zglaszajacego != nowe_jo_zglaszajacego:
-                    updates["WFD_AttChoose13"] = nowe_jo_zglaszajacego
-                    columns_info["jo_zglaszajacego"] = (
-                        f"[red]{aktualne_jo_zglaszajacego}[/red]\n-> [green]{nowe_jo_zglaszajacego}[/green]"
-                    )
-                else:
-                    columns_info["jo_zglaszajacego"] = (
-                        f"[dim]{aktualne_jo_zglaszajacego}[/dim]"
-                    )
-
-                # JO prowadząca
-                if aktualna_jo_prowadzaca != nowe_jo_prowadzaca:
-                    updates["WFD_AttChoose12"] = nowe_jo_prowadzaca
-                    columns_info["jo_prowadzaca"] = (
-                        f"[red]{aktualna_jo_prowadzaca}[/red]\n-> [green]{nowe_jo_prowadzaca}[/green]"
-                    )
-                else:
-                    columns_info["jo_prowadzaca"] = (
-                        f"[dim]{aktualna_jo_prowadzaca}[/dim]"
-                    )
-
-                # Przypisani
-                if aktualni_przypisani != nowy_przypisani:
-                    updates["WFD_AttChoose4"] = nowy_przypisani
-                    columns_info["przypisani"] = (
-                        f"[red]{aktualni_przypisani}[/red]\n-> [green]{nowy_przypisani}[/green]"
-                    )
-                else:
-                    columns_info["przypisani"] = f"[dim]{aktualni_przypisani}[/dim]"
-
-                # Prowadzący
-                if aktualny_prowadzacy != nowy_prowadzacy:
-                    updates["WFD_AttChoose3"] = nowy_prowadzacy
-                    columns_info["prowadzacy"] = (
-                        f"[red]{aktualny_prowadzacy}[/red]\n-> [green]{nowy_prowadzacy}[/green]"
-                    )
-                else:
-                    columns_info["prowadzacy"] = f"[dim]{aktualny_prowadzacy}[/dim]"
-
-                if not updates:
+                record = evaluate_document(signature, base_row, valid_nazwa_z_id)
+                if record is None:
                     no_changes_count += 1
                     continue
 
-                records_to_change.append(
-                    {
-                        "wfd_signature": signature,
-                        "updates": updates,
-                        "columns_info": columns_info,
-                    }
-                )
+                records_to_change.append(record)
 
         console.print(
             f"\nPrzeanalizowano {matched_count} unikalnych rekordów.", style="bold blue"
@@ -283,81 +553,84 @@ def process_unified_unit(mode="test", target_signature=None, limit_count=30):
                 "Nie znaleziono rekordów wymagających aktualizacji.",
                 style="bold yellow",
             )
+            save_watermark_if_complete(watermark, mode, target_signature or signatures)
             return
 
         console.print(
             f"Do aktualizacji: {len(records_to_change)} rekordów.\n", style="bold green"
         )
 
-        # 4. Aktualizacja i wyświetlenie raportu
-        table = Table(
-            title="Raport aktualizacji JO i ról",
+        # 4. Aktualizacja i raport (wiersze z records_to_change przekazywane do wybranego formatu raportu)
+        report_sink = create_report_sink(
+            "unified_unit",
+            "Raport aktualizacji JO i ról",
+            REPORT_COLUMNS,
+            report,
+            report_file,
+            max_table_rows,
+            status_column="Status",
             show_header=True,
             header_style="bold magenta",
         )
-        table.add_column("Sygnatura", style="dim", width=12)
-        table.add_column("JO zgłaszającego", width=25)
-        table.add_column("JO prowadząca", width=25)
-        table.add_column("Przypisani", width=25)
-        table.add_column("Prowadzący", width=25)
-        table.add_column("Status", style="yellow", width=15)
-
-        if mode in ("update", "single", "limit", "update_signature"):
-            if mode in ("single", "limit"):
-                total = limit_count
-            else:
-                total = len(records_to_change)
 
-            with Progress() as update_progress:
-                update_task = update_progress.add_task(
-                    "Aktualizacja rekordów...", total=total
-                )
-                for record in records_to_change:
-                    try:
-                        update_record(
-                            cursor, record["wfd_signature"], record["updates"]
-                        )
+        try:
+            if mode in ("update", "single", "limit", "update_signature"):
+                # --single / --limit: zapis do osiągnięcia limit_count udanych aktualizacji
+                write_limit = limit_count if mode in ("single", "limit") else None
+
+                # Zapis grupami o tym samym zestawie zmienianych kolumn (maks. 2^4 wariantów UPDATE)
+                with Progress() as update_progress:
+                    update_task = update_progress.add_task(
+                        "Aktualizacja rekordów...",
+                        total=min(len(records_to_change), write_limit or len(records_to_change)),
+                    )
+                    errors = write_grouped(
+                        cursor,
+                        "WFElements",
+                        "WFD_Signature",
+                        [(record["wfd_signature"], record["updates"]) for record in records_to_change],
+                        committer.chunk_size(DEFAULT_GROUP_BATCH_SIZE),
+                        committer,
+                        update_progress,
+                        update_task,
+                        limit=write_limit,
+                        console=console,
+                    )
+
+                # errors obejmuje tylko rekordy, których zapis był próbowany
+                for record, error in zip(records_to_change, errors):
+                    if error is None:
                         update_status = "[bold green]Zaktualizowano[/bold green]"
                         updated_count += 1
-                    except Exception as e:
-                        update_status = f"[bold red]Błąd: {e}[/bold red]"
-
-                    update_progress.advance(update_task)
+                    else:
+                        update_status = error_status(error)
 
-                    ci = record["columns_info"]
-                    table.add_row(
+                    report_sink.add_row(
                         str(record["wfd_signature"]),
-                        ci["jo_zglaszajacego"],
-                        ci["jo_prowadzaca"],
-                        ci["przypisani"],
-                        ci["prowadzacy"],
+                        *(Diff(old, new) for _, old, new in record["diffs"]),
                         update_status,
                     )
-
-                    if mode in ("single", "limit") and updated_count >= limit_count:
-                        break
-        else:
-            for record in records_to_change:
-                ci = record["columns_info"]
-                table.add_row(
-                    str(record["wfd_signature"]),
-                    ci["jo_zglaszajacego"],
-                    ci["jo_prowadzaca"],
-                    ci["przypisani"],
-                    ci["prowadzacy"],
-                    "Oczekuje",
-                )
-
-        console.print(table)
+            else:
+                for record in records_to_change:
+                    report_sink.add_row(
+                        str(record["wfd_signature"]),
+                        *(Diff(old, new) for _, old, new in record["diffs"]),
+                        "Oczekuje",
+                    )
+        finally:
+            report_sink.close(console)
 
         if mode in ("update", "update_signature"):
-            connection.commit()
+            committer.finish()
             console.print(
                 f"Zakończono. Zaktualizowano {updated_count} rekordów.",
                 style="bold green",
             )
+            save_watermark_if_complete(
+                watermark, mode, target_signature or signatures, updated_count, len(records_to_change)
+            )
         elif mode in ("single", "limit"):
-            connection.commit()
+            committer.finish()
             console.print(
                 f"Zakończono w trybie z limitem. Zaktualizowano {updated_count} z maks. {limit_count} rekordów.",
                 style="bold green",
@@ -373,6 +646,11 @@ def process_unified_unit(mode="test", target_signature=None, limit_count=30):
         console.print(f"Pełny komunikat błędu: {ex}", style="bold red")
         if connection:
             connection.rollback()
+        if committer and committer.committed_rows:
+            console.print(
+                f"Przed błędem zatwierdzono {committer.committed_rows} rekordów.",
+                style="bold yellow",
+            )
     except Exception as e:
         console.print(f"Wystąpił nieoczekiwany błąd w skrypcie: {e}", style="bold red")
     finally:
@@ -423,8 +701,77 @@ if __name__ == "__main__":
         help="Ogranicz działanie skryptu (nawet w trybie testowym) do konkretnej Sygnatury.",
     )
 
+    parser.add_argument(
+        "--signatures-file",
+        type=str,
+        help="Ogranicz działanie skryptu do sygnatur z pliku (jedna w wierszu lub CSV - pierwsza kolumna).\n"
+        "Działa ze wszystkimi trybami: test, --single, --limit, --update.",
+    )
+
+    parser.add_argument(
+        "--unit-selection",
+        choices=("sql", "python"),
+        default="sql",
+        help="Gdzie wybierać jednostkę obowiązującą w dniu utworzenia projektu:\n"
+        "sql - po stronie serwera, jeden wiersz na dokument (domyślnie),\n"
+        "python - grupowanie wszystkich przedziałów przypisań w skrypcie (poprzednie zachowanie).",
+    )
+
+    scan_group = parser.add_mutually_exclusive_group()
+    scan_group.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Analizuj tylko dokumenty utworzone/zmienione od ostatniego pełnego przebiegu --update\n"
+        "oraz dokumenty zgłaszających, których Teczka lub przypisania do jednostek się zmieniły.",
+    )
+    scan_group.add_argument(
+        "--full",
+        action="store_true",
+        help="Analizuj wszystkie dokumenty i (z --update) zapisz nowy znacznik zmian dla --incremental.",
+    )
+
+    parser.add_argument(
+        "--cached-dimensions",
+        action="store_true",
+        help="Pobieraj z bazy tylko dokumenty; Teczki, strukturę i jednostki trzymaj lokalnie\n"
+        "(.cache/) i łącz w skrypcie. Przyspiesza powtarzane przebiegi testowe i --signature.",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL_MINUTES,
+        help=f"Czas ważności pamięci podręcznej w minutach (domyślnie {DEFAULT_TTL_MINUTES}).",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Wymuś ponowne pobranie Teczek, struktury i jednostek z bazy.",
+    )
+
+    add_commit_arguments(parser)
+    add_report_arguments(parser)
+
     args = parser.parse_args()
 
+    error = validate_commit_arguments(args) or validate_report_arguments(args)
+    if error:
+        parser.error(error)
+    if args.signatures_file and (args.signature or args.update_signature):
+        parser.error("--signatures-file nie może być łączony z --signature ani --update-signature.")
+
+    signatures = None
+    if args.signatures_file:
+        try:
+            signatures = load_signatures(args.signatures_file)
+        except OSError as ex:
+            parser.error(f"Nie można wczytać pliku sygnatur: {ex}")
+        if not signatures:
+            parser.error(f"Plik {args.signatures_file} nie zawiera żadnych sygnatur.")
+        console.print(
+            f"Wczytano {len(signatures)} sygnatur z pliku {args.signatures_file}.",
+            style="bold blue",
+        )
+
     mode = "test"
     target_signature = args.signature
     limit_count = 30  # default for single
@@ -469,5 +816,18 @@ if __name__ == "__main__":
             exit()
 
     process_unified_unit(
-        mode=mode, target_signature=target_signature, limit_count=limit_count
+        mode=mode,
+        target_signature=target_signature,
+        limit_count=limit_count,
+        commit_every=args.commit_every,
+        max_txn_seconds=args.max_txn_seconds,
+        unit_selection=args.unit_selection,
+        cached_dimensions=args.cached_dimensions,
+        cache_ttl=args.cache_ttl,
+        refresh_cache=args.refresh_cache,
+        signatures=signatures,
+        incremental="incremental" if args.incremental else "full" if args.full else None,
+        report=args.report,
+        report_file=args.report_file,
+        max_table_rows=args.max_table_rows,
     )